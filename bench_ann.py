@@ -0,0 +1,98 @@
+# bench_ann.py
+# FAISS 근사 인덱스(IVF / HNSW / PQ / OPQ)의 recall@k와 쿼리 지연을 Flat(정확 검색) 기준선과 비교합니다.
+# 벡터 소스: 임베딩 캐시(cache/embeddings)의 CLIP 벡터 → 없으면 클러스터 구조를 가진 합성 벡터.
+# 백만 장 규모를 가늠하려면 N_SYNTHETIC을 늘려 실행하세요.
+
+import os
+import time
+import numpy as np
+import faiss
+from faiss_store import build_index, set_search_params
+from embedding_cache import DEFAULT_CACHE_DIR, EmbeddingCache
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+K = 10
+N_QUERIES = 1000
+N_SYNTHETIC = 200_000   # 캐시에 벡터가 부족할 때 사용할 합성 벡터 수
+MIN_REAL_VECTORS = 10_000
+DIM = 512
+
+# (spec, 튜닝 파라미터 이름, 시험할 값들)
+CONFIGS = [
+    ("IVFauto,Flat",       "nprobe",   [1, 4, 16, 64]),
+    ("HNSW32",             "efSearch", [16, 32, 64, 128]),
+    ("IVFauto,PQ64",       "nprobe",   [4, 16, 64]),
+    ("OPQ64,IVFauto,PQ64", "nprobe",   [4, 16, 64]),
+]
+
+
+def load_vectors():
+    if os.path.exists(os.path.join(DEFAULT_CACHE_DIR, "index.json")):
+        cache = EmbeddingCache(DEFAULT_CACHE_DIR, dim=DIM)
+        if cache.rows >= MIN_REAL_VECTORS:
+            print(f"📂 임베딩 캐시에서 {cache.rows}개 CLIP 벡터 사용")
+            return np.array(cache._vectors())
+    print(f"🧪 합성 벡터 {N_SYNTHETIC}개 생성 (클러스터 1000개, L2 정규화)")
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((1000, DIM)).astype(np.float32)
+    vectors = centers[rng.integers(0, 1000, N_SYNTHETIC)] + 0.5 * rng.standard_normal((N_SYNTHETIC, DIM)).astype(np.float32)
+    return vectors
+
+
+def timed_search(index, queries, k):
+    start_time = time.perf_counter()
+    _, ids = index.search(queries, k)
+    return ids, (time.perf_counter() - start_time) / len(queries) * 1000  # ms/query
+
+
+def recall_at_k(ids, ground_truth, k):
+    hits = sum(len(set(a[:k]) & set(b[:k])) for a, b in zip(ids, ground_truth))
+    return hits / (len(ground_truth) * k)
+
+
+if __name__ == "__main__":
+    vectors = np.ascontiguousarray(load_vectors(), dtype=np.float32)
+    faiss.normalize_L2(vectors)
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), min(N_QUERIES, len(vectors)), replace=False)]
+
+    # -----------------------------------------------------------
+    # 2. 기준선: Flat (정확 검색)
+    # -----------------------------------------------------------
+    flat = build_index(DIM, "Flat")
+    flat.add(vectors)
+    ground_truth, flat_ms = timed_search(flat, queries, K)
+    flat_mb = flat.ntotal * DIM * 4 / 1e6
+
+    print("\n" + "=" * 78)
+    print(f"N={len(vectors)}, queries={len(queries)}, k={K}")
+    print("=" * 78)
+    print(f"{'spec':<22}{'param':<14}{'recall@k':>10}{'ms/query':>11}{'speedup':>9}{'build(s)':>10}{'MB':>8}")
+    print("-" * 78)
+    print(f"{'Flat':<22}{'-':<14}{1.0:>10.4f}{flat_ms:>11.4f}{1.0:>8.1f}x{0.0:>10.1f}{flat_mb:>8.1f}")
+
+    # -----------------------------------------------------------
+    # 3. 근사 인덱스별 recall@k / 지연
+    # -----------------------------------------------------------
+    for spec, param, values in CONFIGS:
+        build_start = time.time()
+        try:
+            index = build_index(DIM, spec, train_vectors=vectors, n_total=len(vectors))
+        except Exception as e:
+            print(f"{spec:<22}❌ 생성 실패: {e}")
+            continue
+        index.add(vectors)
+        build_seconds = time.time() - build_start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+
+        for value in values:
+            if param == "nprobe":
+                set_search_params(index, nprobe=value)
+            else:
+                set_search_params(index, ef_search=value)
+            ids, ms = timed_search(index, queries, K)
+            print(f"{spec:<22}{param + '=' + str(value):<14}{recall_at_k(ids, ground_truth, K):>10.4f}"
+                  f"{ms:>11.4f}{flat_ms / ms:>8.1f}x{build_seconds:>10.1f}{size_mb:>8.1f}")
+    print("=" * 78)
@@ -0,0 +1,68 @@
+# bench_clip_batch.py
+# CLIP 배치 크기별 인코딩 처리량(images/sec)을 비교합니다.
+# 단건 image_to_vector 루프와 images_to_vectors(batch_size=...)를 같은 이미지 세트로 측정합니다.
+
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image
+from utils import image_to_vector, images_to_vectors
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+IMAGE_DIR = "images/product_jpg"
+BATCH_SIZES = [1, 4, 8, 16, 32, 64]
+REPEAT = 3  # 배치 크기별 반복 측정 횟수 (최솟값 사용)
+
+image_paths = [os.path.join(IMAGE_DIR, f) for f in sorted(os.listdir(IMAGE_DIR))
+               if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp"))]
+
+if len(image_paths) == 0:
+    print(f"❌ '{IMAGE_DIR}' 폴더에 이미지가 없습니다!")
+    sys.exit()
+
+# 디코딩 시간은 측정에서 제외하기 위해 미리 메모리에 올립니다.
+images = []
+for path in image_paths:
+    image = Image.open(path)
+    image.load()
+    images.append(image.convert("RGB"))
+
+print(f"🚀 {len(images)}개 이미지로 CLIP 배치 처리량 측정 시작 (반복 {REPEAT}회)")
+
+# 워밍업 (첫 호출의 메모리 할당/스레드 풀 초기화 비용 제외)
+images_to_vectors(images[:2], batch_size=2)
+
+# -----------------------------------------------------------
+# 2. 기준선: 단건 image_to_vector 루프
+# -----------------------------------------------------------
+best = float("inf")
+for _ in range(REPEAT):
+    start_time = time.time()
+    single_vectors = np.array([image_to_vector(img, remove_bg=False) for img in images], dtype=np.float32)
+    best = min(best, time.time() - start_time)
+baseline_ips = len(images) / best
+
+print("\n" + "=" * 50)
+print(f"{'mode':<22}{'images/sec':>12}{'speedup':>10}")
+print("=" * 50)
+print(f"{'image_to_vector':<22}{baseline_ips:>12.2f}{1.0:>9.2f}x")
+
+# -----------------------------------------------------------
+# 3. 배치 크기별 images_to_vectors
+# -----------------------------------------------------------
+for batch_size in BATCH_SIZES:
+    best = float("inf")
+    for _ in range(REPEAT):
+        start_time = time.time()
+        vectors = images_to_vectors(images, batch_size=batch_size)
+        best = min(best, time.time() - start_time)
+    ips = len(images) / best
+
+    # 단건 결과와 동일한 벡터인지 확인 (배치 연산 순서 차이로 인한 미세 오차만 허용)
+    max_diff = float(np.abs(vectors - single_vectors).max())
+    print(f"{'batch_size=' + str(batch_size):<22}{ips:>12.2f}{ips / baseline_ips:>9.2f}x  (max diff {max_diff:.2e})")
+
+print("=" * 50)
@@ -0,0 +1,111 @@
+# bench_clip_onnx.py
+# CLIP 이미지 인코더: PyTorch(fp32) vs ONNX Runtime(clip_onnx.py) 처리량과 출력 일치도를 비교하고,
+# rembg + CLIP을 한 프로세스에서 같이 돌릴 때 스레드 계획(plan_threads)의 효과를 측정합니다.
+#  1) 인코더 단독 : images/sec, 속도 배율, PyTorch 벡터와의 최소 코사인 / 최대 절대 오차
+#  2) 파이프라인  : 워커 스레드마다 [디코딩 → rembg → CLIP(ONNX 세션 풀)] 처리
+#                   "default" = 세션마다 ORT 기본 스레드(코어 수만큼) → 과다 구독
+#                   "planned" = plan_threads로 rembg/CLIP 세션 스레드 합을 코어 수에 맞춤
+
+import os
+import sys
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from mask_engine import list_images
+from utils import configure_clip, images_to_vectors, load_image, new_rembg_session, remove_background
+from clip_onnx import ClipOnnxEncoder, plan_threads
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+IMAGE_DIR = os.path.join("images", "product_jpg")
+MIN_IMAGES = 64        # 이미지가 적으면 반복해서 이 개수 이상으로 측정
+BATCH_SIZE = 32
+REPEAT = 3             # 인코더 단독 측정 반복 횟수 (최솟값 사용)
+CLIP_SESSIONS = 1      # 파이프라인: ONNX CLIP 세션 수
+REMBG_SESSIONS = 2     # 파이프라인: rembg 세션 수 (= 워커 스레드 수)
+
+
+def best_seconds(fn, repeat: int = REPEAT) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+def run_pipeline(paths, encoder: ClipOnnxEncoder, rembg_threads: int = None) -> float:
+    """REMBG_SESSIONS개 워커 스레드로 전체 경로를 처리하고 images/sec를 반환합니다."""
+    sessions = queue.Queue()
+    for _ in range(REMBG_SESSIONS):
+        sessions.put(new_rembg_session(threads=rembg_threads))
+
+    def process(path):
+        session = sessions.get()
+        try:
+            masked = remove_background(load_image(path), session=session)
+        finally:
+            sessions.put(session)
+        return encoder.encode([masked], batch_size=1)
+
+    process(paths[0])  # 워밍업
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=REMBG_SESSIONS) as pool:
+        list(pool.map(process, paths))
+    return len(paths) / (time.perf_counter() - start_time)
+
+
+if __name__ == "__main__":
+    paths = list_images(IMAGE_DIR)
+    if not paths:
+        print(f"❌ '{IMAGE_DIR}' 폴더에 이미지가 없습니다!")
+        sys.exit()
+    paths = (paths * (MIN_IMAGES // len(paths) + 1))[:max(MIN_IMAGES, len(paths))]
+    images = [load_image(p) for p in paths]  # 디코딩은 측정에서 제외
+    cores = os.cpu_count() or 1
+    print(f"🚀 {len(images)}장, 코어 {cores}개, batch={BATCH_SIZE}")
+
+    # -------------------------------------------------------
+    # 2. 인코더 단독: PyTorch fp32 vs ONNX Runtime
+    # -------------------------------------------------------
+    configure_clip(backend="torch", precision="fp32", channels_last=False, torchscript=False)
+    images_to_vectors(images[:2], batch_size=2)  # 모델 로드 + 워밍업
+    torch_vectors = images_to_vectors(images, batch_size=BATCH_SIZE)
+    torch_ips = len(images) / best_seconds(lambda: images_to_vectors(images, batch_size=BATCH_SIZE))
+
+    encoder = ClipOnnxEncoder(pool_size=1, intra_threads=cores)
+    encoder.encode(images[:2], batch_size=2)
+    onnx_vectors = encoder.encode(images, batch_size=BATCH_SIZE)
+    onnx_ips = len(images) / best_seconds(lambda: encoder.encode(images, batch_size=BATCH_SIZE))
+
+    cos = np.sum(torch_vectors * onnx_vectors, axis=1)
+    print("\n" + "=" * 72)
+    print(f"{'encoder':<24}{'images/sec':>12}{'speedup':>10}{'min cos':>12}{'max |diff|':>14}")
+    print("-" * 72)
+    print(f"{'pytorch fp32':<24}{torch_ips:>12.2f}{1.0:>9.2f}x{1.0:>12.6f}{0.0:>14.2e}")
+    print(f"{'onnxruntime fp32':<24}{onnx_ips:>12.2f}{onnx_ips / torch_ips:>9.2f}x{cos.min():>12.6f}"
+          f"{float(np.abs(torch_vectors - onnx_vectors).max()):>14.2e}")
+    print("=" * 72)
+
+    # -------------------------------------------------------
+    # 3. rembg + CLIP 파이프라인: 기본 스레드 vs 계획된 스레드
+    # -------------------------------------------------------
+    plan = plan_threads(cores, clip_sessions=CLIP_SESSIONS, rembg_sessions=REMBG_SESSIONS)
+    print(f"\n🔧 스레드 계획: CLIP 세션 {CLIP_SESSIONS}개 × {plan['clip_threads']} / "
+          f"rembg 세션 {REMBG_SESSIONS}개 × {plan['rembg_threads']} (코어 {cores}개)")
+
+    default_ips = run_pipeline(paths, ClipOnnxEncoder(pool_size=CLIP_SESSIONS, intra_threads=cores),
+                               rembg_threads=cores)
+    planned_ips = run_pipeline(paths, ClipOnnxEncoder(pool_size=CLIP_SESSIONS, intra_threads=plan["clip_threads"]),
+                               rembg_threads=plan["rembg_threads"])
+    print("=" * 50)
+    print(f"{'pipeline':<24}{'images/sec':>12}{'speedup':>10}")
+    print("-" * 50)
+    print(f"{'default threads':<24}{default_ips:>12.2f}{1.0:>9.2f}x")
+    print(f"{'planned threads':<24}{planned_ips:>12.2f}{planned_ips / default_ips:>9.2f}x")
+    print("=" * 50)
+    print("💡 min cos가 0.9999 이상이면 utils.CLIP_BACKEND = \"onnx\"로 바꿔도 기존 벡터/캐시와 섞어 쓸 수 있습니다.")
@@ -0,0 +1,115 @@
+# bench_clip_quant.py
+# CLIP 추론 옵션(fp32 / int8 동적 양자화 / channels_last / TorchScript)별 처리량과
+# Weaviate에 이미 저장된 fp32 벡터와의 일치도를 비교합니다.
+#  - images/sec      : images_to_vectors(BATCH_SIZE) 처리량 (전처리/마스킹은 미리 끝내고 인코더만 측정)
+#  - cos vs fp32     : 같은 입력에 대한 fp32 eager 결과와의 코사인 유사도 (옵션으로 인한 순수 오차)
+#  - cos vs Weaviate : 저장된 벡터와의 코사인 유사도 (fp32 행이 전처리 차이의 기준선)
+#  - recall@k        : 새 벡터로 저장된 벡터들을 검색했을 때, 저장된 벡터로 검색한 top-k를 얼마나 그대로 찾는지
+# recall@k와 cos가 fp32 행과 거의 같으면 재색인 없이 운영 노드의 CLIP_PRECISION 등을 바꿔도 됩니다.
+
+import os
+import sys
+import time
+import numpy as np
+
+from utils import (connect_to_weaviate, configure_clip, images_to_vectors, load_image, load_masked_image,
+                   WEAVIATE_CLASS_NAME)
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+SAMPLE = 300        # Weaviate에서 가져올 객체 수
+K = 10
+BATCH_SIZE = 32
+REPEAT = 3          # 설정별 반복 측정 횟수 (최솟값 사용)
+NUM_THREADS = None  # torch.set_num_threads (None: 기본값)
+REMOVE_BG = True    # 저장된 벡터를 만들 때와 같은 전처리 (rembg_clip_weaviate_docker.py / ingest_pipeline.py 설정 확인)
+MAX_SIDE = None     # 저장된 벡터가 원본 해상도로 만들어졌으면 None, utils.MAX_IMAGE_SIDE로 만들어졌으면 그 값
+
+# (이름, precision, channels_last, torchscript) — 첫 행이 기준(fp32 eager)
+CONFIGS = [
+    ("fp32", "fp32", False, False),
+    ("fp32+channels_last", "fp32", True, False),
+    ("fp32+torchscript", "fp32", False, True),
+    ("int8", "int8", False, False),
+    ("int8+torchscript", "int8", False, True),
+]
+
+
+def fetch_stored(limit: int):
+    """Weaviate에서 (imagePath, 벡터)를 최대 limit개 가져옵니다. (로컬에 이미지 파일이 있는 것만)"""
+    client = connect_to_weaviate()
+    paths, vectors = [], []
+    try:
+        collection = client.collections.get(WEAVIATE_CLASS_NAME)
+        for obj in collection.iterator(include_vector=True):
+            path = obj.properties.get("imagePath")
+            vector = obj.vector.get("default")
+            if path and vector is not None and os.path.exists(path):
+                paths.append(path)
+                vectors.append(vector)
+                if len(paths) >= limit:
+                    break
+    finally:
+        client.close()
+    vectors = np.asarray(vectors, dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return paths, vectors
+
+
+def top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    k = min(k, corpus.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def recall_at_k(found: np.ndarray, expected: np.ndarray) -> float:
+    return sum(len(set(a) & set(b)) for a, b in zip(found, expected)) / expected.size
+
+
+if __name__ == "__main__":
+    paths, stored = fetch_stored(SAMPLE)
+    if len(paths) < 2:
+        print("❌ 로컬 이미지 파일과 매칭되는 Weaviate 객체가 2개 이상 필요합니다! (imagePath 확인)")
+        sys.exit()
+
+    print(f"🚀 {len(paths)}개 이미지 전처리 중 (remove_bg={REMOVE_BG}, max_side={MAX_SIDE})...")
+    if REMOVE_BG:
+        images = [load_masked_image(p, max_side=MAX_SIDE) for p in paths]
+    else:
+        images = [load_image(p, MAX_SIDE) for p in paths]
+    expected = top_k(stored, stored, K)
+
+    baseline_vectors, baseline_ips = None, None
+    print("\n" + "=" * 92)
+    print(f"N={len(paths)}, k={K}, batch={BATCH_SIZE}, threads={NUM_THREADS or 'default'}")
+    print("=" * 92)
+    print(f"{'config':<22}{'load(s)':>9}{'images/sec':>12}{'speedup':>9}"
+          f"{'cos vs fp32':>14}{'cos vs Weaviate':>17}{'recall@k':>10}")
+    print("-" * 92)
+    for name, precision, channels_last, torchscript in CONFIGS:
+        configure_clip(precision=precision, num_threads=NUM_THREADS,
+                       channels_last=channels_last, torchscript=torchscript)
+        load_start = time.perf_counter()
+        images_to_vectors(images[:2], batch_size=2)  # 모델 로드 + 워밍업
+        load_seconds = time.perf_counter() - load_start
+
+        best = float("inf")
+        for _ in range(REPEAT):
+            start_time = time.perf_counter()
+            vectors = images_to_vectors(images, batch_size=BATCH_SIZE)
+            best = min(best, time.perf_counter() - start_time)
+        ips = len(images) / best
+
+        if baseline_vectors is None:
+            baseline_vectors, baseline_ips = vectors, ips
+        cos_fp32 = np.sum(vectors * baseline_vectors, axis=1)
+        cos_stored = np.sum(vectors * stored, axis=1)
+        recall = recall_at_k(top_k(vectors, stored, K), expected)
+        print(f"{name:<22}{load_seconds:>9.2f}{ips:>12.2f}{ips / baseline_ips:>8.2f}x"
+              f"{f'{cos_fp32.mean():.4f}/{cos_fp32.min():.4f}':>14}"
+              f"{f'{cos_stored.mean():.4f}/{cos_stored.min():.4f}':>17}{recall:>10.4f}")
+    print("=" * 92)
+    print("💡 cos는 평균/최소입니다. cos vs Weaviate와 recall@k가 fp32 행과 거의 같으면 재색인 없이 전환해도 됩니다.")
+    print("   (전환 후 새로 넣는 벡터와 기존 벡터가 섞여도 검색 순위가 거의 바뀌지 않는다는 뜻)")
@@ -0,0 +1,139 @@
+# bench_segmenters.py
+# 세그멘터(SAM vit_b/l/h, MobileSAM, rembg u2net/u2netp/isnet)별 비용과 검색 품질을 비교합니다.
+#  - 이미지당 지연 (p50 / p95, 첫 장은 워밍업으로 제외)
+#  - 최대 메모리 (세그멘테이션까지의 ru_maxrss, CLIP 로드 전)
+#  - 다운스트림 CLIP 검색 품질
+#      recall@k vs 기준 : 기준 세그멘터(REFERENCE)로 만든 top-k 이웃을 얼마나 그대로 찾는지
+#      같은 상품 hit@k  : 파일명의 product_id(20798351_1.jpg)가 같은 다른 이미지가 top-k에 있는 비율
+# 세그멘터마다 별도 프로세스에서 실행하므로 메모리 측정이 서로 섞이지 않습니다.
+# 체크포인트/패키지가 없는 세그멘터는 건너뜁니다.
+
+import os
+import sys
+import time
+import subprocess
+import numpy as np
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+IMAGE_DIR = os.path.join("images", "product_jpg")
+MAX_IMAGES = 200
+K = 10
+SEGMENTERS = ["none", "rembg_u2netp", "rembg_u2net", "rembg_isnet-general-use",
+              "mobile_sam", "sam_vit_b", "sam_vit_l", "sam_vit_h"]
+REFERENCE = "sam_vit_h"     # 현재 운영 중인 세그멘터 (없으면 recall@k vs 기준은 생략)
+RESULT_DIR = os.path.join("cache", "bench_segmenters")
+
+
+def benchmark_paths():
+    from mask_engine import list_images
+    return list_images(IMAGE_DIR)[:MAX_IMAGES]
+
+
+# -----------------------------------------------------------
+# 2. 워커: 세그멘터 하나로 전체 이미지를 처리 (별도 프로세스)
+# -----------------------------------------------------------
+def run_worker(name: str, out_path: str):
+    import resource
+    paths = benchmark_paths()
+    load_start = time.perf_counter()
+    if name == "none":
+        from utils import load_image
+        segment = load_image
+    else:
+        from segmenters import get_segmenter
+        kwargs = {"use_cache": False} if name.startswith("sam_") or name == "mobile_sam" else {}
+        segment = get_segmenter(name, **kwargs).segment  # 인코더 비용을 재기 위해 SAM 캐시는 끔
+    load_seconds = time.perf_counter() - load_start
+
+    masked, latencies = [], []
+    for path in paths:
+        start_time = time.perf_counter()
+        masked.append(segment(path))
+        latencies.append(time.perf_counter() - start_time)
+    maxrss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # CLIP 로드 전 최대 메모리
+
+    from utils import images_to_vectors
+    vectors = images_to_vectors(masked)
+    np.savez(out_path, vectors=vectors, latencies=np.asarray(latencies),
+             maxrss_kb=maxrss_kb, load_seconds=load_seconds)
+
+
+# -----------------------------------------------------------
+# 3. 품질 지표
+# -----------------------------------------------------------
+def top_k_neighbors(vectors: np.ndarray, k: int) -> np.ndarray:
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)  # 자기 자신 제외
+    k = min(k, len(vectors) - 1)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def recall_vs_reference(neighbors, reference_neighbors) -> float:
+    hits = sum(len(set(a) & set(b)) for a, b in zip(neighbors, reference_neighbors))
+    return hits / reference_neighbors.size
+
+
+def same_product_hit_rate(neighbors, paths):
+    """같은 product_id 이미지가 2장 이상인 쿼리에 대해, top-k 안에 같은 상품이 하나라도 있는 비율. (없으면 None)"""
+    products = [os.path.basename(p).rsplit("_", 1)[0] for p in paths]
+    counts = {p: products.count(p) for p in set(products)}
+    queries = [i for i, p in enumerate(products) if counts[p] > 1]
+    if not queries:
+        return None
+    return sum(any(products[j] == products[i] for j in neighbors[i]) for i in queries) / len(queries)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        run_worker(sys.argv[2], sys.argv[3])
+        sys.exit()
+
+    paths = benchmark_paths()
+    if len(paths) < 2:
+        print(f"❌ '{IMAGE_DIR}' 폴더에 비교할 이미지가 2개 이상 필요합니다!")
+        sys.exit()
+    os.makedirs(RESULT_DIR, exist_ok=True)
+    print(f"🚀 세그멘터 {len(SEGMENTERS)}종 x 이미지 {len(paths)}장 벤치마크 시작")
+
+    results = {}
+    for name in SEGMENTERS:
+        out_path = os.path.join(RESULT_DIR, f"{name}.npz")
+        print(f"🔹 {name} 실행 중...")
+        proc = subprocess.run([sys.executable, __file__, "--worker", name, out_path],
+                              capture_output=True, text=True)
+        if proc.returncode != 0 or not os.path.exists(out_path):
+            reason = (proc.stderr.strip().splitlines() or proc.stdout.strip().splitlines() or ["?"])[-1]
+            print(f"   ⚠️ 건너뜀: {reason}")
+            continue
+        with np.load(out_path) as data:
+            results[name] = {key: data[key] for key in data.files}
+        os.remove(out_path)
+
+    if not results:
+        print("❌ 실행에 성공한 세그멘터가 없습니다.")
+        sys.exit()
+
+    neighbors = {name: top_k_neighbors(r["vectors"], K) for name, r in results.items()}
+    reference = neighbors.get(REFERENCE)
+
+    print("\n" + "=" * 92)
+    print(f"N={len(paths)}, k={K}, 기준={REFERENCE if reference is not None else '(없음)'}")
+    print("=" * 92)
+    print(f"{'segmenter':<26}{'load(s)':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'img/s':>8}"
+          f"{'peak MB':>10}{'recall@k':>10}{'same-prod':>10}")
+    print("-" * 92)
+    for name, r in results.items():
+        latencies_ms = r["latencies"][1:] * 1000 if len(r["latencies"]) > 1 else r["latencies"] * 1000
+        recall = recall_vs_reference(neighbors[name], reference) if reference is not None else None
+        hit_rate = same_product_hit_rate(neighbors[name], paths)
+        print(f"{name:<26}{float(r['load_seconds']):>9.2f}{np.percentile(latencies_ms, 50):>10.1f}"
+              f"{np.percentile(latencies_ms, 95):>10.1f}{1000 / max(latencies_ms.mean(), 1e-9):>8.2f}"
+              f"{int(r['maxrss_kb']) / 1024:>10.0f}"
+              f"{(f'{recall:.4f}' if recall is not None else '-'):>10}"
+              f"{(f'{hit_rate:.4f}' if hit_rate is not None else '-'):>10}")
+    print("=" * 92)
+    print("💡 recall@k가 기준과 비슷하면서 가장 빠르고 가벼운 세그멘터를 고르세요.")
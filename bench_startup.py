@@ -0,0 +1,44 @@
+# bench_startup.py
+# utils import 시 시작 시간과 최대 메모리(RSS)를 측정합니다.
+# 조회 전용 스크립트(connect_to_weaviate만 사용)와, 모델을 실제로 로드하는 경우를 비교합니다.
+
+import sys
+import json
+import subprocess
+
+REPEAT = 3
+
+# 각 시나리오는 별도 프로세스에서 실행되어 서로의 캐시/메모리에 영향을 주지 않습니다.
+SCENARIOS = [
+    ("import utils (조회 전용)", "import utils"),
+    ("+ get_clip_model()", "import utils; utils.get_clip_model()"),
+    ("+ get_rembg_session() (기존 eager 로드와 동일)",
+     "import utils; utils.get_clip_model(); utils.get_rembg_session()"),
+]
+
+PROBE = """
+import time, json, resource
+_start = time.perf_counter()
+{code}
+_elapsed = time.perf_counter() - _start
+print(json.dumps({{"seconds": _elapsed, "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+def run_scenario(code):
+    out = subprocess.run([sys.executable, "-c", PROBE.format(code=code)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+print("\n" + "=" * 70)
+print(f"{'scenario':<50}{'seconds':>9}{'RSS(MB)':>11}")
+print("=" * 70)
+for name, code in SCENARIOS:
+    try:
+        results = [run_scenario(code) for _ in range(REPEAT)]
+    except subprocess.CalledProcessError as e:
+        print(f"❌ {name}: 실행 실패\n{e.stderr}")
+        continue
+    seconds = min(r["seconds"] for r in results)
+    rss_mb = max(r["maxrss_kb"] for r in results) / 1024
+    print(f"{name:<50}{seconds:>9.3f}{rss_mb:>11.1f}")
+print("=" * 70)
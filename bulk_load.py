@@ -0,0 +1,180 @@
+# bulk_load.py
+# CSV → MySQL 대량 적재 공용 엔진 (product_save.py / review_save.py / categori_save.py).
+#  1) pd.read_csv(chunksize=...)로 청크 단위로 읽고
+#  2) 프로세스 풀에서 청크별 전처리 + 벡터화된 TSV 변환 (iterrows 없음)
+#  3) 메인 프로세스가 청크마다 LOAD DATA LOCAL INFILE로 임시 스테이징 테이블에 적재한 뒤
+#     INSERT ... SELECT ... ON DUPLICATE KEY UPDATE로 대상 테이블에 upsert하고 커밋
+# 청크마다 커밋하므로 수백만 행의 리뷰 덤프도 거대한 트랜잭션 하나가 되지 않고, 메모리도 청크 크기로 제한됩니다.
+# ⚠️ MySQL 서버에 local_infile=ON 설정이 필요합니다. (SET GLOBAL local_infile = 1;)
+
+import os
+import time
+import shutil
+import tempfile
+
+import pandas as pd
+import mysql.connector
+
+from detail_parser import map_chunks
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+DB_CONFIG = {
+    'user': 'root',
+    'password': '1234',
+    'host': '127.0.0.1',
+    'port': 3305,
+    'database': 'aiproject'
+}
+DEFAULT_CHUNK_ROWS = 50000  # 청크당 행 수 (워커 수 × 2개 청크까지만 메모리에 올라감)
+NULL = r"\N"                # LOAD DATA의 NULL 표기
+
+
+# -----------------------------------------------------------
+# 2. DataFrame → TSV (벡터화)
+# -----------------------------------------------------------
+def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """헤더 깨짐으로 생긴 불필요한 열(NaN / 'nan' / 'Unnamed: n') 제거"""
+    df = df.loc[:, ~df.columns.isna()]
+    df = df.loc[:, df.columns != 'nan']
+    return df.loc[:, ~df.columns.str.contains('^Unnamed', na=False)]
+
+
+def _tsv_column(series: pd.Series) -> pd.Series:
+    """컬럼 하나를 LOAD DATA 형식 문자열로 (NULL은 \\N, 역슬래시/탭/줄바꿈은 이스케이프)"""
+    if pd.api.types.is_float_dtype(series):
+        non_null = series.dropna()
+        if len(non_null) and (non_null % 1 == 0).all():
+            series = series.astype("Int64")  # NaN 때문에 float가 된 정수 컬럼: 805.0 → 805
+    elif pd.api.types.is_datetime64_any_dtype(series):
+        series = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+    elif pd.api.types.is_bool_dtype(series):
+        series = series.astype("Int64")
+
+    text = series.astype(str)
+    if series.dtype == object or pd.api.types.is_string_dtype(series):
+        text = (text.str.replace("\\", "\\\\", regex=False)
+                    .str.replace("\t", "\\t", regex=False)
+                    .str.replace("\n", "\\n", regex=False)
+                    .str.replace("\r", "\\r", regex=False))
+    return text.where(series.notna(), NULL)
+
+
+def dataframe_to_tsv(df: pd.DataFrame) -> str:
+    """DataFrame → LOAD DATA용 탭 구분 텍스트 (헤더 없음, 줄 끝 \\n)"""
+    if df.empty:
+        return ""
+    columns = [_tsv_column(df[col]) for col in df.columns]
+    lines = columns[0].str.cat(columns[1:], sep="\t") if len(columns) > 1 else columns[0]
+    return "\n".join(lines.tolist()) + "\n"
+
+
+def _chunk_to_tsv_file(indexed_chunk, columns, prepare_fn, tmp_dir: str):
+    """(워커) 청크 전처리 → TSV 파일 저장. 반환: (파일 경로, 적재할 컬럼, 행 수)"""
+    chunk_index, df = indexed_chunk
+    df = clean_columns(df)
+    if prepare_fn is not None:
+        df = prepare_fn(df)
+    df = df[[col for col in columns if col in df.columns]]
+    path = os.path.join(tmp_dir, f"chunk_{chunk_index:06d}.tsv")
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(dataframe_to_tsv(df))
+    return path, list(df.columns), len(df)
+
+
+# -----------------------------------------------------------
+# 3. 스테이징 테이블 적재 + upsert
+# -----------------------------------------------------------
+def _upsert_query(table: str, staging: str, columns, key_columns, update_columns) -> str:
+    column_list = ", ".join(columns)
+    if update_columns is None:
+        update_columns = [col for col in columns if col not in key_columns]
+    update_columns = [col for col in update_columns if col in columns]
+    if not update_columns:
+        return f"INSERT IGNORE INTO {table} ({column_list}) SELECT {column_list} FROM {staging}"
+    updates = ", ".join(f"{col} = s.{col}" for col in update_columns)
+    return (f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} AS s "
+            f"ON DUPLICATE KEY UPDATE {updates}")
+
+
+def bulk_load_chunks(chunks, table: str, columns, key_columns, update_columns=None, prepare_fn=None,
+                     workers: int = None, db_config: dict = None) -> dict:
+    """
+    DataFrame 청크들을 table에 upsert합니다.
+
+    columns       : 적재할 DB 컬럼 (청크에 없는 컬럼은 건너뜀)
+    key_columns   : PRIMARY/UNIQUE KEY 컬럼 (update_columns를 생략하면 이 컬럼을 뺀 나머지를 갱신)
+    update_columns: 중복 키일 때 갱신할 컬럼 ([]이면 INSERT IGNORE)
+    prepare_fn    : 청크마다 워커 프로세스에서 실행할 전처리 함수 df -> df (모듈 최상위 함수여야 함)
+    """
+    db_config = db_config or DB_CONFIG
+    staging = f"{table}_staging"
+    stats = {"rows": 0, "affected": 0, "chunks": 0, "seconds": 0.0}
+    start_time = time.time()
+    tmp_dir = tempfile.mkdtemp(prefix=f"bulk_{table}_")
+
+    conn = mysql.connector.connect(**db_config, allow_local_infile=True)
+    cursor = conn.cursor()
+    try:
+        # 임시 테이블은 이 연결에서만 보이고 연결이 끊기면 자동 삭제됨
+        cursor.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} LIKE {table}")
+
+        for path, chunk_columns, rows in map_chunks(_chunk_to_tsv_file, enumerate(chunks),
+                                                    columns, prepare_fn, tmp_dir, workers=workers):
+            try:
+                if rows == 0:
+                    continue
+                cursor.execute(f"DELETE FROM {staging}")
+                # REPLACE: 같은 청크 안의 중복 키는 뒤쪽 행이 이김 (기존 ON DUPLICATE KEY UPDATE와 동일)
+                cursor.execute(
+                    f"LOAD DATA LOCAL INFILE %s REPLACE INTO TABLE {staging} CHARACTER SET utf8mb4 "
+                    f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                    f"({', '.join(chunk_columns)})",
+                    (os.path.abspath(path),),
+                )
+                cursor.execute(_upsert_query(table, staging, chunk_columns, key_columns, update_columns))
+                stats["affected"] += cursor.rowcount
+                conn.commit()
+            finally:
+                os.remove(path)
+
+            stats["rows"] += rows
+            stats["chunks"] += 1
+            elapsed = time.time() - start_time
+            print(f"    ... {table}: {stats['rows']}행 적재 ({stats['rows'] / max(elapsed, 1e-9):.0f}행/초)")
+    except mysql.connector.Error:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    stats["seconds"] = time.time() - start_time
+    return stats
+
+
+def bulk_load_csv(csv_path: str, table: str, columns, key_columns, update_columns=None, prepare_fn=None,
+                  chunk_rows: int = DEFAULT_CHUNK_ROWS, workers: int = None, encoding: str = 'cp949',
+                  db_config: dict = None) -> dict:
+    """CSV 파일을 chunk_rows행씩 읽어 bulk_load_chunks로 table에 upsert합니다."""
+    chunks = pd.read_csv(csv_path, encoding=encoding, chunksize=chunk_rows)
+    return bulk_load_chunks(chunks, table, columns, key_columns, update_columns=update_columns,
+                            prepare_fn=prepare_fn, workers=workers, db_config=db_config)
+
+
+def run_csv_load(csv_path: str, table: str, columns, key_columns, **kwargs):
+    """*_save.py 공통 실행부: 파일 확인 → 적재 → 결과/오류 출력"""
+    if not os.path.exists(csv_path):
+        print(f"❌ 오류: 지정된 파일 경로에 '{csv_path}' 파일이 없습니다. 경로를 확인하세요.")
+        return
+    try:
+        print(f"'{csv_path}' → [{(kwargs.get('db_config') or DB_CONFIG)['database']}].{table} 적재 중...")
+        stats = bulk_load_csv(csv_path, table, columns, key_columns, **kwargs)
+        print(f"✅ {stats['rows']}행 처리 완료 (청크 {stats['chunks']}개, 영향받은 행 {stats['affected']}, "
+              f"소요 시간: {stats['seconds']:.2f}초)")
+    except mysql.connector.Error as err:
+        print(f"❌ 데이터베이스 오류 ({err.errno}): {err.msg}")
+    except Exception as e:
+        print(f"❌ 파일 처리 중 예상치 못한 오류 발생: {e}")
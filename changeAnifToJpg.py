@@ -1,79 +1,166 @@
+# changeAnifToJpg.py
+# 크롤링한 AVIF/HEIF 상품 이미지를 JPEG(또는 WebP)로 변환합니다.
+#  - 프로세스 풀로 모든 코어에서 병렬 디코딩/인코딩
+#  - manifest(SQLite, mask_manifest.py의 convert_manifest 테이블)로 크기/mtime/해시가 같은 파일은 건너뜀 → 재실행은 거의 즉시 끝남
+#    (OUTPUT_FORMAT / QUALITY / MIN_SIDE가 기록과 다르면 자동으로 다시 변환)
+#  - (선택) 변환하면서 짧은 변을 MIN_SIDE까지 축소 (CLIP 입력은 224px이므로 그 이상만 유지하면 충분)
+#  - 파일별 소요 시간을 모아 처리량 통계 출력
+
 import os
+import sys
 import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
 from PIL import Image
 from pillow_heif import register_heif_opener
 
-# 📢 AVIF 파일 처리를 위해 Pillow에 핸들러를 등록합니다.
+from mask_manifest import MaskManifest
+
+# 📢 AVIF 파일 처리를 위해 Pillow에 핸들러를 등록합니다. (spawn 워커에서도 import 시 등록됨)
 register_heif_opener()
 
-def convert_avif_to_jpg_batch_ultimate(input_folder, output_folder):
-    """
-    지정된 입력 폴더의 AVIF 파일을 JPG로 변환하여 지정된 출력 폴더에 저장합니다.
-
-    :param input_folder: 원본 .avif 파일이 있는 폴더 경로
-    :param output_folder: 변환된 .jpg 파일이 저장될 폴더 경로
-    """
-    
-    # 출력 폴더가 없으면 생성합니다.
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-        print(f"✅ 출력 폴더 생성: {output_folder}")
-    
-    # 변환할 파일 리스트
-    avif_files = [f for f in os.listdir(input_folder) if f.lower().endswith('.avif')]
-    total_start_time = time.time()
-    conversion_results = []
-    
-    print(f"👉 폴더: **{input_folder}** 에서 총 {len(avif_files)} 개의 .avif 파일을 찾았습니다.")
-    print(f"💾 결과는 **{output_folder}** 에 저장됩니다.")
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+# 🚨 원본 AVIF 폴더와 변환 결과 폴더 (프로젝트 루트 기준 상대 경로)
+INPUT_DIR = os.path.join("images", "product")
+OUTPUT_DIR = os.path.join("images", "product_jpg")
+INPUT_EXTENSIONS = (".avif", ".heic", ".heif")
+
+OUTPUT_FORMAT = "jpeg"  # "jpeg" | "webp"
+QUALITY = 85
+# 짧은 변이 MIN_SIDE보다 크면 MIN_SIDE로 축소 (None: 원본 해상도 유지)
+# CLIP(ViT-B/32) 입력은 224px입니다. 배경 제거(rembg/SAM) 품질을 위해 여유를 두려면 448~512 정도를 권장합니다.
+MIN_SIDE = None
+WORKERS = os.cpu_count()
+FORCE = False  # True면 manifest를 무시하고 전부 다시 변환
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, ".convert_manifest.sqlite")
+MANIFEST_TABLE = "convert_manifest"
+
+_EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp"}
+
+
+def output_name(file_name: str) -> str:
+    return os.path.splitext(file_name)[0] + _EXTENSIONS[OUTPUT_FORMAT]
+
+
+def output_settings() -> str:
+    """manifest에 함께 기록하는 출력 설정 (바뀌면 같은 원본도 다시 변환)"""
+    return f"{OUTPUT_FORMAT}|q={QUALITY}|min_side={MIN_SIDE}"
+
+
+# -----------------------------------------------------------
+# 2. 파일 하나 변환 (워커 프로세스)
+# -----------------------------------------------------------
+def downscale(img: Image.Image, min_side: int) -> Image.Image:
+    """짧은 변이 min_side가 되도록 비율을 유지해 축소 (이미 작으면 그대로)"""
+    short_side = min(img.size)
+    if min_side is None or short_side <= min_side:
+        return img
+    scale = min_side / short_side
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    # reducing_gap: 큰 배율은 먼저 정수 배 축소(reduce) 후 리샘플링하여 빠르게 처리
+    return img.resize(size, Image.BICUBIC, reducing_gap=3.0)
+
+
+def convert_one(src_path: str, dst_path: str, output_format: str, quality: int, min_side: int):
+    """반환: (src, dst, 소요 시간, 입력 바이트, 출력 바이트, 오류 메시지 또는 None)"""
+    start_time = time.time()
+    try:
+        with Image.open(src_path) as img:
+            img = downscale(img, min_side)
+            if output_format == "jpeg" and img.mode != "RGB":
+                img = img.convert("RGB")  # JPEG는 알파 채널을 저장할 수 없음
+            tmp_path = dst_path + ".tmp"
+            img.save(tmp_path, output_format, quality=quality)
+        os.replace(tmp_path, dst_path)  # 중간에 중단돼도 깨진 출력 파일이 남지 않도록
+        return (src_path, dst_path, time.time() - start_time,
+                os.path.getsize(src_path), os.path.getsize(dst_path), None)
+    except Exception as e:
+        return src_path, dst_path, time.time() - start_time, 0, 0, str(e)
+
+
+# -----------------------------------------------------------
+# 3. 폴더 변환 (프로세스 풀 + manifest 증분 처리)
+# -----------------------------------------------------------
+def convert_directory(input_folder: str, output_folder: str, workers: int = None, force: bool = False) -> dict:
+    os.makedirs(output_folder, exist_ok=True)
+    source_paths = [os.path.join(input_folder, f) for f in sorted(os.listdir(input_folder))
+                    if f.lower().endswith(INPUT_EXTENSIONS)]
+    print(f"👉 폴더: **{input_folder}** 에서 총 {len(source_paths)} 개의 변환 대상 파일을 찾았습니다.")
+    print(f"💾 결과는 **{output_folder}** 에 {OUTPUT_FORMAT.upper()}로 저장됩니다.")
+
+    workers = workers or os.cpu_count() or 1
+    manifest = MaskManifest(MANIFEST_PATH, table=MANIFEST_TABLE, settings=output_settings())
+    to_convert, skipped = manifest.plan(source_paths, output_folder, output_name)
+    if force:
+        to_convert, skipped = source_paths, 0
+    print(f"📋 최신 상태 {skipped}개 건너뜀, {len(to_convert)}개 변환 예정 (워커 {workers}개)")
     print("-" * 40)
 
-    for index, filename in enumerate(avif_files):
-        # 입력 파일 경로
-        input_filepath = os.path.join(input_folder, filename)
-        
-        # 출력 파일 이름과 경로
-        output_filename = os.path.splitext(filename)[0] + '.jpg'
-        output_filepath = os.path.join(output_folder, output_filename)
-        
-        try:
-            file_start_time = time.time()
-            
-            # 1. Image.open() 시도 (register_heif_opener 덕분)
-            with Image.open(input_filepath) as img:
-                # 2. JPG로 지정된 출력 경로에 저장
-                img.save(output_filepath, 'jpeg', quality=85)
-            
-            file_end_time = time.time()
-            time_taken = file_end_time - file_start_time
-            conversion_results.append((filename, output_filename, time_taken, "성공"))
-            print(f"✅ [{index + 1}/{len(avif_files)}] **{filename}** -> **{output_filename}** 변환 완료 (소요 시간: {time_taken:.4f}초)")
-
-        except Exception as e:
-            conversion_results.append((filename, output_filename, 0, "실패"))
-            print(f"❌ [{index + 1}/{len(avif_files)}] **{filename}** 변환 실패: {str(e)}") 
-
-    total_end_time = time.time()
-    total_time = total_end_time - total_start_time
-    
+    stats = {"total": len(source_paths), "ok": 0, "failed": 0, "skipped": skipped,
+             "bytes_in": 0, "bytes_out": 0, "seconds": []}
+    total_start_time = time.time()
+    pending = iter(to_convert)
+    in_flight = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            def submit_next():
+                path = next(pending, None)
+                if path is None:
+                    return False
+                dst_path = os.path.join(output_folder, output_name(os.path.basename(path)))
+                in_flight.add(pool.submit(convert_one, path, dst_path, OUTPUT_FORMAT, QUALITY, MIN_SIDE))
+                return True
+
+            while len(in_flight) < workers * 2 and submit_next():
+                pass
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    in_flight.discard(future)
+                    src_path, dst_path, seconds, bytes_in, bytes_out, error = future.result()
+                    manifest.record(src_path, dst_path, seconds, error)
+                    if error is None:
+                        stats["ok"] += 1
+                        stats["seconds"].append(seconds)
+                        stats["bytes_in"] += bytes_in
+                        stats["bytes_out"] += bytes_out
+                    else:
+                        stats["failed"] += 1
+                        print(f"❌ **{os.path.basename(src_path)}** 변환 실패: {error}")
+                    submit_next()
+    finally:
+        manifest.close()
+
+    stats["wall_seconds"] = time.time() - total_start_time
+    return stats
+
+
+def print_summary(stats: dict, workers: int):
+    wall = stats["wall_seconds"]
+    seconds = np.asarray(stats["seconds"]) * 1000
     print("-" * 40)
     print("✨ **변환 작업 요약**")
-    print(f"* 총 파일 개수: {len(avif_files)}개")
-    print(f"* 변환 성공: {len([r for r in conversion_results if r[3] == '성공'])}개")
-    print(f"* 총 소요 시간: {total_time:.4f}초")
-    
-    if any(r[3] == '성공' for r in conversion_results):
-        print("\n* **개별 파일별 소요 시간**:")
-        for original, new, time_taken, status in conversion_results:
-            if status == '성공':
-                print(f"  - {original}: {time_taken:.4f}초")
+    print(f"* 총 파일 개수: {stats['total']}개 (건너뜀 {stats['skipped']}개)")
+    print(f"* 변환 성공: {stats['ok']}개 / 실패: {stats['failed']}개")
+    print(f"* 총 소요 시간: {wall:.4f}초")
+    if len(seconds):
+        print(f"* 처리량: {stats['ok'] / max(wall, 1e-9):.2f} img/s, "
+              f"{stats['bytes_in'] / 1e6 / max(wall, 1e-9):.2f} MB/s 입력 "
+              f"(병렬 효율: {seconds.sum() / 1000 / max(wall * workers, 1e-9):.0%})")
+        print(f"* 파일당 소요 시간: p50 {np.percentile(seconds, 50):.1f}ms / p95 {np.percentile(seconds, 95):.1f}ms "
+              f"/ max {seconds.max():.1f}ms")
+        print(f"* 크기: {stats['bytes_in'] / 1e6:.1f}MB → {stats['bytes_out'] / 1e6:.1f}MB")
 
-# --- 실행 부분 ---
-# 🚨 1. 원본 AVIF 파일이 있는 경로를 지정하세요. (현재 사용하시던 경로)
-input_directory = r'C:\Users\DU\.spyder-py3\aiproject\images\product_tem' 
-
-# 🚨 2. 변환된 JPG 파일이 저장될 경로를 지정하세요. (예: input_directory 옆의 'jpg_output' 폴더)
-output_directory = r'C:\Users\DU\.spyder-py3\aiproject\images\product_jpg_tem_jpg' 
 
-# 함수 실행
-convert_avif_to_jpg_batch_ultimate(input_directory, output_directory)
\ No newline at end of file
+# --- 실행 부분 ---
+# 🚨 프로세스 풀은 워커에서 이 파일을 다시 import하므로(Windows spawn), 실행 코드는 main 가드 안에 둡니다.
+if __name__ == "__main__":
+    if not os.path.isdir(INPUT_DIR):
+        print(f"❌ '{INPUT_DIR}' 폴더가 없습니다!")
+        sys.exit()
+    stats = convert_directory(INPUT_DIR, OUTPUT_DIR, workers=WORKERS, force=FORCE)
+    print_summary(stats, WORKERS)
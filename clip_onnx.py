@@ -0,0 +1,181 @@
+# clip_onnx.py
+# CLIP 이미지 인코더를 ONNX Runtime으로 실행하는 선택적 백엔드 (utils.CLIP_BACKEND = "onnx").
+#  - export_visual(): PyTorch CLIP의 visual 타워(투영 포함)를 ONNX로 내보냄 (최초 1회, torch 필요)
+#  - ClipOnnxEncoder : InferenceSession 풀. 여러 워커 스레드가 세션을 빌려 쓰고 반납합니다.
+#  - plan_threads()  : rembg(U²-Net, 역시 ONNX Runtime)와 CLIP을 한 파이프라인에서 같이 돌릴 때
+#                      두 모델의 intra-op 스레드 합이 코어 수를 넘지 않도록 나눕니다.
+# 전처리는 CLIP PREPROCESS(짧은 변 224 bicubic → 중앙 224 crop → 정규화)를 NumPy로 그대로 구현해
+# 추론 시 torch를 import하지 않습니다. 결과 벡터는 PyTorch fp32와 같습니다. (bench_clip_onnx.py로 확인)
+
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+from utils import CLIP_MODEL_NAME, CLIP_EMBED_DIM, DEFAULT_BATCH_SIZE
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+ONNX_PATH = os.path.join("weights", f"clip_{CLIP_MODEL_NAME.replace('/', '_')}_visual.onnx")
+OPSET = 17
+INPUT_RESOLUTION = 224
+CLIP_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32).reshape(1, 3, 1, 1)
+CLIP_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32).reshape(1, 3, 1, 1)
+
+DEFAULT_POOL_SIZE = 1
+CLIP_CORE_SHARE = 0.5  # rembg와 같이 돌릴 때 CLIP에 줄 코어 비율 (나머지는 rembg)
+
+
+# -----------------------------------------------------------
+# 2. ONNX 내보내기
+# -----------------------------------------------------------
+def export_visual(onnx_path: str = ONNX_PATH, opset: int = OPSET) -> str:
+    """
+    PyTorch CLIP(fp32)의 visual 타워를 배치 차원이 가변인 ONNX 파일로 저장합니다.
+    utils의 공유 모델(int8/TorchScript 등 CLIP_* 옵션 적용)은 건드리지 않고, 내보내기 전용 fp32 모델을 따로 로드합니다.
+    """
+    import torch
+    import clip
+    model, _ = clip.load(CLIP_MODEL_NAME, device="cpu")
+    visual = model.visual.float().eval()
+
+    os.makedirs(os.path.dirname(onnx_path) or ".", exist_ok=True)
+    dummy = torch.zeros(1, 3, INPUT_RESOLUTION, INPUT_RESOLUTION, dtype=torch.float32)
+    with torch.inference_mode():
+        torch.onnx.export(visual, dummy, onnx_path, opset_version=opset,
+                          input_names=["pixel_values"], output_names=["image_embeds"],
+                          dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}})
+    print(f"✅ CLIP visual ONNX 저장: {onnx_path}")
+    return onnx_path
+
+
+# -----------------------------------------------------------
+# 3. 스레드 계획 / 세션 옵션
+# -----------------------------------------------------------
+def plan_threads(total_cores: int = None, clip_sessions: int = DEFAULT_POOL_SIZE, rembg_sessions: int = 0,
+                 clip_share: float = CLIP_CORE_SHARE) -> dict:
+    """
+    세션마다 intra-op 스레드 수를 정해 (clip_sessions × clip_threads + rembg_sessions × rembg_threads ≤ 코어 수)를 맞춥니다.
+    rembg_sessions=0이면 CLIP이 모든 코어를 씁니다. inter-op는 순차 그래프라 항상 1입니다.
+    """
+    total_cores = total_cores or os.cpu_count() or 1
+    clip_cores = total_cores if rembg_sessions == 0 else max(clip_sessions, round(total_cores * clip_share))
+    rembg_cores = max(rembg_sessions, total_cores - clip_cores) if rembg_sessions else 0
+    return {
+        "total_cores": total_cores,
+        "clip_threads": max(1, clip_cores // max(clip_sessions, 1)),
+        "rembg_threads": max(1, rembg_cores // rembg_sessions) if rembg_sessions else 0,
+        "inter_op_threads": 1,
+    }
+
+
+def session_options(intra_threads: int, inter_threads: int = 1):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = intra_threads
+    options.inter_op_num_threads = inter_threads
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    # 다른 모델과 코어를 나눠 쓰므로, 일이 없을 때 스레드가 코어를 붙잡고 스핀하지 않도록
+    options.add_session_config_entry("session.intra_op.allow_spinning", "0")
+    return options
+
+
+# -----------------------------------------------------------
+# 4. 전처리 (CLIP PREPROCESS와 동일, torch 없이)
+# -----------------------------------------------------------
+def preprocess(image: Image.Image) -> np.ndarray:
+    """PIL 이미지 → (3, 224, 224) float32. torchvision Resize(224, BICUBIC) + CenterCrop(224) + Normalize와 같은 결과"""
+    image = image.convert("RGB")
+    w, h = image.size
+    short, long = (w, h) if w <= h else (h, w)
+    new_short, new_long = INPUT_RESOLUTION, int(INPUT_RESOLUTION * long / short)
+    size = (new_short, new_long) if w <= h else (new_long, new_short)
+    if size != (w, h):
+        image = image.resize(size, Image.BICUBIC)
+    w, h = image.size
+    left = int(round((w - INPUT_RESOLUTION) / 2.0))
+    top = int(round((h - INPUT_RESOLUTION) / 2.0))
+    image = image.crop((left, top, left + INPUT_RESOLUTION, top + INPUT_RESOLUTION))
+    return np.asarray(image, dtype=np.float32).transpose(2, 0, 1) / 255.0
+
+
+# -----------------------------------------------------------
+# 5. 세션 풀 인코더
+# -----------------------------------------------------------
+class ClipOnnxEncoder:
+    def __init__(self, onnx_path: str = ONNX_PATH, pool_size: int = DEFAULT_POOL_SIZE, intra_threads: int = None):
+        """
+        pool_size    : InferenceSession 개수 (동시에 인코딩할 수 있는 스레드 수)
+        intra_threads: 세션당 intra-op 스레드 수 (기본: plan_threads로 코어를 세션 수만큼 나눔)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("ONNX 백엔드에는 onnxruntime이 필요합니다. 'pip install onnxruntime'을 실행하세요.")
+        if not os.path.exists(onnx_path):
+            export_visual(onnx_path)
+
+        intra_threads = intra_threads or plan_threads(clip_sessions=pool_size)["clip_threads"]
+        self.onnx_path = onnx_path
+        self.intra_threads = intra_threads
+        self._sessions = queue.Queue()
+        for _ in range(pool_size):
+            self._sessions.put(ort.InferenceSession(onnx_path, sess_options=session_options(intra_threads),
+                                                    providers=["CPUExecutionProvider"]))
+        self.pool_size = pool_size
+
+    @contextmanager
+    def session(self):
+        """풀에서 세션을 하나 빌립니다. (모두 사용 중이면 반납될 때까지 대기)"""
+        sess = self._sessions.get()
+        try:
+            yield sess
+        finally:
+            self._sessions.put(sess)
+
+    def encode_batch(self, pixel_values: np.ndarray) -> np.ndarray:
+        pixel_values = (pixel_values - CLIP_MEAN) / CLIP_STD
+        with self.session() as sess:
+            features = sess.run(None, {"pixel_values": np.ascontiguousarray(pixel_values, dtype=np.float32)})[0]
+        features = features.astype(np.float32, copy=False)
+        return features / np.linalg.norm(features, axis=1, keepdims=True)
+
+    def encode(self, images, batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+        """utils.images_to_vectors와 같은 규약: PIL 이미지(리스트/제너레이터) → L2 정규화된 float32 (N, 512)"""
+        chunks, batch = [], []
+        for image in images:
+            batch.append(preprocess(image))
+            if len(batch) >= batch_size:
+                chunks.append(self.encode_batch(np.stack(batch)))
+                batch.clear()
+        if batch:
+            chunks.append(self.encode_batch(np.stack(batch)))
+        if not chunks:
+            return np.empty((0, CLIP_EMBED_DIM), dtype=np.float32)
+        return np.ascontiguousarray(np.concatenate(chunks), dtype=np.float32)
+
+
+_ENCODER = None
+_ENCODER_LOCK = threading.Lock()
+
+
+def get_onnx_encoder(pool_size: int = DEFAULT_POOL_SIZE, intra_threads: int = None) -> ClipOnnxEncoder:
+    """
+    프로세스 전역에서 공유하는 ONNX CLIP 인코더.
+    intra_threads=None이면 기존 인코더를 그대로 쓰고, 값을 주었는데 기존 인코더와 다르면(예: ingest_pipeline이 rembg와
+    코어를 나눈 경우) 그 설정으로 새로 만듭니다. (이미 빌려 간 세션은 반납될 때까지 그대로 동작)
+    """
+    global _ENCODER
+    encoder = _ENCODER
+    if encoder is None or encoder.pool_size != pool_size or (intra_threads and encoder.intra_threads != intra_threads):
+        with _ENCODER_LOCK:
+            encoder = _ENCODER
+            if (encoder is None or encoder.pool_size != pool_size
+                    or (intra_threads and encoder.intra_threads != intra_threads)):
+                _ENCODER = encoder = ClipOnnxEncoder(pool_size=pool_size, intra_threads=intra_threads)
+    return encoder
@@ -1,14 +1,18 @@
 # weaviate_to_mysql_with_clear.py
-# Weaviate DB의 데이터를 MySQL로 마이그레이션하기 전에 테이블을 초기화합니다.
+# Weaviate DB의 데이터를 MySQL로 마이그레이션합니다.
+# Weaviate 읽기와 MySQL 쓰기를 별도 스레드로 파이프라인 처리하고(사이에 크기 제한 큐),
+# 스테이징 테이블에 모두 적재한 뒤 RENAME TABLE로 원자적으로 교체하므로
+# 마이그레이션 도중 실패하더라도 조회하는 쪽은 빈 테이블을 보지 않습니다.
 
 import sys
 import time
-import json
+import queue
+import threading
 import mysql.connector
-from weaviate.classes.query import MetadataQuery
 
 # utils.py에서 정의된 함수/변수 임포트 (이 파일은 로컬 환경에 맞게 정의되어 있어야 합니다)
-from utils import connect_to_weaviate, WEAVIATE_CLASS_NAME 
+from utils import connect_to_weaviate, WEAVIATE_CLASS_NAME
+from vector_codec import encode_vector
 
 # -----------------------------------------------------------
 # 1. MySQL 연결 설정
@@ -18,10 +22,18 @@ MYSQL_CONFIG = {
     'user': 'root',
     'password': '1234',
     'database': 'aiproject',
-    'port': 3305 
+    'port': 3305
 }
 
 TABLE_NAME = "product_vectors"
+STAGING_TABLE = f"{TABLE_NAME}_staging"
+OLD_TABLE = f"{TABLE_NAME}_old"
+# image_vector 저장 형식: "f32"(무손실) | "f16" | "i8" (vector_codec.py 참고, 컬럼은 BLOB이어야 함)
+VECTOR_FORMAT = "f32"
+BATCH_SIZE = 1000   # executemany 한 번에 넣을 행 수 (multi-row INSERT로 변환됨)
+QUEUE_DEPTH = 8     # 읽기 스레드가 미리 준비해 둘 최대 배치 수 (메모리 상한)
+
+_DONE = object()    # 읽기 스레드 종료 표시
 
 # -----------------------------------------------------------
 # 2. MySQL 연결 함수
@@ -35,97 +47,142 @@ def connect_to_mysql():
         sys.exit()
 
 # -----------------------------------------------------------
-# 3. MySQL 테이블 초기화 함수 (TRUNCATE)
+# 3. 스테이징 테이블 준비 / 원자적 교체
 # -----------------------------------------------------------
-def clear_mysql_table(conn):
-    """지정된 테이블의 모든 데이터를 삭제하여 초기화합니다."""
+def create_staging_table(conn):
+    """대상 테이블과 같은 구조의 빈 스테이징 테이블을 만듭니다. (이전 실행의 잔여물은 삭제)"""
     cursor = conn.cursor()
-    # TRUNCATE TABLE은 DELETE FROM보다 빠르고 효율적입니다.
-    sql = f"TRUNCATE TABLE {TABLE_NAME};" 
-    print(f"\n🧹 MySQL 테이블 '{TABLE_NAME}' 초기화 중...")
-    
     try:
-        cursor.execute(sql)
-        conn.commit()
-        print("✅ 테이블 초기화 완료.")
-    except mysql.connector.Error as err:
-        print(f"❌ 테이블 초기화 실패: {err}")
-        # 초기화 실패 시 롤백 (만약을 대비)
-        conn.rollback() 
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        cursor.execute(f"CREATE TABLE {STAGING_TABLE} LIKE {TABLE_NAME}")
+        print(f"🧹 스테이징 테이블 '{STAGING_TABLE}' 준비 완료.")
+    finally:
+        cursor.close()
+
+
+def swap_in_staging_table(conn):
+    """
+    RENAME TABLE은 여러 테이블 이름 변경을 하나의 원자적 연산으로 수행하므로,
+    조회하는 쪽은 이전 테이블 또는 새 테이블 중 하나만 보게 됩니다.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {OLD_TABLE}")
+        cursor.execute(
+            f"RENAME TABLE {TABLE_NAME} TO {OLD_TABLE}, {STAGING_TABLE} TO {TABLE_NAME}"
+        )
+        cursor.execute(f"DROP TABLE {OLD_TABLE}")
+        print(f"🔁 '{STAGING_TABLE}' → '{TABLE_NAME}' 원자적 교체 완료.")
     finally:
         cursor.close()
 
+
+def drop_staging_table(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+    finally:
+        cursor.close()
+
+# -----------------------------------------------------------
+# 4. Weaviate 읽기 스레드 (생산자)
+# -----------------------------------------------------------
+def read_weaviate_batches(wv_collection, out_queue):
+    """Weaviate의 모든 객체를 벡터와 함께 읽어 BATCH_SIZE 행 단위로 큐에 넣습니다."""
+    try:
+        batch = []
+        for obj in wv_collection.iterator(include_vector=True):
+            properties = obj.properties
+            vector_data = obj.vector.get('default')
+            image_vector_blob = encode_vector(vector_data, VECTOR_FORMAT) if vector_data is not None else None
+
+            batch.append((properties.get("product_id"), properties.get("imagePath"),
+                          image_vector_blob, str(obj.uuid)))
+            if len(batch) >= BATCH_SIZE:
+                out_queue.put(batch)  # 큐가 가득 차면 쓰기 스레드가 따라올 때까지 대기
+                batch = []
+        if batch:
+            out_queue.put(batch)
+        out_queue.put(_DONE)
+    except Exception as e:
+        out_queue.put(e)
+
 # -----------------------------------------------------------
-# 4. 데이터 마이그레이션 실행
+# 5. 데이터 마이그레이션 실행 (소비자: MySQL 쓰기)
 # -----------------------------------------------------------
-print(f"\n🔄 Weaviate to MySQL 마이그레이션 시작...")
-start_time = time.time()
-total_migrated = 0
-
-# Weaviate 연결
-try:
-    wv_client = connect_to_weaviate()
-    wv_collection = wv_client.collections.get(WEAVIATE_CLASS_NAME)
-except Exception as e:
-    print(f"❌ Weaviate 연결 실패: {e}")
-    sys.exit()
-
-# MySQL 연결
-mysql_conn = connect_to_mysql()
-# 📌 마이그레이션 시작 전 테이블 초기화
-clear_mysql_table(mysql_conn) 
-mysql_cursor = mysql_conn.cursor()
-
-
-try:
-    # 📌 Weaviate의 모든 객체를 벡터를 포함하여 순회합니다.
-    print(f"🔍 Weaviate에서 데이터 조회 및 삽입 시작...")
-    
-    for obj in wv_collection.iterator(include_vector=True):
-        
-        # Weaviate 데이터 추출
-        properties = obj.properties
-        uuid = str(obj.uuid)
-        vector_data = obj.vector.get('default') 
-
-        # MySQL에 삽입할 데이터 준비
-        product_id = properties.get("product_id")
-        image_path = properties.get("imagePath")
-        
-        if vector_data is not None:
-            image_vector_json = json.dumps(vector_data) 
-        else:
-            image_vector_json = None
-
-        # MySQL 삽입 쿼리 (UUID를 PRIMARY KEY로 사용)
+def migrate():
+    print(f"\n🔄 Weaviate to MySQL 마이그레이션 시작... (배치 {BATCH_SIZE}행)")
+    start_time = time.time()
+    total_migrated = 0
+
+    # Weaviate 연결
+    try:
+        wv_client = connect_to_weaviate()
+        wv_collection = wv_client.collections.get(WEAVIATE_CLASS_NAME)
+    except Exception as e:
+        print(f"❌ Weaviate 연결 실패: {e}")
+        sys.exit()
+
+    # MySQL 연결
+    mysql_conn = connect_to_mysql()
+    mysql_cursor = None
+
+    try:
+        # 📌 대상 테이블은 건드리지 않고, 스테이징 테이블에 적재
+        create_staging_table(mysql_conn)
+        mysql_cursor = mysql_conn.cursor()
+
         sql = f"""
-        INSERT INTO {TABLE_NAME} 
+        INSERT INTO {STAGING_TABLE}
         (product_id, image_path, image_vector, weaviate_uuid)
-        VALUES (%s, %s, %s, %s);
+        VALUES (%s, %s, %s, %s)
         """
-        
-        # 쿼리 실행
-        data = (product_id, image_path, image_vector_json, uuid)
-        mysql_cursor.execute(sql, data)
-        
-        total_migrated += 1
-        if total_migrated % 100 == 0:
+
+        batches = queue.Queue(maxsize=QUEUE_DEPTH)
+        reader = threading.Thread(target=read_weaviate_batches, args=(wv_collection, batches), daemon=True)
+        reader.start()
+        print(f"🔍 Weaviate 조회(읽기 스레드)와 MySQL 삽입을 동시에 진행합니다...")
+
+        write_seconds = 0.0
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+
+            write_start = time.time()
+            mysql_cursor.executemany(sql, batch)
             mysql_conn.commit()
-            print(f"   ... {total_migrated}개 객체 커밋됨.")
-            
-    # 최종 커밋
-    mysql_conn.commit()
-    end_time = time.time()
-    
-    print(f"\n✅ 마이그레이션 완료! 총 {total_migrated}개 객체를 {end_time - start_time:.4f}초 만에 옮겼습니다.")
-
-except Exception as e:
-    print(f"\n❌ 데이터 마이그레이션 중 오류 발생: {e}")
-    mysql_conn.rollback() 
-
-finally:
-    # 연결 종료
-    mysql_cursor.close()
-    mysql_conn.close()
-    wv_client.close()
-    print("👋 모든 DB 연결 종료.")
\ No newline at end of file
+            write_seconds += time.time() - write_start
+
+            total_migrated += len(batch)
+            print(f"   ... {total_migrated}개 객체 적재됨. "
+                  f"({total_migrated / max(time.time() - start_time, 1e-9):.0f} rows/s)")
+
+        reader.join()
+
+        # 📌 모두 적재된 뒤에만 교체
+        swap_in_staging_table(mysql_conn)
+        end_time = time.time()
+
+        print(f"\n✅ 마이그레이션 완료! 총 {total_migrated}개 객체를 {end_time - start_time:.4f}초 만에 옮겼습니다.")
+        print(f"   (MySQL 쓰기 {write_seconds:.4f}초, 처리량 {total_migrated / max(end_time - start_time, 1e-9):.0f} rows/s)")
+
+    except Exception as e:
+        print(f"\n❌ 데이터 마이그레이션 중 오류 발생: {e}")
+        print(f"   기존 '{TABLE_NAME}' 테이블은 변경되지 않았습니다.")
+        mysql_conn.rollback()
+        drop_staging_table(mysql_conn)
+
+    finally:
+        # 연결 종료
+        if mysql_cursor is not None:
+            mysql_cursor.close()
+        mysql_conn.close()
+        wv_client.close()
+        print("👋 모든 DB 연결 종료.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,171 @@
+# detail_parser.py
+# 다나와 크롤링 CSV의 '상세정보' 문자열 → JSON 변환 공용 모듈.
+# (convert_json.py / image_path_name.py에 복사되어 있던 parse_text를 하나로 모았습니다.)
+#  - 정규식은 모듈 로드 시 한 번만 컴파일하고, 괄호 제거는 str.lstrip/rstrip으로 처리
+#  - pd.read_csv(chunksize=...)로 읽은 청크를 프로세스 풀에서 병렬 변환
+#  - 결과는 청크 순서대로 CSV(append) 또는 Parquet(ParquetWriter)에 바로 기록 → 전체 DataFrame을 메모리에 올리지 않음
+
+import os
+import re
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+TEXT_COLUMN = "상세정보"
+JSON_COLUMN = "상세정보_json"
+CSV_ENCODING = "utf-8-sig"
+DEFAULT_CHUNK_ROWS = 20000
+
+_DATE_PATTERN = re.compile(r'(\d{4})년\s*(\d{1,2})월(?:\s*(\d{1,2})일)?')
+
+
+# -----------------------------------------------------------
+# 2. 상세정보 파서
+# -----------------------------------------------------------
+def clean_value(v: str) -> str:
+    """앞뒤 공백과 여는/닫는 괄호 제거"""
+    return v.strip().lstrip('([').rstrip(')]').strip()
+
+
+def parse_value(v: str):
+    v = clean_value(v)
+
+    # 콤마 → 리스트
+    if ',' in v:
+        return [item.strip() for item in v.split(',') if item.strip()]
+
+    # 날짜 → YYYY-MM(-DD)
+    date = _DATE_PATTERN.search(v)
+    if date:
+        y, m, d = int(date.group(1)), int(date.group(2)), date.group(3)
+        if d:
+            return f"{y:04d}-{m:02d}-{int(d):02d}"
+        return f"{y:04d}-{m:02d}"
+
+    return v
+
+
+def parse_text(text) -> dict:
+    """"키: 값 / 키: 값" 형식의 상세정보 문자열 → dict"""
+    result = {}
+    if not isinstance(text, str):
+        return result
+
+    # "/(" 또는 " (/" 같은 패턴 정리
+    text = text.replace("(/", "/").replace(" (/", "/").replace("/(", "/")
+
+    for item in text.split('/'):
+        if ':' in item:
+            key, val = item.split(':', 1)
+            result[key.strip()] = parse_value(val)
+    return result
+
+
+def details_to_json(series: pd.Series) -> list:
+    """상세정보 컬럼 → JSON 문자열 리스트 (NaN은 기존처럼 "nan" 문자열로 취급되어 "{}")"""
+    return [json.dumps(parse_text(text), ensure_ascii=False) for text in series.astype(str).tolist()]
+
+
+def convert_chunk(df: pd.DataFrame, transform=None) -> pd.DataFrame:
+    """청크 하나: (transform) → '상세정보_json' 생성 → 원본 '상세정보' 삭제"""
+    if transform is not None:
+        df = transform(df)
+    df[JSON_COLUMN] = details_to_json(df[TEXT_COLUMN])
+    return df.drop(columns=[TEXT_COLUMN])
+
+
+# -----------------------------------------------------------
+# 3. 청크 병렬 처리 (순서 유지, 제출 개수 제한)
+# -----------------------------------------------------------
+def map_chunks(fn, chunks, *args, workers: int = None, max_in_flight: int = None):
+    """
+    chunks의 각 청크에 fn(chunk, *args)를 프로세스 풀에서 실행하고 결과를 입력 순서대로 yield합니다.
+    동시에 제출해 두는 청크는 max_in_flight개(기본: workers × 2)까지라 입력이 아무리 커도 메모리가 일정합니다.
+    workers=1이면 풀 없이 현재 프로세스에서 실행합니다. (fn은 모듈 최상위 함수여야 합니다)
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield fn(chunk, *args)
+        return
+
+    max_in_flight = max_in_flight or workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for chunk in chunks:
+            in_flight.append(pool.submit(fn, chunk, *args))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+# -----------------------------------------------------------
+# 4. CSV → CSV / Parquet 스트리밍 변환
+# -----------------------------------------------------------
+class _ParquetSink:
+    def __init__(self, path: str):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet 출력에는 pyarrow가 필요합니다. 'pip install pyarrow'를 실행하세요.")
+        self._pa, self._pq = pa, pq
+        self.path = path
+        self.writer = None
+
+    def write(self, df: pd.DataFrame):
+        table = self._pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = self._pq.ParquetWriter(self.path, table.schema)
+        else:
+            table = table.cast(self.writer.schema)  # 청크마다 추론 타입이 달라도(전부 NaN 등) 첫 청크 스키마로 통일
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _CsvSink:
+    def __init__(self, path: str):
+        self.path = path
+        self.header_written = False
+
+    def write(self, df: pd.DataFrame):
+        # QUOTE_ALL: JSON 문자열 내 쉼표 때문에 행이 나뉘는 것을 방지
+        df.to_csv(self.path, mode="a" if self.header_written else "w", header=not self.header_written,
+                  index=False, encoding=CSV_ENCODING, sep=',', quoting=csv.QUOTE_ALL)
+        self.header_written = True
+
+    def close(self):
+        pass
+
+
+def convert_csv(input_path: str, output_path: str, transform=None, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                workers: int = None, encoding: str = CSV_ENCODING) -> dict:
+    """
+    input_path CSV의 '상세정보'를 JSON으로 변환해 output_path(.csv 또는 .parquet)에 저장합니다.
+    transform(df) -> df 는 청크마다 워커에서 추가로 실행할 정리 함수입니다. (모듈 최상위 함수여야 함)
+    """
+    sink = _ParquetSink(output_path) if output_path.lower().endswith(".parquet") else _CsvSink(output_path)
+    stats = {"rows": 0, "chunks": 0, "seconds": 0.0}
+    start_time = time.time()
+    try:
+        chunks = pd.read_csv(input_path, encoding=encoding, chunksize=chunk_rows)
+        for df in map_chunks(convert_chunk, chunks, transform, workers=workers):
+            sink.write(df)
+            stats["rows"] += len(df)
+            stats["chunks"] += 1
+            print(f"    ... {stats['rows']}행 변환 ({stats['rows'] / (time.time() - start_time):.0f}행/초)")
+    finally:
+        sink.close()
+    stats["seconds"] = time.time() - start_time
+    return stats
@@ -0,0 +1,118 @@
+# embedder.py
+# 마스킹(배경 제거) + CLIP 임베딩 공용 라이브러리.
+# REMBG_clip_faiss.py / sam_clip_faiss.py / sam_clip_nofaiss.py에 복사되어 있던
+# "이미지 로드 → 마스크 → 디버그 PNG 저장 → CLIP 임베딩" 로직을 하나로 모았습니다.
+#
+#   masker: "none" | "rembg" | "sam_box" | segmenters.py의 세그멘터 이름 ("sam_vit_b", "rembg_u2netp" 등)
+#   - 세그멘터 모델은 임베딩 캐시에 없는 이미지가 있을 때만 처음 로드합니다. (모두 캐시 적중이면 SAM/rembg 로드 없음)
+#   - 디버그 이미지(마스킹 결과 PNG)는 기본적으로 저장하지 않으며, debug_dir을 주면 백그라운드 스레드에서 저장합니다.
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from embedding_cache import EmbeddingCache, embed_paths_cached
+from segmenters import DEFAULT_MARGIN_RATIO, get_segmenter, segmenter_mode
+
+DEFAULT_BATCH_SIZE = 32
+MAX_PENDING_DEBUG_WRITES = 64   # 저장 대기 중인 디버그 이미지 수 상한 (메모리 보호)
+
+
+class _DebugWriter:
+    """마스킹 결과 PNG를 백그라운드 스레드에서 저장합니다. 대기 작업이 많으면 submit이 잠시 기다립니다."""
+
+    def __init__(self, debug_dir: str):
+        self.debug_dir = debug_dir
+        os.makedirs(debug_dir, exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-writer")
+        self._slots = threading.BoundedSemaphore(MAX_PENDING_DEBUG_WRITES)
+
+    def submit(self, image_path: str, image: Image.Image):
+        file_name_without_ext = os.path.splitext(os.path.basename(image_path))[0]
+        save_path = os.path.join(self.debug_dir, f"{file_name_without_ext}_masked.png")
+        self._slots.acquire()
+        future = self._pool.submit(image.save, save_path)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+
+class Embedder:
+    def __init__(self, masker: str = "none", model_type: str = "vit_h",
+                 margin_ratio: float = DEFAULT_MARGIN_RATIO, batch_size: int = DEFAULT_BATCH_SIZE,
+                 debug_dir: str = None, cache: EmbeddingCache = None, use_cache: bool = True):
+        """
+        masker      : "none" / "rembg"(= "rembg_u2net") / "sam_box"(= f"sam_{model_type}") / 세그멘터 이름
+        model_type  : masker="sam_box"일 때 SAM 백본 ("vit_h" / "vit_l" / "vit_b" / "vit_t")
+        margin_ratio: SAM 박스 프롬프트 여백
+        debug_dir   : 주면 마스킹 결과를 <debug_dir>/<파일명>_masked.png로 비동기 저장 (기본: 저장 안 함)
+        use_cache   : False면 임베딩 캐시를 쓰지 않고 항상 계산
+        """
+        if masker == "rembg":
+            masker = "rembg_u2net"
+        elif masker == "sam_box":
+            masker = f"sam_{model_type}"
+        self.masker = masker
+        self.margin_ratio = margin_ratio
+        self.batch_size = batch_size
+        self.use_cache = use_cache
+        self.cache = cache if cache is not None or not use_cache else EmbeddingCache()
+
+        self._segmenter = None
+        self._segmenter_lock = threading.Lock()
+        self._debug = _DebugWriter(debug_dir) if debug_dir else None
+
+    @property
+    def mode(self) -> str:
+        """임베딩 캐시 키에 들어가는 전처리 모드 (모델 로드 없이 계산)"""
+        if self.masker == "none":
+            from utils import preprocess_mode
+            return preprocess_mode("none")
+        return segmenter_mode(self.masker, margin_ratio=self.margin_ratio)
+
+    @property
+    def segmenter(self):
+        if self._segmenter is None:
+            with self._segmenter_lock:
+                if self._segmenter is None:
+                    kwargs = {"margin_ratio": self.margin_ratio} if self.masker.startswith("sam_") or self.masker == "mobile_sam" else {}
+                    self._segmenter = get_segmenter(self.masker, **kwargs)
+        return self._segmenter
+
+    # -----------------------------------------------------------
+    # 마스킹 / 임베딩
+    # -----------------------------------------------------------
+    def mask(self, image_path: str) -> Image.Image:
+        """마스킹된 RGB 이미지 1장 (masker="none"이면 원본 RGB)"""
+        if self.masker == "none":
+            from utils import load_image
+            masked = load_image(image_path)  # 긴 변 MAX_IMAGE_SIDE로 축소 디코딩
+        else:
+            masked = self.segmenter.segment(image_path)
+        if self._debug is not None:
+            self._debug.submit(image_path, masked)
+        return masked
+
+    def compute(self, image_paths) -> "np.ndarray":
+        """캐시를 거치지 않고 마스킹 + CLIP 배치 임베딩 (L2 정규화된 float32 (N, 512))"""
+        from utils import images_to_vectors
+        # 제너레이터로 넘기므로 마스킹된 이미지는 CLIP 배치 하나 분량만 메모리에 올라감
+        return images_to_vectors((self.mask(p) for p in image_paths), batch_size=self.batch_size)
+
+    def embed_paths(self, image_paths) -> "np.ndarray":
+        """배치 API: 경로 목록 → (N, 512). 캐시에 없는 이미지만 마스킹/임베딩합니다."""
+        image_paths = list(image_paths)
+        if not self.use_cache:
+            return self.compute(image_paths)
+        return embed_paths_cached(image_paths, self.mode, self.compute, cache=self.cache)
+
+    def embed_path(self, image_path: str):
+        return self.embed_paths([image_path])[0]
+
+    def close(self):
+        """대기 중인 디버그 이미지 저장이 끝날 때까지 기다립니다."""
+        if self._debug is not None:
+            self._debug.close()
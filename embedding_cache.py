@@ -0,0 +1,262 @@
+# embedding_cache.py
+# 이미지 바이트 해시 + 모델 이름 + 전처리 모드(rembg / SAM box / none)를 키로 하는 디스크 임베딩 캐시입니다.
+# 벡터는 memmap으로 읽을 수 있는 float32 raw 파일(vectors.f32, 압축 후에는 vectors.<세대>.f32)에 행 단위로 추가하고,
+# 키 → 행 번호 매핑과 현재 벡터 파일 이름은 작은 JSON 인덱스(index.json)에 저장합니다.
+# (한 번에 하나의 프로세스만 캐시에 쓰는 것을 가정합니다.)
+
+import os
+import json
+import time
+import hashlib
+import numpy as np
+
+DEFAULT_CACHE_DIR = "cache/embeddings"
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.json"
+HASH_CHUNK_SIZE = 1 << 20
+
+# 축출 설정 (prune()이 embed_paths_cached / ingest_pipeline 끝에서 자동 적용)
+MAX_CACHE_BYTES = 2 * 1024 ** 3   # 벡터 파일 최대 크기 (512차원 float32 기준 약 100만 개)
+MAX_AGE_DAYS = 90                 # 이 기간 동안 적중하지 않은 항목은 삭제
+PRUNE_TARGET_RATIO = 0.9          # 용량 초과 시 MAX_CACHE_BYTES의 이 비율까지 줄임 (매 호출마다 압축하지 않도록)
+PRUNE_INTERVAL_DAYS = 1.0         # 나이 기준 축출은 이 간격으로만 수행 (압축은 파일 전체를 다시 씀)
+ACCESS_RESOLUTION_SECONDS = 3600  # 접근 시각 기록 단위: 기록된 값이 이보다 오래됐을 때만 인덱스를 다시 씀
+
+
+def file_digest(path: str) -> str:
+    """파일 내용(바이트)의 sha256 해시. 경로/mtime이 아니라 내용 기준이므로 파일을 옮겨도 캐시가 유지됩니다."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(digest: str, model_name: str, mode: str) -> str:
+    """이미지 해시 + 모델 이름 + 전처리 모드를 하나의 캐시 키로 합칩니다."""
+    return hashlib.sha256(f"{digest}|{model_name}|{mode}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, dim: int = 512):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.index_path = os.path.join(cache_dir, INDEX_FILE)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.entries = {}   # key -> {"row": int, "created": float, "last_access": float}
+        self.rows = 0
+        self.vectors_file = VECTORS_FILE  # 인덱스가 가리키는 벡터 파일 (압축할 때마다 새 세대 파일로 바뀜)
+        self.last_prune = 0.0
+        self._mmap = None
+        self._dirty = False
+
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("dim") != dim:
+                raise ValueError(f"캐시 차원 불일치: index={index.get('dim')}, 요청={dim}")
+            self.entries = index["entries"]
+            self.rows = index["rows"]
+            self.vectors_file = index.get("vectors_file", VECTORS_FILE)
+            self.last_prune = index.get("last_prune", 0.0)
+        self._remove_stale_files()
+        self._recover()
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.cache_dir, self.vectors_file)
+
+    def _remove_stale_files(self):
+        """인덱스가 가리키지 않는 벡터 파일(압축 도중 중단된 새 세대 또는 교체 후 못 지운 이전 세대)을 지웁니다."""
+        for name in os.listdir(self.cache_dir):
+            is_vectors = name.startswith("vectors.") and (name.endswith(".f32") or name.endswith(".tmp"))
+            if is_vectors and name != self.vectors_file:
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _recover(self):
+        """
+        put_many는 벡터 파일에 먼저 쓰고 save()에서 인덱스를 쓰므로, 그 사이에 중단되면 파일이 인덱스보다 길어집니다.
+        인덱스에 없는 꼬리 행은 잘라냅니다. (그대로 두면 다음 추가분의 행 번호가 밀려 다른 이미지 벡터를 반환)
+        압축(_compact)은 새 세대 파일에 쓰고 인덱스 교체로 전환하므로 기존 행 번호가 바뀐 파일을 읽는 일은 없습니다.
+        파일이 인덱스보다 짧은 경우(외부에서 잘림 등)에는 파일에 없는 행을 가리키는 항목만 버립니다.
+        """
+        row_bytes = self.dim * 4
+        size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if size // row_bytes < self.rows:
+            before = len(self.entries)
+            self.rows = size // row_bytes
+            self.entries = {k: e for k, e in self.entries.items() if e["row"] < self.rows}
+            self._dirty = True
+            print(f"⚠️ 임베딩 캐시: 벡터 파일에 없는 항목 {before - len(self.entries)}개를 버렸습니다.")
+        if size > self.rows * row_bytes:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(self.rows * row_bytes)
+            print(f"⚠️ 임베딩 캐시: 인덱스에 없는 벡터 {(size - self.rows * row_bytes) / row_bytes:.0f}행을 잘라냈습니다.")
+
+    # -----------------------------------------------------------
+    # 조회 / 저장
+    # -----------------------------------------------------------
+    def _vectors(self) -> np.ndarray:
+        if self._mmap is None or self._mmap.shape[0] < self.rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r",
+                                   shape=(self.rows, self.dim))
+        return self._mmap
+
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        # 접근 시각은 ACCESS_RESOLUTION_SECONDS 단위로 기록: 그보다 오래된 값이 바뀔 때만 다음 save()에서 인덱스를 다시 씀
+        # (같은 시간대에 반복 적중하는 실행은 인덱스를 다시 쓰지 않고, LRU/나이 축출에는 충분한 정밀도)
+        now = time.time()
+        if now - entry["last_access"] >= ACCESS_RESOLUTION_SECONDS:
+            self._dirty = True
+        entry["last_access"] = now
+        return np.array(self._vectors()[entry["row"]])
+
+    def put_many(self, keys, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if len(keys) != len(vectors):
+            raise ValueError("keys와 vectors의 개수가 다릅니다.")
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        now = time.time()
+        for i, key in enumerate(keys):
+            self.entries[key] = {"row": self.rows + i, "created": now, "last_access": now}
+        self.rows += len(keys)
+        self._dirty = True
+
+    def put(self, key: str, vector):
+        self.put_many([key], np.asarray(vector))
+
+    def save(self):
+        """인덱스를 임시 파일에 쓴 뒤 교체하여, 도중에 중단되어도 기존 인덱스가 깨지지 않게 합니다."""
+        if not self._dirty:
+            return
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "rows": self.rows, "vectors_file": self.vectors_file,
+                       "last_prune": self.last_prune, "entries": self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    # -----------------------------------------------------------
+    # 축출 (용량 / 나이 기준) 및 압축
+    # -----------------------------------------------------------
+    def evict(self, max_bytes: int = None, max_age_days: float = None):
+        """
+        max_age_days보다 오래 사용되지 않은 항목을 지우고, 남은 크기가 max_bytes를 넘으면
+        가장 오래전에 사용된 항목부터 지웁니다. 이후 벡터 파일을 살아남은 행만으로 다시 씁니다.
+        """
+        before = len(self.entries)
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            self.entries = {k: e for k, e in self.entries.items() if e["last_access"] >= cutoff}
+
+        if max_bytes is not None:
+            max_entries = max_bytes // (self.dim * 4)
+            if len(self.entries) > max_entries:
+                by_recent = sorted(self.entries.items(), key=lambda kv: kv[1]["last_access"], reverse=True)
+                self.entries = dict(by_recent[:max_entries])
+
+        removed = before - len(self.entries)
+        self.last_prune = time.time()
+        self._dirty = True
+        if removed or len(self.entries) < self.rows:
+            self._compact()
+        else:
+            self.save()
+        return removed
+
+    def prune(self, max_bytes: int = MAX_CACHE_BYTES, max_age_days: float = MAX_AGE_DAYS) -> int:
+        """
+        실행 끝에 부르는 축출 + 저장. 용량이 max_bytes를 넘으면 PRUNE_TARGET_RATIO까지 줄이고,
+        나이 기준 축출은 PRUNE_INTERVAL_DAYS마다 한 번만 수행합니다. (해당 없으면 save()만)
+        """
+        over_size = max_bytes is not None and len(self.entries) * self.dim * 4 > max_bytes
+        due = max_age_days is not None and time.time() - self.last_prune >= PRUNE_INTERVAL_DAYS * 86400
+        if not over_size and not due:
+            self.save()
+            return 0
+        removed = self.evict(max_bytes=int(max_bytes * PRUNE_TARGET_RATIO) if over_size else None,
+                             max_age_days=max_age_days if due else None)
+        if removed:
+            print(f"    🧹 임베딩 캐시: {removed}개 축출 (남은 항목 {len(self.entries)}개)")
+        return removed
+
+    def _compact(self):
+        """
+        살아남은 행만 새 세대 파일(vectors.<n>.f32)에 쓰고, 인덱스를 원자적으로 교체한 뒤 이전 파일을 지웁니다.
+        어느 단계에서 중단되어도 디스크의 인덱스는 자신과 짝이 맞는 벡터 파일을 가리킵니다.
+        """
+        keys = sorted(self.entries, key=lambda k: self.entries[k]["row"])
+        rows = np.array([self.entries[k]["row"] for k in keys], dtype=np.int64)
+        kept = np.array(self._vectors()[rows]) if len(rows) else np.empty((0, self.dim), np.float32)
+        self._mmap = None
+
+        old_path = self.vectors_path
+        generation = int(self.vectors_file.split(".")[1]) + 1 if self.vectors_file.count(".") == 2 else 1
+        new_file = f"vectors.{generation}.f32"
+        tmp_path = os.path.join(self.cache_dir, new_file + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(np.ascontiguousarray(kept, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.cache_dir, new_file))
+
+        for new_row, key in enumerate(keys):
+            self.entries[key]["row"] = new_row
+        self.rows = len(keys)
+        self.vectors_file = new_file
+        self._dirty = True
+        self.save()  # 이 시점부터 인덱스가 새 파일을 가리킴
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# -----------------------------------------------------------
+# 경로 목록 → 임베딩 (캐시 적중분은 해시만, 누락분만 계산)
+# -----------------------------------------------------------
+def embed_paths_cached(paths, mode: str, compute_fn, cache: EmbeddingCache = None,
+                       model_name: str = None) -> np.ndarray:
+    """
+    paths의 임베딩을 (N, dim) float32 배열로 반환합니다.
+    캐시에 없는 경로만 모아 compute_fn(missing_paths) -> (M, dim) 배열로 한 번에 계산하고 캐시에 추가합니다.
+    """
+    if model_name is None:
+        from utils import clip_model_id
+        model_name = clip_model_id()  # int8 등 정밀도 옵션이 다르면 다른 키
+    if cache is None:
+        cache = EmbeddingCache()
+
+    keys = [make_key(file_digest(p), model_name, mode) for p in paths]
+    result = np.empty((len(paths), cache.dim), dtype=np.float32)
+
+    missing = []
+    for i, key in enumerate(keys):
+        vector = cache.get(key)
+        if vector is None:
+            missing.append(i)
+        else:
+            result[i] = vector
+
+    if missing:
+        computed = np.asarray(compute_fn([paths[i] for i in missing]), dtype=np.float32)
+        result[missing] = computed
+        # 같은 내용의 파일이 여러 번 나와도 한 번만 저장
+        new_keys, new_rows, seen = [], [], set()
+        for j, i in enumerate(missing):
+            if keys[i] not in cache.entries and keys[i] not in seen:
+                seen.add(keys[i])
+                new_keys.append(keys[i])
+                new_rows.append(computed[j])
+        if new_keys:
+            cache.put_many(new_keys, np.stack(new_rows))
+
+    cache.prune()
+    print(f"    🗃️ 임베딩 캐시: {len(paths) - len(missing)}개 적중 / {len(missing)}개 계산 (mode={mode})")
+    return result
@@ -0,0 +1,201 @@
+# faiss_store.py
+# 디스크에 저장되는 FAISS 상품 인덱스.
+#  - 벡터 인덱스: faiss.write_index로 <prefix>.faiss에 저장 (검색 시 mmap으로 로드)
+#  - 메타데이터: <prefix>.meta.json에 FAISS id → (product_id, imagePath) 매핑 저장
+#  - IndexIDMap2(IVF 계열은 자체 id + direct map)로 상품 단위 추가/삭제 및 id로 벡터 복원(reconstruct)을 지원합니다.
+#  - build_index()로 Flat 외에 IVF / HNSW / PQ / OPQ 근사 인덱스를 만들 수 있습니다. (bench_ann.py로 recall/지연 비교)
+
+import os
+import json
+import math
+import numpy as np
+import faiss
+
+DEFAULT_INDEX_PREFIX = "cache/faiss/rembg_clip"
+
+# 자주 쓰는 인덱스 spec 예시 (faiss.index_factory 문자열, "IVFauto"는 데이터 크기로 nlist 자동 결정)
+#   "Flat"                 : 정확 검색 (기준선)
+#   "IVFauto,Flat"         : 역색인 + 원본 벡터, nprobe로 속도/정확도 조절
+#   "HNSW32"               : 그래프 인덱스, efSearch로 조절 (삭제 미지원 → 삭제 시 남은 벡터로 재구축)
+#   "IVFauto,PQ64"         : 역색인 + 곱양자화(벡터당 64바이트)
+#   "OPQ64,IVFauto,PQ64"   : 회전(OPQ) 후 PQ → 같은 메모리에서 recall 향상
+DEFAULT_INDEX_SPEC = "Flat"
+METRICS = {"ip": faiss.METRIC_INNER_PRODUCT, "l2": faiss.METRIC_L2}
+DEFAULT_TRAIN_SIZE = 100_000
+
+
+def auto_nlist(n_vectors: int) -> int:
+    """IVF 리스트 수 경험칙: 약 4·sqrt(N), 리스트당 학습 샘플이 39개 이상 되도록 제한."""
+    return max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // 39 or 1))
+
+
+def build_index(dim: int, spec: str = DEFAULT_INDEX_SPEC, metric: str = "ip",
+                train_vectors: np.ndarray = None, train_size: int = DEFAULT_TRAIN_SIZE, n_total: int = None):
+    """
+    spec 문자열로 FAISS 인덱스를 만들고, 학습이 필요한 인덱스(IVF/PQ/OPQ)는 train_vectors 샘플로 학습합니다.
+    n_total은 "IVFauto"의 nlist 계산에 쓰는 예상 전체 벡터 수입니다. (기본: 학습 벡터 수)
+    """
+    if "IVFauto" in spec:
+        n_total = n_total or (len(train_vectors) if train_vectors is not None else 0)
+        spec = spec.replace("IVFauto", f"IVF{auto_nlist(n_total)}")
+    index = faiss.index_factory(dim, spec, METRICS[metric])
+
+    if not index.is_trained:
+        if train_vectors is None or len(train_vectors) == 0:
+            raise ValueError(f"'{spec}' 인덱스는 학습 데이터가 필요합니다.")
+        train_vectors = np.ascontiguousarray(train_vectors, dtype=np.float32)
+        if len(train_vectors) > train_size:
+            sample = np.random.default_rng(0).choice(len(train_vectors), train_size, replace=False)
+            train_vectors = train_vectors[sample]
+        index.train(train_vectors)
+    return index
+
+
+def set_search_params(index, nprobe: int = None, ef_search: int = None):
+    """IVF의 nprobe, HNSW의 efSearch를 설정합니다. (IDMap/OPQ 등으로 감싼 인덱스도 처리)"""
+    params = faiss.ParameterSpace()
+    if nprobe is not None and faiss.try_extract_index_ivf(index) is not None:
+        params.set_index_parameter(index, "nprobe", nprobe)
+    if ef_search is not None:
+        try:
+            params.set_index_parameter(index, "efSearch", ef_search)
+        except RuntimeError:
+            pass  # HNSW가 아닌 인덱스
+
+
+def _read_index(path: str, mmap: bool):
+    if not mmap:
+        return faiss.read_index(path)
+    try:
+        # 벡터 데이터를 메모리로 복사하지 않고 파일을 그대로 매핑 (검색 전용)
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # 인덱스 종류/FAISS 버전에 따라 mmap을 지원하지 않으면 일반 로드
+        return faiss.read_index(path)
+
+
+class FaissProductIndex:
+    def __init__(self, dim: int = 512, index=None, meta: dict = None, next_id: int = 0,
+                 spec: str = DEFAULT_INDEX_SPEC, nprobe: int = None, ef_search: int = None):
+        self.dim = dim
+        self.spec = spec
+        # 학습이 필요한 spec이면 첫 add() 때 추가되는 벡터로 학습하여 만듭니다.
+        self.index = index
+        if self.index is None and spec == "Flat":
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.meta = meta if meta is not None else {}   # int id -> {"product_id": ..., "imagePath": ...}
+        self.next_id = next_id
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+
+    # -----------------------------------------------------------
+    # 저장 / 로드
+    # -----------------------------------------------------------
+    def save(self, prefix: str = DEFAULT_INDEX_PREFIX):
+        os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+        # 임시 파일에 쓴 뒤 교체하여, 쓰는 도중 중단되어도 기존 인덱스가 깨지지 않게 합니다.
+        faiss.write_index(self.index, prefix + ".faiss.tmp")
+        with open(prefix + ".meta.json.tmp", "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "spec": self.spec, "next_id": self.next_id,
+                       "meta": {str(k): v for k, v in self.meta.items()}}, f, ensure_ascii=False)
+        os.replace(prefix + ".faiss.tmp", prefix + ".faiss")
+        os.replace(prefix + ".meta.json.tmp", prefix + ".meta.json")
+
+    @classmethod
+    def load(cls, prefix: str = DEFAULT_INDEX_PREFIX, mmap: bool = True, nprobe: int = None, ef_search: int = None):
+        """mmap=True는 검색 전용(빠른 로드), 추가/삭제가 필요하면 mmap=False로 로드합니다."""
+        with open(prefix + ".meta.json", "r", encoding="utf-8") as f:
+            sidecar = json.load(f)
+        index = _read_index(prefix + ".faiss", mmap)
+        meta = {int(k): v for k, v in sidecar["meta"].items()}
+        return cls(dim=sidecar["dim"], index=index, meta=meta, next_id=sidecar["next_id"],
+                   spec=sidecar.get("spec", DEFAULT_INDEX_SPEC), nprobe=nprobe, ef_search=ef_search)
+
+    @staticmethod
+    def exists(prefix: str = DEFAULT_INDEX_PREFIX) -> bool:
+        return os.path.exists(prefix + ".faiss") and os.path.exists(prefix + ".meta.json")
+
+    # -----------------------------------------------------------
+    # 추가 / 삭제
+    # -----------------------------------------------------------
+    def add(self, vectors: np.ndarray, product_ids, image_paths) -> np.ndarray:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if self.index is None:
+            base = build_index(self.dim, self.spec, train_vectors=vectors)
+            ivf = faiss.try_extract_index_ivf(base)
+            if ivf is not None:
+                # IVF 계열은 자체적으로 id를 저장하므로 IDMap 없이, 삭제와 reconstruct가 모두 가능한
+                # 해시 기반 direct map만 켭니다. (OPQ 전처리로 감싼 경우도 add_with_ids/remove_ids를 그대로 전달)
+                ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+                self.index = base
+            else:
+                self.index = faiss.IndexIDMap2(base)
+        ids = np.arange(self.next_id, self.next_id + len(vectors), dtype=np.int64)
+        self.index.add_with_ids(vectors, ids)
+        for i, product_id, image_path in zip(ids.tolist(), product_ids, image_paths):
+            self.meta[i] = {"product_id": product_id, "imagePath": image_path}
+        self.next_id += len(vectors)
+        return ids
+
+    def _remove_ids(self, ids) -> int:
+        if not ids:
+            return 0
+        try:
+            removed = self.index.remove_ids(np.array(ids, dtype=np.int64))
+        except RuntimeError:
+            # HNSW 계열은 FAISS에서 삭제를 지원하지 않으므로 남은 벡터로 인덱스를 다시 만듭니다.
+            removed = self._rebuild_without(ids)
+        for i in ids:
+            self.meta.pop(i, None)
+        return int(removed)
+
+    def _rebuild_without(self, ids) -> int:
+        # IndexIDMap2의 내부 인덱스 순서대로 벡터와 id를 꺼내 삭제 대상만 빼고 같은 spec으로 재구축
+        all_ids = faiss.vector_to_array(self.index.id_map)
+        vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+        keep = ~np.isin(all_ids, np.array(ids, dtype=np.int64))
+        kept_vectors = np.ascontiguousarray(vectors[keep])
+        index = faiss.IndexIDMap2(build_index(self.dim, self.spec, train_vectors=kept_vectors))
+        if len(kept_vectors):
+            index.add_with_ids(kept_vectors, all_ids[keep])
+        self.index = index
+        return int((~keep).sum())
+
+    def remove_products(self, product_ids) -> int:
+        targets = set(product_ids)
+        return self._remove_ids([i for i, m in self.meta.items() if m["product_id"] in targets])
+
+    def remove_paths(self, image_paths) -> int:
+        targets = set(image_paths)
+        return self._remove_ids([i for i, m in self.meta.items() if m["imagePath"] in targets])
+
+    def indexed_paths(self) -> set:
+        return {m["imagePath"] for m in self.meta.values()}
+
+    def id_for_path(self, image_path: str):
+        for i, m in self.meta.items():
+            if m["imagePath"] == image_path:
+                return i
+        return None
+
+    def reconstruct(self, faiss_id: int) -> np.ndarray:
+        return self.index.reconstruct(int(faiss_id))
+
+    # -----------------------------------------------------------
+    # 검색
+    # -----------------------------------------------------------
+    def search(self, queries: np.ndarray, k: int = 5):
+        """queries (Q, dim)에 대해 쿼리별 [(similarity, id, meta), ...] 리스트를 반환합니다."""
+        queries = np.ascontiguousarray(queries, dtype=np.float32).reshape(-1, self.dim)
+        if self.index is None:
+            return [[] for _ in range(len(queries))]
+        set_search_params(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
+        distances, ids = self.index.search(queries, k)
+        results = []
+        for row_d, row_i in zip(distances, ids):
+            results.append([(float(d), int(i), self.meta.get(int(i))) for d, i in zip(row_d, row_i) if i != -1])
+        return results
+
+    @property
+    def ntotal(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
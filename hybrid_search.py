@@ -0,0 +1,169 @@
+# hybrid_search.py
+# 이미지 벡터 유사도 + 상품 속성 조건(카테고리 / 가격 / 평점 / 제조사) 검색.
+#  - filtered  : near_vector에 Weaviate 필터를 함께 전달 → 서버가 조건을 만족하는 객체 안에서만 top-k (왕복 1회)
+#  - post-filter (비교용, 기존 방식): near_vector로 넉넉히 가져온 뒤 MySQL product 테이블을 조회해 Python에서 거름
+# 메타데이터 속성은 product_metadata.py로 먼저 동기화해야 합니다.
+
+import sys
+import time
+import numpy as np
+import mysql.connector
+from weaviate.classes.query import MetadataQuery, Filter
+
+from utils import connect_to_weaviate, WEAVIATE_CLASS_NAME
+from product_metadata import MYSQL_CONFIG, load_product_metadata
+
+# -----------------------------------------------------------
+# 1. 설정값 (사용자 입력)
+# -----------------------------------------------------------
+QUERY_PRODUCT_ID = 20787518   # 🔍 이 상품의 이미지와 비슷한 상품을 찾음
+QUERY_LIMIT = 5
+# 예: "같은 카테고리에서 30만원 이하, 평점 4.0 이상"
+CONDITIONS = {
+    "categori_id": None,      # None이면 쿼리 상품의 카테고리 사용
+    "price_max": 300000,
+    "min_rating": 4.0,
+    "manufacturer": None,
+}
+OVERFETCH = 20      # post-filter 방식에서 limit의 몇 배를 가져올지
+BENCH_REPEAT = 20   # 지연 비교 반복 횟수
+
+
+# -----------------------------------------------------------
+# 2. 필터 조립 및 검색
+# -----------------------------------------------------------
+def build_filter(categori_id=None, price_max=None, price_min=None, min_rating=None, manufacturer=None):
+    """주어진 조건만 Filter.all_of로 묶습니다. 조건이 없으면 None."""
+    conditions = []
+    if categori_id is not None:
+        conditions.append(Filter.by_property("categori_id").equal(categori_id))
+    if price_max is not None:
+        conditions.append(Filter.by_property("min_price").less_or_equal(price_max))
+    if price_min is not None:
+        conditions.append(Filter.by_property("max_price").greater_or_equal(price_min))
+    if min_rating is not None:
+        conditions.append(Filter.by_property("average_rating").greater_or_equal(min_rating))
+    if manufacturer is not None:
+        conditions.append(Filter.by_property("manufacturer").equal(manufacturer))
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else Filter.all_of(conditions)
+
+
+def _matches(meta, categori_id=None, price_max=None, price_min=None, min_rating=None, manufacturer=None):
+    """build_filter와 같은 조건을 Python에서 검사합니다. (post-filter 기준선용)"""
+    if meta is None:
+        return False
+    checks = [
+        categori_id is None or meta["categori_id"] == categori_id,
+        price_max is None or (meta["min_price"] is not None and meta["min_price"] <= price_max),
+        price_min is None or (meta["max_price"] is not None and meta["max_price"] >= price_min),
+        min_rating is None or (meta["average_rating"] is not None and meta["average_rating"] >= min_rating),
+        manufacturer is None or meta["manufacturer"] == manufacturer,
+    ]
+    return all(checks)
+
+
+def filtered_search(collection, query_vector, limit: int = QUERY_LIMIT, **conditions):
+    """near_vector + Weaviate 필터 (왕복 1회). 반환: Weaviate 결과 객체 리스트"""
+    result = collection.query.near_vector(
+        near_vector=query_vector,
+        limit=limit,
+        filters=build_filter(**conditions),
+        return_metadata=MetadataQuery(distance=True),
+    )
+    return result.objects
+
+
+def post_filter_search(collection, mysql_cursor, query_vector, limit: int = QUERY_LIMIT,
+                       overfetch: int = OVERFETCH, **conditions):
+    """기존 방식: limit × overfetch개를 가져와 MySQL에서 속성을 조회한 뒤 Python에서 거릅니다. (결과가 limit보다 적을 수 있음)"""
+    result = collection.query.near_vector(
+        near_vector=query_vector,
+        limit=limit * overfetch,
+        return_metadata=MetadataQuery(distance=True),
+    )
+    candidates = result.objects
+    metadata = load_product_metadata(mysql_cursor, {int(o.properties["product_id"]) for o in candidates})
+    hits = [o for o in candidates if _matches(metadata.get(int(o.properties["product_id"])), **conditions)]
+    return hits[:limit]
+
+
+def _time_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - start_time) * 1000)
+    return out, float(np.median(times)), float(np.percentile(times, 95))
+
+
+def print_results(title, objects):
+    print(f"\n📸 {title} ({len(objects)}개)")
+    for rank, item in enumerate(objects):
+        props = item.properties
+        distance = item.metadata.distance if item.metadata.distance is not None else 0
+        print(f"{rank+1}. {props['imagePath']} (Product ID: {int(props['product_id'])}, "
+              f"카테고리: {props.get('categori_id')}, 최저가: {props.get('min_price')}, "
+              f"평점: {props.get('average_rating')}) [Similarity: {1 - distance:.4f}]")
+
+
+if __name__ == "__main__":
+    client = connect_to_weaviate()
+    collection = client.collections.get(WEAVIATE_CLASS_NAME)
+    try:
+        mysql_conn = mysql.connector.connect(**MYSQL_CONFIG)
+        mysql_cursor = mysql_conn.cursor()
+    except mysql.connector.Error as err:
+        print(f"❌ MySQL 연결 실패: {err}")
+        client.close()
+        sys.exit()
+
+    try:
+        # -----------------------------------------------------------
+        # 3. 쿼리 상품의 벡터/카테고리 조회
+        # -----------------------------------------------------------
+        response = collection.query.fetch_objects(
+            limit=1,
+            filters=Filter.by_property("product_id").equal(QUERY_PRODUCT_ID),
+            include_vector=True,
+        )
+        if not response.objects:
+            print(f"❌ DB에서 product_id '{QUERY_PRODUCT_ID}'를 찾을 수 없습니다.")
+            sys.exit()
+        query_item = response.objects[0]
+        query_vector = query_item.vector["default"]
+
+        conditions = dict(CONDITIONS)
+        if conditions["categori_id"] is None:
+            conditions["categori_id"] = query_item.properties.get("categori_id")
+        print(f"🔍 Query: Product ID {QUERY_PRODUCT_ID} / 조건: {conditions}")
+
+        # -----------------------------------------------------------
+        # 4. 필터 검색 vs post-filter 지연 비교
+        # -----------------------------------------------------------
+        filtered, f_p50, f_p95 = _time_ms(
+            lambda: filtered_search(collection, query_vector, QUERY_LIMIT, **conditions), BENCH_REPEAT)
+        post, p_p50, p_p95 = _time_ms(
+            lambda: post_filter_search(collection, mysql_cursor, query_vector, QUERY_LIMIT, **conditions), BENCH_REPEAT)
+
+        print_results("near_vector + 필터 결과", filtered)
+        print_results(f"post-filter 결과 (over-fetch {QUERY_LIMIT * OVERFETCH}개)", post)
+
+        print("\n" + "=" * 60)
+        print(f"{'방식':<24}{'결과 수':>8}{'p50(ms)':>12}{'p95(ms)':>12}")
+        print("-" * 60)
+        print(f"{'near_vector + filters':<24}{len(filtered):>8}{f_p50:>12.2f}{f_p95:>12.2f}")
+        print(f"{'post-filter (MySQL)':<24}{len(post):>8}{p_p50:>12.2f}{p_p95:>12.2f}")
+        print("=" * 60)
+        if len(post) < len(filtered):
+            print("⚠️ post-filter는 over-fetch 범위 안에 조건을 만족하는 상품이 부족해 결과가 덜 나왔습니다.")
+
+    except Exception as e:
+        print(f"❌ 검색 중 오류 발생: {e}")
+
+    finally:
+        mysql_cursor.close()
+        mysql_conn.close()
+        client.close()
+        print("👋 모든 DB 연결 종료.")
@@ -1,73 +1,37 @@
-import re
-import json
+# image_path_name.py
+# 다나와 크롤링 CSV의 이미지 URL을 파일 이름으로 정리하고 '상세정보'를 JSON으로 변환합니다.
+# 파서와 청크 병렬 처리는 detail_parser.py에 있습니다. (출력 확장자가 .parquet이면 Parquet으로 저장)
 import pandas as pd
-import csv
 
-# -----------------------------
-# 1) 값 정리 및 파싱 함수 (JSON 변환용)
-# -----------------------------
-def clean_value(v):
-    v = v.strip()
-    v = re.sub(r'^[\(\[]+', '', v)
-    v = re.sub(r'[\)\]]+$', '', v)
-    return v.strip()
-
-def parse_value(v):
-    v = clean_value(v)
-    if ',' in v:
-        return [item.strip() for item in v.split(',') if item.strip()]
-    date = re.search(r'(\d{4})년\s*(\d{1,2})월(?:\s*(\d{1,2})일)?', v)
-    if date:
-        y = int(date.group(1)); m = int(date.group(2)); d = date.group(3)
-        if d: return f"{y:04d}-{m:02d}-{int(d):02d}"
-        return f"{y:04d}-{m:02d}"
-    return v
-
-def parse_text(text):
-    result = {}
-    if not isinstance(text, str): return result
-    text = text.replace("(/", "/").replace(" (/", "/").replace("/(", "/")
-    items = [p for p in text.split('/') if p.strip()]
-    for item in items:
-        if ':' in item:
-            key, val = item.split(':', 1)
-            result[key.strip()] = parse_value(val)
-    return result
+from detail_parser import convert_csv
 
 # -----------------------------
-# 4) CSV 읽고, 변환, 삭제, 이미지 URL 정리 후 저장 (통합)
+# 1) 설정값
 # -----------------------------
 input_file = "danawa_유모차_output_with_pcode (2).csv"
 output_file = "danawa_유모차_output_final_cleaned_img_modified.csv" 
+CHUNK_ROWS = 20000  # 청크당 행 수 (메모리 사용량 상한)
+WORKERS = None      # 변환 프로세스 수 (None: CPU 코어 수)
 
-# 1. CSV 읽기
-df = pd.read_csv(input_file, encoding="utf-8-sig")
-
-# 2. 이미지 URL에서 파일 이름 추출 및 형식 수정 (수정된 부분)
-print("이미지 URL에서 파일 이름 추출 및 정리 중...")
-
-# 2-1. URL에서 파일 이름 추출 (예: 'https://.../20834387_1.jpg?...' -> '20834387_1.jpg')
-df['상품이미지'] = df['상품이미지'].astype(str).str.extract(r'([^/]+\.(?:jpg|png))')
-
-# 2-2. 파일 이름에서 '_숫자' 부분 제거 (예: '20834387_1.jpg' -> '20834387.jpg')
-# _ 뒤에 숫자가 오고, 그 뒤에 .jpg나 .png가 오는 패턴을 찾아서 '_숫자'를 제거합니다.
-df['상품이미지'] = df['상품이미지'].str.replace(r'_\d+(?=\.(?:jpg|png)$)', '', regex=True)
 
+# -----------------------------
+# 2) 이미지 URL에서 파일 이름 추출 및 형식 수정 (청크마다 워커에서 실행)
+# -----------------------------
+def clean_image_names(df: pd.DataFrame) -> pd.DataFrame:
+    # 2-1. URL에서 파일 이름 추출 (예: 'https://.../20834387_1.jpg?...' -> '20834387_1.jpg')
+    df['상품이미지'] = df['상품이미지'].astype(str).str.extract(r'([^/]+\.(?:jpg|png))', expand=False)
 
-# 3. '상세정보_json' 열 생성 및 원본 '상세정보' 열 삭제
-print("상세정보 JSON 변환 및 원본 열 삭제 중...")
-df["상세정보_json"] = df["상세정보"].astype(str).apply(
-    lambda x: json.dumps(parse_text(x), ensure_ascii=False)
-)
-df = df.drop(columns=['상세정보'])
+    # 2-2. 파일 이름에서 '_숫자' 부분 제거 (예: '20834387_1.jpg' -> '20834387.jpg')
+    # _ 뒤에 숫자가 오고, 그 뒤에 .jpg나 .png가 오는 패턴을 찾아서 '_숫자'를 제거합니다.
+    df['상품이미지'] = df['상품이미지'].str.replace(r'_\d+(?=\.(?:jpg|png)$)', '', regex=True)
+    return df
 
-# 4. CSV 저장 (깨짐 방지 옵션 적용)
-df.to_csv(
-    output_file, 
-    index=False, 
-    encoding="utf-8-sig", 
-    sep=',', 
-    quoting=csv.QUOTE_ALL
-)
 
-print(f"✅ 모든 변환 및 정리 완료: {output_file}")
\ No newline at end of file
+# -----------------------------
+# 3) CSV 읽고, 변환, 삭제, 이미지 URL 정리 후 저장 (청크 단위 스트리밍)
+# -----------------------------
+if __name__ == "__main__":
+    print("이미지 파일 이름 정리 및 상세정보 JSON 변환 중...")
+    stats = convert_csv(input_file, output_file, transform=clean_image_names,
+                        chunk_rows=CHUNK_ROWS, workers=WORKERS)
+    print(f"✅ 모든 변환 및 정리 완료: {output_file} ({stats['rows']}행, {stats['seconds']:.2f}초)")
@@ -0,0 +1,281 @@
+# ingest_pipeline.py
+# 디코딩 → 배경 제거 → CLIP 임베딩 → Weaviate 적재를 스테이지별로 동시에 실행하는 생산자/소비자 파이프라인.
+#
+#   [경로] → decode (I/O 스레드 풀) → mask (rembg 프로세스 풀) → embed (CLIP 배치 스레드) → write (Weaviate 배치)
+#
+# 스테이지 사이는 크기 제한 큐로 연결되어, 느린 스테이지가 있으면 앞 스테이지가 기다리므로(backpressure)
+# 메모리는 큐 크기만큼만 사용합니다. 실행이 끝나면 스테이지별 처리량/사용률을 출력하므로 병목 스테이지를 알 수 있습니다.
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from embedding_cache import file_digest, make_key
+from weaviate_ingest import stream_insert
+
+DEFAULT_DECODE_WORKERS = 4
+DEFAULT_QUEUE_DEPTH = 64
+DEFAULT_CLIP_BATCH_SIZE = 32
+BATCH_WAIT_SECONDS = 0.05   # CLIP 배치가 덜 찼을 때 다음 항목을 기다리는 최대 시간
+
+_DONE = object()            # 스테이지 종료 표시
+
+
+class StageStats:
+    """스테이지 하나의 처리 개수 / 오류 수 / 작업 시간(워커 합계)."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float, items: int = 1, errors: int = 0):
+        with self._lock:
+            self.items += items
+            self.errors += errors
+            self.busy_seconds += seconds
+
+
+def _start_stage(stats: StageStats, fn, in_q, out_q):
+    """
+    stats.workers개 스레드가 in_q에서 항목을 꺼내 fn(item)의 결과를 out_q에 넣습니다.
+    fn이 예외를 내면 해당 항목은 버리고 오류로 집계합니다. 마지막 워커가 끝날 때 out_q에 _DONE을 넣습니다.
+    """
+    remaining = [stats.workers]
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                in_q.put(_DONE)  # 같은 스테이지의 다른 워커도 종료하도록 다시 넣어 둠
+                break
+            start_time = time.perf_counter()
+            try:
+                result = fn(item)
+                stats.add(time.perf_counter() - start_time)
+            except Exception as e:
+                stats.add(time.perf_counter() - start_time, items=0, errors=1)
+                print(f"❌ [{stats.name}] 처리 오류 ({item['path']}): {e}")
+                continue
+            out_q.put(result)
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                out_q.put(_DONE)
+
+    threads = [threading.Thread(target=worker, name=f"{stats.name}-{i}", daemon=True)
+               for i in range(stats.workers)]
+    for t in threads:
+        t.start()
+    return threads
+
+
+def run_ingest_pipeline(targets, collection, remove_bg: bool = False, cache=None,
+                        decode_workers: int = DEFAULT_DECODE_WORKERS, mask_workers: int = None,
+                        mask_threads_per_worker: int = None, clip_batch_size: int = DEFAULT_CLIP_BATCH_SIZE,
+                        ingest_batch_size: int = None, concurrent_requests: int = 2,
+                        queue_depth: int = DEFAULT_QUEUE_DEPTH) -> dict:
+    """
+    targets: (이미지 경로, Weaviate properties dict)의 반복 가능 객체
+    remove_bg: True면 rembg 프로세스 풀 스테이지를 거칩니다. (이미 마스킹된 이미지는 False)
+    cache: EmbeddingCache. 주어지면 decode 스테이지에서 파일 해시로 조회해, 적중한 항목은 마스킹/임베딩을 건너뜁니다.
+    decode_workers / mask_workers / mask_threads_per_worker / clip_batch_size /
+    ingest_batch_size / concurrent_requests: 스테이지별 동시성 설정
+    (mask_workers / mask_threads_per_worker가 None이면 clip_onnx.plan_threads로 rembg 프로세스와 CLIP이 코어를 나눠 씀)
+    queue_depth: 스테이지 사이 큐의 최대 항목 수
+
+    반환값: {"stages": [StageStats, ...], "ingest": stream_insert 결과, "wall_seconds"}
+    """
+    import utils
+    from utils import REMBG_MODEL_NAME, clip_model_id, images_to_vectors, load_image, preprocess_mode
+    from mask_engine import init_worker, mask_image
+    from clip_onnx import CLIP_CORE_SHARE, get_onnx_encoder, plan_threads
+
+    # rembg 워커 프로세스와 CLIP(ONNX 세션)의 스레드 합이 코어 수를 넘지 않도록 나눔 (과다 구독 방지)
+    cores = os.cpu_count() or 1
+    if remove_bg:
+        mask_workers = mask_workers or max(1, cores - round(cores * CLIP_CORE_SHARE))
+    plan = plan_threads(cores, clip_sessions=utils.CLIP_ONNX_POOL_SIZE,
+                        rembg_sessions=mask_workers if remove_bg else 0)
+    mask_workers = mask_workers or 1
+    mask_threads_per_worker = mask_threads_per_worker or plan["rembg_threads"] or 1
+    if utils.CLIP_BACKEND == "onnx":
+        # 공유 인코더를 계획된 스레드 수로 준비 → embed 스테이지의 images_to_vectors가 이 인코더를 사용
+        get_onnx_encoder(utils.CLIP_ONNX_POOL_SIZE, utils.CLIP_ONNX_THREADS or plan["clip_threads"])
+    cache_mode = preprocess_mode("rembg" if remove_bg else "none")
+    model_id = clip_model_id()
+    cache_lock = threading.Lock()  # EmbeddingCache는 스레드 안전하지 않으므로 조회/추가를 직렬화
+
+    decode_stats = StageStats("decode", decode_workers)
+    mask_stats = StageStats("mask", mask_workers if remove_bg else 0)
+    embed_stats = StageStats("embed", 1)
+    write_stats = StageStats("write", 1)
+
+    path_q = queue.Queue(maxsize=queue_depth)
+    decoded_q = queue.Queue(maxsize=queue_depth)
+    masked_q = queue.Queue(maxsize=queue_depth) if remove_bg else decoded_q
+    embedded_q = queue.Queue(maxsize=queue_depth)
+
+    # -----------------------------------------------------------
+    # 스테이지 함수
+    # -----------------------------------------------------------
+    def decode(item):
+        if cache is not None:
+            item["key"] = make_key(file_digest(item["path"]), model_id, cache_mode)
+            with cache_lock:
+                item["vector"] = cache.get(item["key"])
+            if item["vector"] is not None:
+                return item
+        # 긴 변 MAX_IMAGE_SIDE로 축소 디코딩 (JPEG는 draft로 디코딩 자체가 가벼워짐) → 마스킹/큐 메모리도 감소
+        item["image"] = load_image(item["path"])
+        return item
+
+    def embed_loop():
+        """CLIP 배치 스테이지. 어떤 예외가 나도 finally에서 _DONE을 보내므로 write 스테이지(objects)가 멈추지 않습니다."""
+        batch = []
+
+        def flush():
+            start_time = time.perf_counter()
+            try:
+                vectors = images_to_vectors([it.pop("image") for it in batch],
+                                            batch_size=clip_batch_size, remove_bg=False)
+            except Exception as e:
+                embed_stats.add(time.perf_counter() - start_time, items=0, errors=len(batch))
+                print(f"❌ [embed] 배치 {len(batch)}개 임베딩 오류: {e}")
+                batch.clear()
+                return
+            embed_stats.add(time.perf_counter() - start_time, items=len(batch))
+            if cache is not None:
+                try:
+                    with cache_lock:
+                        new = [(it["key"], v) for it, v in zip(batch, vectors) if it["key"] not in cache.entries]
+                        if new:
+                            cache.put_many([k for k, _ in new], np.stack([v for _, v in new]))
+                except Exception as e:
+                    # 캐시 저장 실패는 적재를 막지 않음 (벡터는 그대로 전달, 오류로만 집계)
+                    embed_stats.add(0.0, items=0, errors=len(batch))
+                    print(f"⚠️ [embed] 임베딩 캐시 저장 오류: {e}")
+            for vector in vectors:
+                batch[0]["vector"] = vector
+                embedded_q.put(batch[0])
+                batch.pop(0)  # 보낸 항목만 빼서, 도중에 실패하면 못 보낸 것만 오류로 집계
+            batch.clear()
+
+        upstream_done = False
+        try:
+            while True:
+                try:
+                    item = masked_q.get(timeout=BATCH_WAIT_SECONDS if batch else None)
+                except queue.Empty:
+                    flush()  # 입력이 잠시 끊기면 덜 찬 배치라도 먼저 보냄
+                    continue
+                if item is _DONE:
+                    upstream_done = True
+                    break
+                if item.get("vector") is not None:
+                    embed_stats.add(0.0)  # 캐시 적중: 그대로 통과
+                    embedded_q.put(item)
+                    continue
+                batch.append(item)
+                if len(batch) >= clip_batch_size:
+                    flush()
+            if batch:
+                flush()
+        except Exception as e:
+            # 남은 배치와 앞 스테이지에서 계속 들어오는 항목은 오류로 집계하며 버림 (앞 스테이지가 put에서 막히지 않도록)
+            dropped = len(batch)
+            print(f"❌ [embed] 스테이지 오류, 남은 항목을 건너뜁니다: {e}")
+            while not upstream_done and masked_q.get() is not _DONE:
+                dropped += 1
+            embed_stats.add(0.0, items=0, errors=dropped)
+        finally:
+            embedded_q.put(_DONE)
+
+    def objects():
+        while True:
+            item = embedded_q.get()
+            if item is _DONE:
+                return
+            yield item["properties"], item["vector"].tolist()
+
+    # -----------------------------------------------------------
+    # 실행
+    # -----------------------------------------------------------
+    wall_start = time.time()
+    pool = None
+    if remove_bg:
+        # 프로세스마다 rembg 세션 1개. mask 스테이지 스레드는 작업을 넘기고 결과를 기다리기만 합니다.
+        pool = ProcessPoolExecutor(max_workers=mask_workers, initializer=init_worker,
+                                   initargs=(REMBG_MODEL_NAME, mask_threads_per_worker))
+
+    feed_errors = []
+
+    def feed():
+        """targets 순회 중 예외가 나도 _DONE은 항상 보내 뒤 스테이지가 끝나게 하고, 예외는 호출자에게 다시 올립니다."""
+        try:
+            for path, properties in targets:
+                path_q.put({"path": path, "properties": properties, "vector": None})
+        except Exception as e:
+            decode_stats.add(0.0, items=0, errors=1)
+            feed_errors.append(e)
+            print(f"❌ [feed] 적재 대상 목록 읽기 오류, 이후 항목은 건너뜁니다: {e}")
+        finally:
+            path_q.put(_DONE)
+
+    def mask(item):
+        if item.get("vector") is None:
+            item["image"] = pool.submit(mask_image, item["image"]).result()
+        return item
+
+    try:
+        threads = [threading.Thread(target=feed, name="feed", daemon=True)]
+        threads[0].start()
+        threads += _start_stage(decode_stats, decode, path_q, decoded_q)
+        if remove_bg:
+            threads += _start_stage(mask_stats, mask, decoded_q, masked_q)
+        embed_thread = threading.Thread(target=embed_loop, name="embed", daemon=True)
+        embed_thread.start()
+        threads.append(embed_thread)
+
+        # write 스테이지: 호출 스레드에서 제너레이터를 소비하고, 전송은 Weaviate 클라이언트가 백그라운드로 수행
+        write_start = time.perf_counter()
+        ingest = stream_insert(collection, objects(), batch_size=ingest_batch_size,
+                               concurrent_requests=concurrent_requests)
+        write_stats.add(time.perf_counter() - write_start, items=ingest["inserted"],
+                        errors=len(ingest["failed"]))
+        for t in threads:
+            t.join()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache is not None:
+            cache.prune()  # 저장 + (용량 초과 / 주기 도래 시) 축출
+
+    wall_seconds = time.time() - wall_start
+    stages = [s for s in (decode_stats, mask_stats, embed_stats, write_stats) if s.workers]
+    print_stage_report(stages, wall_seconds)
+    if feed_errors:
+        raise feed_errors[0]  # 이미 받은 항목은 적재를 마쳤지만 목록이 중간에 끊겼음을 호출자에게 알림
+    return {"stages": stages, "ingest": ingest, "wall_seconds": wall_seconds}
+
+
+def print_stage_report(stages, wall_seconds: float):
+    """스테이지별 처리량과 사용률(작업 시간 / (경과 시간 × 워커 수))을 표로 출력합니다. 사용률이 가장 높은 스테이지가 병목입니다."""
+    print("\n" + "=" * 72)
+    print(f"{'stage':<10}{'workers':>8}{'items':>8}{'errors':>8}{'busy(s)':>10}{'items/s':>10}{'사용률':>10}")
+    print("-" * 72)
+    for s in stages:
+        utilization = s.busy_seconds / max(wall_seconds * s.workers, 1e-9)
+        print(f"{s.name:<10}{s.workers:>8}{s.items:>8}{s.errors:>8}{s.busy_seconds:>10.2f}"
+              f"{s.items / max(wall_seconds, 1e-9):>10.1f}{utilization:>10.0%}")
+    print("-" * 72)
+    print(f"전체 경과 시간: {wall_seconds:.4f}초")
+    print("=" * 72)
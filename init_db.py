@@ -2,6 +2,7 @@
 import sys
 from utils import connect_to_weaviate, WEAVIATE_CLASS_NAME
 from weaviate.classes.config import Property, DataType, Configure
+from product_metadata import metadata_properties
 
 print("🚀 init_db.py 시작")
 
@@ -20,6 +21,8 @@ try:
         properties=[
             Property(name="imagePath", data_type=DataType.TEXT),
             Property(name="product_id", data_type=DataType.NUMBER),
+            # 📌 MySQL product 테이블에서 동기화하는 필터용 메타데이터 (product_metadata.py)
+            *metadata_properties(),
         ],
     )
 
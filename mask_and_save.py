@@ -3,59 +3,68 @@
 
 import os
 import time  # time 모듈 추가
-from PIL import Image
-from utils import remove_background
+from mask_engine import mask_directory, list_images
+from mask_manifest import MaskManifest
+from utils import MAX_IMAGE_SIDE, REMBG_MODEL_NAME
 
 # -----------------------------------------------------------
 # 1. 환경 설정
 # -----------------------------------------------------------
-IMAGE_DIR = r"images\product_craw"
-MASKED_DIR = r"images\product_craw_masked" # 마스킹된 이미지를 저장할 폴더
+IMAGE_DIR = os.path.join("images", "product_craw")
+MASKED_DIR = os.path.join("images", "product_craw_masked") # 마스킹된 이미지를 저장할 폴더
+WORKERS = os.cpu_count()   # 배경 제거 프로세스 수 (워커마다 rembg 세션 1개)
+THREADS_PER_WORKER = 1     # 워커별 ONNX Runtime 스레드 수 (WORKERS × THREADS_PER_WORKER ≈ 코어 수)
+FULL_RESOLUTION = False    # True: 원본 해상도로 저장 (마스크만 업샘플) / False: utils.MAX_IMAGE_SIDE로 축소해 저장
+MANIFEST_PATH = os.path.join(MASKED_DIR, ".mask_manifest.sqlite")  # 증분/재개용 처리 기록
+# 출력에 영향을 주는 설정: 기록과 다르면(예: FULL_RESOLUTION 변경) 같은 원본도 다시 마스킹
+MASK_SETTINGS = f"full={FULL_RESOLUTION}|max_side={MAX_IMAGE_SIDE}|model={REMBG_MODEL_NAME}"
 
-if not os.path.exists(MASKED_DIR):
-    os.makedirs(MASKED_DIR)
-    print(f"✅ 마스킹 이미지 저장 폴더 생성: {MASKED_DIR}")
+# 🚨 프로세스 풀은 워커에서 이 파일을 다시 import하므로(Windows spawn), 실행 코드는 main 가드 안에 둡니다.
+if __name__ == "__main__":
+    if not os.path.exists(MASKED_DIR):
+        os.makedirs(MASKED_DIR)
+        print(f"✅ 마스킹 이미지 저장 폴더 생성: {MASKED_DIR}")
 
-image_paths = [os.path.join(IMAGE_DIR, f) for f in os.listdir(IMAGE_DIR)
-               if f.lower().endswith((".png", ".jpg", ".jpeg", ".webp",".avif"))]
+    image_paths = list_images(IMAGE_DIR)
 
-if len(image_paths) == 0:
-    print(f"❌ '{IMAGE_DIR}' 폴더에 이미지가 없습니다!")
-    exit()
+    if len(image_paths) == 0:
+        print(f"❌ '{IMAGE_DIR}' 폴더에 이미지가 없습니다!")
+        exit()
 
-print(f"\n🚀 {len(image_paths)}개 이미지 마스킹 및 저장 시작...")
+    # 💡 manifest와 비교해 바뀌지 않은 이미지는 건너뛰고, 새 이미지/변경된 이미지/실패했던 이미지만 처리
+    manifest = MaskManifest(MANIFEST_PATH, settings=MASK_SETTINGS)
+    plan_start_time = time.time()
+    image_paths, skipped = manifest.plan(image_paths, MASKED_DIR)
+    print(f"📋 manifest 확인 완료: {skipped}개 건너뜀, {len(image_paths)}개 처리 예정 "
+          f"(소요 시간: {time.time() - plan_start_time:.4f}초)")
 
-# -----------------------------------------------------------
-# 2. 마스킹 처리 및 저장 (시간 측정 추가)
-# -----------------------------------------------------------
-total_start_time = time.time()  # 전체 시작 시간 기록
+    if len(image_paths) == 0:
+        print("✨ 모든 이미지가 최신 상태입니다.")
+        manifest.close()
+        exit()
+
+    print(f"\n🚀 {len(image_paths)}개 이미지 마스킹 및 저장 시작... (워커 {WORKERS}개)")
+
+    # -----------------------------------------------------------
+    # 2. 마스킹 처리 및 저장 (프로세스 풀 병렬 처리, 시간 측정)
+    # -----------------------------------------------------------
+    total_start_time = time.time()  # 전체 시작 시간 기록
 
-for path in image_paths:
-    start_time = time.time()  # 개별 파일 시작 시간 기록
-    
     try:
-        input_image_pil = Image.open(path)
-        
-        # 1. 배경 제거 및 검은색 배경으로 변환
-        masked_image = remove_background(input_image_pil)
-        
-        # 2. 파일 이름 설정
-        filename = os.path.basename(path)
-        save_path = os.path.join(MASKED_DIR, filename)
-        
-        # 3. 이미지 저장 (원본 확장자 유지)
-        masked_image.save(save_path)
-        
-        end_time = time.time()  # 개별 파일 끝 시간 기록
-        time_taken = end_time - start_time  # 소요 시간 계산
-        
-        print(f"✅ Masked and saved: {save_path} (소요 시간: {time_taken:.4f}초)")
-        
-    except Exception as e:
-        print(f"❌ 파일 처리 오류 ({path}): {e}")
-
-total_end_time = time.time() # 전체 끝 시간 기록
-total_time_taken = total_end_time - total_start_time # 전체 소요 시간 계산
-
-print("\n--- 마스킹 처리 완료 ---")
-print(f"✨ **총 처리 시간: {total_time_taken:.4f}초**")
\ No newline at end of file
+        stats = mask_directory(IMAGE_DIR, MASKED_DIR, workers=WORKERS,
+                               threads_per_worker=THREADS_PER_WORKER, paths=image_paths,
+                               on_result=manifest.record, full_resolution=FULL_RESOLUTION)
+    finally:
+        # 중간에 중단되어도 완료된 결과는 이미 커밋되어 있으므로, 다음 실행은 pending부터 이어서 처리합니다.
+        counts = manifest.counts()
+        manifest.close()
+
+    total_end_time = time.time() # 전체 끝 시간 기록
+    total_time_taken = total_end_time - total_start_time # 전체 소요 시간 계산
+
+    print("\n--- 마스킹 처리 완료 ---")
+    print(f"* 성공: {stats['ok']}개 / 실패: {stats['failed']}개 / 건너뜀: {skipped}개")
+    print(f"* manifest 상태: {counts}")
+    print(f"* 처리량: {stats['ok'] / max(total_time_taken, 1e-9):.2f} img/s "
+          f"(병렬 효율: {stats['busy_seconds'] / max(total_time_taken * WORKERS, 1e-9):.0%})")
+    print(f"✨ **총 처리 시간: {total_time_taken:.4f}초**")
@@ -0,0 +1,111 @@
+# mask_engine.py
+# 폴더 단위 배경 제거 엔진: 파일들을 프로세스 풀로 분산하고, 워커마다 rembg 세션을 하나씩 유지합니다.
+# 워커 내부 ONNX Runtime 스레드 수를 제한해 (워커 수 × 스레드 수 ≈ 코어 수) 코어 수에 맞춰 선형에 가깝게 확장됩니다.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from PIL import Image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".avif")
+
+# 워커 프로세스마다 하나씩 생성되는 rembg 세션 (init_worker에서 설정)
+_WORKER_SESSION = None
+
+
+def init_worker(model_name: str, threads_per_worker: int):
+    global _WORKER_SESSION
+    # rembg는 세션 생성 시 OMP_NUM_THREADS를 읽어 ONNX Runtime intra/inter-op 스레드 수로 사용합니다.
+    os.environ["OMP_NUM_THREADS"] = str(threads_per_worker)
+    from utils import new_rembg_session
+    _WORKER_SESSION = new_rembg_session(model_name)
+
+
+def mask_image(image: Image.Image) -> Image.Image:
+    """워커에서 실행: 이미 디코딩된 이미지 1장의 배경을 제거합니다. (ingest_pipeline.py의 마스킹 스테이지용)"""
+    from utils import remove_background
+    return remove_background(image, session=_WORKER_SESSION)
+
+
+def _mask_one(src_path: str, dst_path: str, full_resolution: bool = False):
+    """워커에서 실행: 이미지 1장을 마스킹해 저장하고 (src, dst, 소요 시간, 오류)를 반환합니다."""
+    from utils import load_masked_image
+    start_time = time.time()
+    try:
+        # 1. 축소 디코딩 → 배경 제거 및 검은색 배경으로 변환 (full_resolution이면 마스크만 원본 크기로 업샘플)
+        masked_image = load_masked_image(src_path, session=_WORKER_SESSION, full_resolution=full_resolution)
+        # 2. 이미지 저장 (원본 확장자 유지)
+        masked_image.save(dst_path)
+        return src_path, dst_path, time.time() - start_time, None
+    except Exception as e:
+        return src_path, dst_path, time.time() - start_time, str(e)
+
+
+def list_images(src_dir: str):
+    return [os.path.join(src_dir, f) for f in sorted(os.listdir(src_dir))
+            if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def mask_directory(src: str, dst: str, workers: int = None, max_in_flight: int = None,
+                   model_name: str = None, threads_per_worker: int = 1, paths=None,
+                   on_result=None, full_resolution: bool = False) -> dict:
+    """
+    src 폴더의 이미지를 배경 제거하여 dst 폴더에 같은 파일명으로 저장합니다.
+
+    workers           : 프로세스 수 (기본: CPU 코어 수)
+    max_in_flight     : 동시에 제출해 둘 최대 작업 수 (기본: workers × 2). 큰 폴더에서도 대기 큐 메모리가 일정합니다.
+    threads_per_worker: 워커별 ONNX Runtime 스레드 수
+    paths             : 처리할 원본 경로 목록 (기본: src 폴더의 모든 이미지)
+    on_result         : 파일 하나가 끝날 때마다 on_result(src, dst, seconds, error)로 호출됩니다.
+    full_resolution   : True면 원본 해상도로 저장 (마스킹은 축소 이미지로 하고 마스크만 업샘플). 기본은 축소 해상도로 저장.
+
+    반환값은 처리 통계(dict)입니다.
+    """
+    if model_name is None:
+        from utils import REMBG_MODEL_NAME
+        model_name = REMBG_MODEL_NAME
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    os.makedirs(dst, exist_ok=True)
+
+    if paths is None:
+        paths = list_images(src)
+    stats = {"total": len(paths), "ok": 0, "failed": 0, "busy_seconds": 0.0, "wall_seconds": 0.0}
+
+    total_start_time = time.time()
+    pending = iter(paths)
+    in_flight = set()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_name, threads_per_worker)) as pool:
+
+        def submit_next():
+            path = next(pending, None)
+            if path is None:
+                return False
+            dst_path = os.path.join(dst, os.path.basename(path))
+            in_flight.add(pool.submit(_mask_one, path, dst_path, full_resolution))
+            return True
+
+        while len(in_flight) < max_in_flight and submit_next():
+            pass
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                in_flight.discard(future)
+                src_path, dst_path, seconds, error = future.result()
+                stats["busy_seconds"] += seconds
+                if error is None:
+                    stats["ok"] += 1
+                    print(f"✅ Masked and saved: {dst_path} (소요 시간: {seconds:.4f}초)")
+                else:
+                    stats["failed"] += 1
+                    print(f"❌ 파일 처리 오류 ({src_path}): {error}")
+                if on_result is not None:
+                    on_result(src_path, dst_path, seconds, error)
+                submit_next()
+
+    stats["wall_seconds"] = time.time() - total_start_time
+    return stats
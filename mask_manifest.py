@@ -0,0 +1,122 @@
+# mask_manifest.py
+# mask_and_save.py의 증분/재개용 manifest (SQLite).
+# 원본 경로마다 크기, mtime, 내용 해시, 출력 경로, 출력 설정, 상태(pending / ok / failed)를 기록하여
+#  - 바뀌지 않은 이미지는 stat 비교만으로 건너뛰고
+#  - 실패한 이미지나 출력 설정(settings)이 달라진 이미지만 다시 처리하며
+#  - 도중에 중단되면 pending으로 남은 이미지부터 이어서 처리합니다.
+# 테이블 이름을 바꿔 다른 파일 변환 작업(changeAnifToJpg.py → convert_manifest)의 기록에도 씁니다.
+
+import os
+import time
+import sqlite3
+
+from embedding_cache import file_digest
+
+STATUS_PENDING = "pending"
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+
+
+class MaskManifest:
+    def __init__(self, db_path: str, table: str = "mask_manifest", settings: str = ""):
+        """
+        table   : 작업 종류별 테이블 이름 (코드 상수만 사용)
+        settings: 출력에 영향을 주는 설정 문자열 (예: "jpeg|q=85|min_side=None"). 기록된 값과 다르면 다시 처리합니다.
+        """
+        self.table = table
+        self.settings = settings
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        # WAL: 결과를 한 건씩 커밋해도 빠르고, 강제 종료되어도 커밋된 결과는 남습니다.
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                source_path  TEXT PRIMARY KEY,
+                size         INTEGER NOT NULL,
+                mtime        REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                output_path  TEXT NOT NULL,
+                settings     TEXT NOT NULL DEFAULT '',
+                status       TEXT NOT NULL,
+                error        TEXT,
+                updated_at   REAL NOT NULL
+            )
+        """)
+        # settings 컬럼이 없던 이전 manifest는 컬럼만 추가 (기존 기록은 settings=''로 유지)
+        columns = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+        if "settings" not in columns:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN settings TEXT NOT NULL DEFAULT ''")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def _get(self, source_path: str):
+        return self.conn.execute(
+            f"SELECT size, mtime, content_hash, output_path, settings, status FROM {self.table} WHERE source_path = ?",
+            (source_path,)
+        ).fetchone()
+
+    def _upsert(self, source_path, size, mtime, content_hash, output_path, status, error=None):
+        self.conn.execute(f"""
+            INSERT INTO {self.table}
+                (source_path, size, mtime, content_hash, output_path, settings, status, error, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(source_path) DO UPDATE SET
+                size=excluded.size, mtime=excluded.mtime, content_hash=excluded.content_hash,
+                output_path=excluded.output_path, settings=excluded.settings, status=excluded.status,
+                error=excluded.error, updated_at=excluded.updated_at
+        """, (source_path, size, mtime, content_hash, output_path, self.settings, status, error, time.time()))
+
+    # -----------------------------------------------------------
+    # 처리 대상 선정
+    # -----------------------------------------------------------
+    def plan(self, source_paths, dst_dir: str, output_name=None):
+        """
+        다시 마스킹해야 하는 원본 경로 목록과 건너뛴 개수를 (to_process, skipped)로 반환합니다.
+        크기와 mtime이 같으면 해시 없이 건너뛰고, 다르면 해시를 비교해 내용이 같을 때(복사/touch)만 건너뜁니다.
+        출력 경로나 settings가 기록과 다르면 내용이 같아도 다시 처리합니다.
+        output_name(파일명) -> 출력 파일명 을 주면 확장자가 바뀌는 변환(changeAnifToJpg.py)에도 쓸 수 있습니다.
+        """
+        to_process, skipped = [], 0
+        for source_path in source_paths:
+            st = os.stat(source_path)
+            file_name = os.path.basename(source_path)
+            output_path = os.path.join(dst_dir, output_name(file_name) if output_name else file_name)
+            row = self._get(source_path)
+
+            if row is not None:
+                size, mtime, content_hash, old_output, old_settings, status = row
+                done = (status == STATUS_OK and old_output == output_path and old_settings == self.settings
+                        and os.path.exists(output_path))
+                if done and size == st.st_size and mtime == st.st_mtime:
+                    skipped += 1
+                    continue
+                new_hash = file_digest(source_path)
+                if done and new_hash == content_hash:
+                    self._upsert(source_path, st.st_size, st.st_mtime, new_hash, output_path, STATUS_OK)
+                    skipped += 1
+                    continue
+            else:
+                new_hash = file_digest(source_path)
+
+            self._upsert(source_path, st.st_size, st.st_mtime, new_hash, output_path, STATUS_PENDING)
+            to_process.append(source_path)
+
+        self.conn.commit()
+        return to_process, skipped
+
+    # -----------------------------------------------------------
+    # 결과 기록 (mask_directory의 on_result 콜백으로 사용)
+    # -----------------------------------------------------------
+    def record(self, source_path: str, output_path: str, seconds: float, error):
+        status = STATUS_OK if error is None else STATUS_FAILED
+        self.conn.execute(
+            f"UPDATE {self.table} SET output_path = ?, status = ?, error = ?, updated_at = ? WHERE source_path = ?",
+            (output_path, status, error, time.time(), source_path)
+        )
+        self.conn.commit()
+
+    def counts(self) -> dict:
+        return dict(self.conn.execute(f"SELECT status, COUNT(*) FROM {self.table} GROUP BY status").fetchall())
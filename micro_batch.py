@@ -0,0 +1,131 @@
+# micro_batch.py
+# 요청 마이크로 배치 스케줄러.
+# 여러 요청 스레드가 submit()으로 넣은 항목을 최대 max_wait_ms 동안 또는 max_batch_size개가 찰 때까지 모아
+# process_fn(items)를 한 번만 호출하고, 결과를 각 요청에 돌려줍니다. (CLIP encode_image 배치 효율 활용)
+# 요청 지연(p50/p99)과 배치 크기 분포를 기록하므로, 부하 상황에서 대기 시간 창을 조정할 수 있습니다.
+
+import time
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT_MS = 5.0
+LATENCY_WINDOW = 10000   # 최근 몇 개 요청의 지연으로 백분위수를 계산할지
+
+
+class MicroBatcher:
+    def __init__(self, process_fn, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, name: str = "micro-batch"):
+        """
+        process_fn: 항목 리스트를 받아 같은 길이의 결과 리스트를 반환하는 함수 (배치 스레드 하나에서만 호출)
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size는 1 이상이어야 합니다.")
+        self.process_fn = process_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self._batch_ms = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = Counter()
+        self._requests = 0
+        self._errors = 0
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item, timeout: float = None):
+        """항목을 다음 배치에 넣고 결과가 나올 때까지 기다립니다. (process_fn의 예외는 그대로 다시 발생)"""
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result(timeout=timeout)
+
+    # -----------------------------------------------------------
+    # 배치 스레드
+    # -----------------------------------------------------------
+    def _collect(self):
+        """첫 항목이 올 때까지 기다린 뒤, 최대 max_wait 동안 또는 max_batch_size개까지 더 모읍니다."""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            start_time = time.perf_counter()
+            try:
+                results = self.process_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"process_fn 결과 개수 불일치: {len(results)} != {len(items)}")
+                error = None
+            except Exception as e:
+                results, error = None, e
+            done_time = time.perf_counter()
+
+            for i, (_, future, _) in enumerate(batch):
+                if error is None:
+                    future.set_result(results[i])
+                else:
+                    future.set_exception(error)
+
+            with self._stats_lock:
+                self._batch_sizes[len(batch)] += 1
+                self._batch_ms.append((done_time - start_time) * 1000)
+                self._requests += len(batch)
+                if error is not None:
+                    self._errors += len(batch)
+                for _, _, submitted in batch:
+                    self._latencies_ms.append((done_time - submitted) * 1000)
+
+    # -----------------------------------------------------------
+    # 통계
+    # -----------------------------------------------------------
+    def stats(self) -> dict:
+        """요청 지연(대기 + 처리) 백분위수, 배치 처리 시간, 배치 크기 히스토그램."""
+        with self._stats_lock:
+            latencies = np.array(self._latencies_ms, dtype=np.float64)
+            batch_ms = np.array(self._batch_ms, dtype=np.float64)
+            histogram = dict(sorted(self._batch_sizes.items()))
+            requests, errors = self._requests, self._errors
+
+        def percentiles(values):
+            if len(values) == 0:
+                return {"p50": None, "p90": None, "p99": None}
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            return {"p50": float(p50), "p90": float(p90), "p99": float(p99)}
+
+        batches = sum(histogram.values())
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "requests": requests,
+            "errors": errors,
+            "batches": batches,
+            "mean_batch_size": requests / batches if batches else None,
+            "latency_ms": percentiles(latencies),
+            "batch_ms": percentiles(batch_ms),
+            "batch_size_histogram": {str(size): count for size, count in histogram.items()},
+        }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._latencies_ms.clear()
+            self._batch_ms.clear()
+            self._batch_sizes.clear()
+            self._requests = 0
+            self._errors = 0
@@ -0,0 +1,189 @@
+# migrate_vectors_binary.py
+# product_vectors.image_vector를 JSON 텍스트에서 바이너리 BLOB(vector_codec 형식)으로 변환합니다.
+# 1) 변환 전 테이블 크기 / 전체 벡터 로드 시간 측정
+# 2) image_vector_bin LONGBLOB 컬럼 추가 후, 기본 키 순서로 청크 단위 변환 (청크마다 커밋 → 중단 후 재실행 시 이어서 진행)
+# 3) 변환되지 않은 행이 하나도 없을 때만 기존 JSON 컬럼 삭제 및 image_vector_bin → image_vector 이름 변경,
+#    OPTIMIZE TABLE로 공간 회수 (파싱 실패 행이 있으면 아무것도 지우지 않고 중단)
+# 4) 변환 후 테이블 크기 / 로드 시간 측정
+
+import sys
+import time
+import mysql.connector
+from vector_codec import encode_vector, decode_vector, decode_matrix, is_binary
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+MYSQL_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '1234',
+    'database': 'aiproject',
+    'port': 3305
+}
+
+TABLE_NAME = "product_vectors"
+BIN_COLUMN = "image_vector_bin"
+VECTOR_FORMAT = "f32"   # "f32"(무손실) | "f16" | "i8"
+CHUNK_SIZE = 1000
+REPORT_LIMIT = 20       # 변환 실패 시 출력할 행 수
+
+
+def table_size_mb(cursor) -> float:
+    cursor.execute("ANALYZE TABLE " + TABLE_NAME)
+    cursor.fetchall()
+    cursor.execute(
+        "SELECT data_length + index_length FROM information_schema.TABLES "
+        "WHERE table_schema = %s AND table_name = %s",
+        (MYSQL_CONFIG['database'], TABLE_NAME)
+    )
+    (size,) = cursor.fetchone()
+    return (size or 0) / 1e6
+
+
+def measure_load(cursor, column: str) -> float:
+    """serch_mysql.py와 같은 방식으로 전체 벡터를 (N, 512) 행렬로 읽는 데 걸리는 시간."""
+    start_time = time.time()
+    cursor.execute(f"SELECT {column} FROM {TABLE_NAME}")
+    values = [v for (v,) in cursor if v is not None]
+    decode_matrix([v if is_binary(v) else decode_vector(v) for v in values])
+    return time.time() - start_time
+
+
+def column_exists(cursor, column: str) -> bool:
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE table_schema = %s AND table_name = %s AND column_name = %s",
+        (MYSQL_CONFIG['database'], TABLE_NAME, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def primary_key_columns(cursor) -> list:
+    """테이블의 기본 키 컬럼 목록 (청크 커서는 NULL이 될 수 없는 기본 키로 진행해야 모든 행을 빠짐없이 방문)"""
+    cursor.execute(
+        "SELECT column_name FROM information_schema.KEY_COLUMN_USAGE "
+        "WHERE table_schema = %s AND table_name = %s AND constraint_name = 'PRIMARY' "
+        "ORDER BY ordinal_position",
+        (MYSQL_CONFIG['database'], TABLE_NAME)
+    )
+    return [column for (column,) in cursor.fetchall()]
+
+
+def unconverted_rows(cursor, key_columns: list):
+    """원본 벡터는 있는데 바이너리 컬럼이 비어 있는 행 수와 (최대 REPORT_LIMIT개의) 기본 키 값"""
+    condition = f"{BIN_COLUMN} IS NULL AND image_vector IS NOT NULL"
+    cursor.execute(f"SELECT COUNT(*) FROM {TABLE_NAME} WHERE {condition}")
+    (count,) = cursor.fetchone()
+    cursor.execute(
+        f"SELECT {', '.join(key_columns)} FROM {TABLE_NAME} WHERE {condition} LIMIT %s", (REPORT_LIMIT,)
+    )
+    return count, cursor.fetchall()
+
+
+def migrate():
+    try:
+        conn = mysql.connector.connect(**MYSQL_CONFIG)
+        cursor = conn.cursor()
+    except mysql.connector.Error as err:
+        print(f"❌ MySQL 연결 실패: {err}")
+        sys.exit()
+
+    try:
+        # -----------------------------------------------------------
+        # 2. 변환 전 측정
+        # -----------------------------------------------------------
+        before_mb = table_size_mb(cursor)
+        before_load = measure_load(cursor, "image_vector")
+        print(f"📏 변환 전: 테이블 {before_mb:.2f}MB / 전체 벡터 로드 {before_load:.4f}초")
+
+        # -----------------------------------------------------------
+        # 3. 바이너리 컬럼 추가 및 청크 단위 변환
+        # -----------------------------------------------------------
+        if not column_exists(cursor, BIN_COLUMN):
+            cursor.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN {BIN_COLUMN} LONGBLOB NULL")
+            print(f"✅ 컬럼 '{BIN_COLUMN}' 추가")
+
+        key_columns = primary_key_columns(cursor)
+        if not key_columns:
+            print(f"❌ {TABLE_NAME}에 기본 키가 없어 모든 행을 빠짐없이 변환할 수 없습니다. 기본 키를 추가한 뒤 다시 실행하세요.")
+            return
+        keys = ", ".join(key_columns)
+        key_match = " AND ".join(f"{c} = %s" for c in key_columns)
+        n_keys = len(key_columns)
+
+        migrated, skipped, last_key = 0, 0, None
+        start_time = time.time()
+        while True:
+            # 기본 키 기준 keyset 페이지네이션 (복합 키는 행 생성자 비교)
+            after = f"({keys}) > ({', '.join(['%s'] * n_keys)}) AND " if last_key is not None else ""
+            cursor.execute(
+                f"SELECT {keys}, image_vector FROM {TABLE_NAME} "
+                f"WHERE {after}{BIN_COLUMN} IS NULL AND image_vector IS NOT NULL ORDER BY {keys} LIMIT %s",
+                (*(last_key or ()), CHUNK_SIZE)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            last_key = tuple(rows[-1][:n_keys])
+
+            updates = []
+            for row in rows:
+                key, image_vector = tuple(row[:n_keys]), row[n_keys]
+                try:
+                    updates.append((encode_vector(decode_vector(image_vector), VECTOR_FORMAT), *key))
+                except Exception:
+                    skipped += 1
+                    print(f"⚠️ 경고: {key}의 벡터 데이터 파싱 실패. 건너뜀.")
+            cursor.executemany(f"UPDATE {TABLE_NAME} SET {BIN_COLUMN} = %s WHERE {key_match}", updates)
+            conn.commit()
+            migrated += len(updates)
+            print(f"   ... {migrated}개 변환 및 커밋됨.")
+
+        print(f"✅ 변환 완료: {migrated}개 ({skipped}개 건너뜀, 소요 시간: {time.time() - start_time:.4f}초)")
+
+        # -----------------------------------------------------------
+        # 4. 컬럼 교체 및 공간 회수 (변환되지 않은 행이 있으면 원본 컬럼을 지우지 않고 중단)
+        # -----------------------------------------------------------
+        remaining, samples = unconverted_rows(cursor, key_columns)
+        if remaining:
+            print(f"❌ 바이너리로 변환되지 않은 행이 {remaining}개 있어 image_vector 컬럼을 교체하지 않습니다. "
+                  f"(기본 키 {keys}, 최대 {REPORT_LIMIT}개 표시)")
+            for sample in samples:
+                print(f"   - {sample}")
+            print(f"   해당 행의 image_vector를 고치거나 지운 뒤 다시 실행하세요. ({BIN_COLUMN}에 변환분은 유지됨)")
+            return
+
+        if column_exists(cursor, BIN_COLUMN):
+            cursor.execute(
+                f"ALTER TABLE {TABLE_NAME} DROP COLUMN image_vector, "
+                f"RENAME COLUMN {BIN_COLUMN} TO image_vector"
+            )
+            cursor.execute(f"OPTIMIZE TABLE {TABLE_NAME}")
+            cursor.fetchall()
+            print("✅ image_vector 컬럼을 바이너리 형식으로 교체했습니다.")
+
+        # -----------------------------------------------------------
+        # 5. 변환 후 측정
+        # -----------------------------------------------------------
+        after_mb = table_size_mb(cursor)
+        after_load = measure_load(cursor, "image_vector")
+        print("\n" + "=" * 50)
+        print(f"{'':<12}{'테이블(MB)':>14}{'로드(초)':>12}")
+        print(f"{'JSON':<12}{before_mb:>14.2f}{before_load:>12.4f}")
+        print(f"{VECTOR_FORMAT + ' BLOB':<12}{after_mb:>14.2f}{after_load:>12.4f}")
+        print(f"{'개선':<12}{before_mb / max(after_mb, 1e-9):>13.1f}x{before_load / max(after_load, 1e-9):>11.1f}x")
+        print("=" * 50)
+
+    except mysql.connector.Error as err:
+        conn.rollback()
+        print(f"❌ 마이그레이션 중 오류 발생 ({err.errno}): {err.msg}")
+
+    finally:
+        cursor.close()
+        conn.close()
+        print("👋 MySQL 연결 종료.")
+
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,137 @@
+# product_metadata.py
+# MySQL product 테이블의 카테고리 / 가격 / 평점 / 제조사를 Weaviate ImageObject 속성으로 동기화합니다.
+# 필터 조건이 Weaviate 안에 있으므로 "30만원 이하 유모차 중 비슷한 이미지"를 near_vector + filters 한 번으로 조회할 수 있습니다.
+# (hybrid_search.py 참고)
+#
+# 실행: init_db.py → save_to_db_add_product_id.py → python product_metadata.py
+# 값이 바뀐 객체만 같은 UUID로 다시 배치 전송(덮어쓰기)하므로, 재실행 시에는 변경분만 전송됩니다.
+
+import sys
+import time
+import mysql.connector
+from weaviate.classes.config import Property, DataType, Tokenization
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+MYSQL_CONFIG = {
+    'host': 'localhost',
+    'user': 'root',
+    'password': '1234',
+    'database': 'aiproject',
+    'port': 3305
+}
+PRODUCT_TABLE = "product"
+METADATA_FIELDS = ["categori_id", "min_price", "max_price", "average_rating", "manufacturer"]
+
+
+def metadata_properties():
+    """ImageObject 컬렉션에 추가되는 필터용 속성 정의. (init_db.py와 기존 컬렉션 보강에 함께 사용)"""
+    return [
+        Property(name="categori_id", data_type=DataType.INT, index_filterable=True),
+        # index_range_filters: 가격/평점 범위 조건(<, <=, >)을 범위 전용 인덱스로 처리
+        Property(name="min_price", data_type=DataType.INT, index_filterable=True, index_range_filters=True),
+        Property(name="max_price", data_type=DataType.INT, index_filterable=True, index_range_filters=True),
+        Property(name="average_rating", data_type=DataType.NUMBER, index_filterable=True, index_range_filters=True),
+        # 제조사는 이름 전체 일치로만 필터링하므로 토큰화하지 않음
+        Property(name="manufacturer", data_type=DataType.TEXT, index_filterable=True,
+                 index_searchable=False, tokenization=Tokenization.FIELD),
+    ]
+
+
+def _clean(field, value):
+    if value is None:
+        return None
+    if field == "average_rating":
+        return float(value)
+    if field == "manufacturer":
+        return str(value)
+    return int(value)
+
+
+def load_product_metadata(mysql_cursor, product_ids=None) -> dict:
+    """product_id → {categori_id, min_price, max_price, average_rating, manufacturer}. product_ids가 주어지면 해당 상품만 조회."""
+    sql = f"SELECT product_id, {', '.join(METADATA_FIELDS)} FROM {PRODUCT_TABLE}"
+    params = ()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return {}
+        sql += f" WHERE product_id IN ({', '.join(['%s'] * len(product_ids))})"
+        params = tuple(product_ids)
+    mysql_cursor.execute(sql, params)
+    return {
+        int(row[0]): {field: _clean(field, value) for field, value in zip(METADATA_FIELDS, row[1:])}
+        for row in mysql_cursor
+    }
+
+
+def ensure_metadata_properties(collection):
+    """init_db.py 이전 스키마로 만들어진 컬렉션이면 빠진 메타데이터 속성을 추가합니다."""
+    existing = {p.name for p in collection.config.get().properties}
+    for prop in metadata_properties():
+        if prop.name not in existing:
+            collection.config.add_property(prop)
+            print(f"✅ 속성 '{prop.name}' 추가")
+
+
+def sync_metadata(collection, metadata: dict) -> dict:
+    """메타데이터가 바뀐 객체만 (properties, vector, uuid)로 다시 전송합니다."""
+    from weaviate_ingest import stream_insert
+
+    stats = {"scanned": 0, "unchanged": 0, "missing": 0}
+
+    def changed_objects():
+        for obj in collection.iterator(include_vector=True):
+            stats["scanned"] += 1
+            props = obj.properties
+            product_id = props.get("product_id")
+            meta = metadata.get(int(product_id)) if product_id is not None else None
+            if meta is None:
+                stats["missing"] += 1
+                continue
+            if all(props.get(field) == meta[field] for field in METADATA_FIELDS):
+                stats["unchanged"] += 1
+                continue
+            yield {**props, **meta}, obj.vector.get("default"), obj.uuid
+
+    stats["ingest"] = stream_insert(collection, changed_objects())
+    return stats
+
+
+if __name__ == "__main__":
+    from utils import connect_to_weaviate, WEAVIATE_CLASS_NAME
+
+    try:
+        conn = mysql.connector.connect(**MYSQL_CONFIG)
+        cursor = conn.cursor()
+    except mysql.connector.Error as err:
+        print(f"❌ MySQL 연결 실패: {err}")
+        sys.exit()
+
+    client = connect_to_weaviate()
+    try:
+        start_time = time.time()
+        metadata = load_product_metadata(cursor)
+        print(f"📥 MySQL '{PRODUCT_TABLE}'에서 {len(metadata)}개 상품 메타데이터 로드 ({time.time() - start_time:.4f}초)")
+
+        collection = client.collections.get(WEAVIATE_CLASS_NAME)
+        ensure_metadata_properties(collection)
+
+        print("🔄 Weaviate 객체와 비교하여 변경분 동기화 중...")
+        stats = sync_metadata(collection, metadata)
+        ingest = stats["ingest"]
+        print(f"\n✅ 동기화 완료: {stats['scanned']}개 확인, {ingest['inserted']}개 갱신, "
+              f"{stats['unchanged']}개 변경 없음, {stats['missing']}개 MySQL에 없음 "
+              f"(소요 시간: {time.time() - start_time:.4f}초)")
+        for uuid, message in ingest["failed"][:10]:
+            print(f"   ❌ 실패: {uuid} ({message})")
+
+    except Exception as e:
+        print(f"❌ 메타데이터 동기화 실패: {e}")
+
+    finally:
+        cursor.close()
+        conn.close()
+        client.close()
+        print("👋 모든 DB 연결 종료.")
@@ -6,8 +6,7 @@ from PIL import Image
 import weaviate
 from weaviate.classes.config import Configure, Property, DataType
 from weaviate.classes.query import MetadataQuery
-# 🚨 DataObject import는 이미 상단에 잘 되어 있습니다.
-from weaviate.classes.data import DataObject 
+from weaviate_ingest import stream_insert
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -106,7 +105,7 @@ except Exception as e:
     sys.exit()
     
 # ==========================
-# 3. 데이터 로드 및 업로드 (최종 수정: DataObject 사용)
+# 3. 데이터 로드 및 업로드 (스트리밍 배치 전송)
 # ==========================
 image_dir = "images"
 image_paths = [os.path.join(image_dir, f) for f in os.listdir(image_dir)
@@ -119,51 +118,40 @@ if len(image_paths) == 0:
 # 🚨 컬렉션 객체를 가져옵니다. 🚨
 collection = client.collections.get(WEAVIATE_CLASS_NAME)
 
-# 🚨 삽입할 객체들을 DataObject로 리스트에 모읍니다. 🚨
-data_objects_to_insert = []
+# 🚨 객체를 리스트에 모으지 않고, 만들어지는 대로 배치 전송 스트림에 넘깁니다. 🚨
 print("\n🔄 데이터 객체 및 벡터 생성 시작...")
 
-for path in image_paths:
-    print(f"🔹 Processing: {path}")
-    
-    try:
-        input_image_pil = Image.open(path)
-        # Python에서 직접 벡터를 계산합니다.
-        vector = image_to_vector(input_image_pil, remove_bg=True)
+def generate_objects():
+    for path in image_paths:
+        print(f"🔹 Processing: {path}")
 
-        # 🚨🚨🚨 추가된 검증 로직 시작 🚨🚨🚨
-        if vector and len(vector) > 0:
-            print(f"✅ Vector OK: Length={len(vector)}, First Value={vector[0]:.6f}")
-        else:
-            # 벡터 생성에 실패했거나 비어있는 경우 경고를 출력합니다.
-            print(f"❌ WARNING: Vector is EMPTY or None for {path}. Skipping or may cause DB errors.")
-            # 벡터가 비어있으면 다음 파일로 넘어가는 것이 안전합니다.
-            if not vector:
-                continue 
-        # 🚨🚨🚨 추가된 검증 로직 끝 🚨🚨🚨
-        
-        data_object_properties = {
-            "imagePath": path,
-        }
-        
-        # 🚨 DataObject 클래스를 사용하여 객체 생성 및 리스트에 추가 (문제 해결 구문) 🚨
-        data_objects_to_insert.append(
-            DataObject(
-                properties=data_object_properties,
-                vector=vector
-            )
-        )
-        
-    except Exception as e:
-        print(f"❌ 파일 처리 오류 ({path}): {e}")
+        try:
+            input_image_pil = Image.open(path)
+            # Python에서 직접 벡터를 계산합니다.
+            vector = image_to_vector(input_image_pil, remove_bg=True)
+
+            # 🚨🚨🚨 추가된 검증 로직 시작 🚨🚨🚨
+            if vector and len(vector) > 0:
+                print(f"✅ Vector OK: Length={len(vector)}, First Value={vector[0]:.6f}")
+            else:
+                # 벡터 생성에 실패했거나 비어있는 경우 경고를 출력하고 다음 파일로 넘어갑니다.
+                print(f"❌ WARNING: Vector is EMPTY or None for {path}. Skipping.")
+                continue
+            # 🚨🚨🚨 추가된 검증 로직 끝 🚨🚨🚨
+
+            yield {"imagePath": path}, vector
+
+        except Exception as e:
+            print(f"❌ 파일 처리 오류 ({path}): {e}")
 
-# 🚨 insert_many를 사용하여 한 번에 데이터 삽입 🚨
-print(f"\n📦 Weaviate에 {len(data_objects_to_insert)}개 데이터 전송 중...")
+# 🚨 dynamic 배치로 전송 (벡터 계산과 네트워크 전송이 겹쳐서 진행, 실패 객체만 재시도) 🚨
+print(f"\n📦 Weaviate로 배치 전송 시작...")
 
 try:
-    # insert_many는 DataObject 리스트를 받아 자동으로 배치 전송합니다.
-    collection.data.insert_many(data_objects_to_insert)
-    print(f"\n✅ All {len(data_objects_to_insert)} images processed and sent to Weaviate for indexing.")
+    stats = stream_insert(collection, generate_objects())
+    print(f"\n✅ {stats['inserted']}/{stats['sent']} images processed and sent to Weaviate for indexing.")
+    for uuid, message in stats["failed"]:
+        print(f"   ❌ 실패: {uuid} ({message})")
 
 except Exception as e:
     print(f"\n❌ Weaviate 삽입 최종 실패: {e}")
@@ -0,0 +1,70 @@
+# sam_cache.py
+# SAM 이미지 인코더(ViT) 출력의 디스크 캐시.
+# set_image()는 CPU에서 이미지당 수 초가 걸리지만, 박스/포인트 프롬프트에 따른 마스크 디코딩은 수 ms입니다.
+# 인코더 출력(get_image_embedding(), (1, 256, 64, 64))과 original_size / input_size를 이미지 해시 + 모델 종류 키로 저장해 두고,
+# 다음 실행에서는 predictor 상태를 캐시에서 복원하므로 박스 여백(margin_ratio) 등을 바꿔 가며 실험해도 인코더를 다시 돌리지 않습니다.
+
+import os
+import numpy as np
+
+DEFAULT_SAM_CACHE_DIR = "cache/sam"
+
+
+class SamFeatureCache:
+    def __init__(self, model_type: str, cache_dir: str = DEFAULT_SAM_CACHE_DIR, dtype: str = "float32"):
+        """
+        model_type: "vit_h" / "vit_l" / "vit_b" (모델마다 특징이 다르므로 폴더를 나눔)
+        dtype: 저장 자료형. "float16"이면 파일 크기가 절반(약 2MB/장)이 되고, 복원 시 float32로 되돌립니다.
+        """
+        self.model_type = model_type
+        self.dtype = np.dtype(dtype)
+        self.cache_dir = os.path.join(cache_dir, model_type)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.npz")
+
+    def load(self, digest: str):
+        """(features (1, 256, 64, 64) float32, original_size, input_size) 또는 None"""
+        path = self._path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return (data["features"].astype(np.float32),
+                        tuple(int(v) for v in data["original_size"]),
+                        tuple(int(v) for v in data["input_size"]))
+        except Exception:
+            return None  # 깨진 파일은 다시 계산해서 덮어씀
+
+    def save(self, digest: str, features, original_size, input_size):
+        """임시 파일에 쓴 뒤 교체하여, 중단되어도 깨진 캐시 파일이 남지 않게 합니다."""
+        tmp_path = self._path(digest) + ".tmp.npz"
+        np.savez(tmp_path, features=np.asarray(features, dtype=self.dtype),
+                 original_size=np.asarray(original_size), input_size=np.asarray(input_size))
+        os.replace(tmp_path, self._path(digest))
+
+    def set_image(self, predictor, image_rgb: np.ndarray, digest: str) -> bool:
+        """
+        predictor.set_image(image_rgb)와 같은 상태를 만듭니다. 캐시에 있으면 인코더를 건너뛰고 복원합니다.
+        digest: 이미지 내용 해시 (embedding_cache.file_digest). 반환값: 캐시 적중 여부
+        """
+        cached = self.load(digest)
+        if cached is not None:
+            import torch
+            features, original_size, input_size = cached
+            predictor.reset_image()
+            predictor.features = torch.from_numpy(features).to(predictor.device)
+            predictor.original_size = original_size
+            predictor.input_size = input_size
+            predictor.is_image_set = True
+            self.hits += 1
+            return True
+
+        predictor.set_image(image_rgb)
+        self.save(digest, predictor.get_image_embedding().cpu().numpy(),
+                  predictor.original_size, predictor.input_size)
+        self.misses += 1
+        return False
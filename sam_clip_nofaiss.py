@@ -1,81 +1,19 @@
 import os
-import cv2
-import torch
 import numpy as np
-import clip 
-from PIL import Image
-from sklearn.metrics.pairwise import cosine_similarity # 코사인 유사도 계산에 사용
-
-# SAM 관련 라이브러리 (이전 코드와 동일하게 유지)
-from segment_anything import sam_model_registry, SamPredictor
 
 # ==========================
 # 1. SAM 및 CLIP 모델 로드 (Faiss 사용 코드와 동일)
 # ==========================
-sam_checkpoint = "weights/sam_vit_h_4b8939.pth" 
+# 백본: "vit_h"(2.4GB, 가장 느림) / "vit_l" / "vit_b"(375MB) / "vit_t"(MobileSAM, 40MB)
+# CPU 노드에서는 bench_segmenters.py의 지연/메모리/검색 recall 결과를 보고 가장 가벼운 백본을 고르세요.
 model_type = "vit_h"
-device = "cuda" if torch.cuda.is_available() else "cpu"
-
-sam = sam_model_registry[model_type](checkpoint=sam_checkpoint)
-sam.to(device=device)
-sam_predictor = SamPredictor(sam)
-
-clip_model, preprocess = clip.load("ViT-B/32", device=device)
-clip_model.eval() 
+MARGIN_RATIO = 0.1  # 바운딩 박스 프롬프트의 상하좌우 여백 비율 (바꿔도 인코더는 캐시에서 복원)
 
-# 이전 코드의 get_clip_embedding_from_masked_object 함수를 그대로 사용합니다.
-# (이 함수는 임베딩 추출 및 L2 정규화까지 완료된 벡터를 반환합니다.)
-def get_clip_embedding_from_masked_object(image_path):
-    # (코드는 Faiss 사용 코드와 완전히 동일합니다. 중복을 피하기 위해 생략)
-    # 1. 이미지 로드 및 SAM 마스크 추출...
-    image_bgr = cv2.imread(image_path)
-    if image_bgr is None:
-        raise FileNotFoundError(f"Image not found at {image_path}")
-        
-    image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    sam_predictor.set_image(image_rgb)
-    
-    H, W, _ = image_rgb.shape
-    margin_ratio = 0.1
-    x_min = int(W * margin_ratio); y_min = int(H * margin_ratio)
-    x_max = int(W * (1 - margin_ratio)); y_max = int(H * (1 - margin_ratio))
-    input_box = np.array([[x_min, y_min, x_max, y_max]])
-    print(f"    -> SAM Bounding Box Prompt: {input_box[0]}")
-
-    masks, scores, _ = sam_predictor.predict(
-        point_coords=None, point_labels=None, box=input_box, multimask_output=False
-    )
-    
-    if masks is None or not masks.any():
-        print(f"⚠️ Warning: No main object mask found for {image_path}. Using full image.")
-        mask = np.ones((H, W), dtype=bool)
-    else:
-        print(f"    -> SAM Mask Score: {scores[0]:.4f}")
-        mask = masks[0]
-        
-    masked_image_rgb = image_rgb * mask[:, :, np.newaxis]
-    
-    # 이미지 저장 (masked_images 폴더)
-    save_dir = "masked_images"; os.makedirs(save_dir, exist_ok=True)
-    base_name = os.path.basename(image_path)
-    file_name_without_ext = os.path.splitext(base_name)[0]
-    save_path = os.path.join(save_dir, f"{file_name_without_ext}_masked.png")
-    masked_image_bgr = cv2.cvtColor(masked_image_rgb, cv2.COLOR_RGB2BGR)
-    cv2.imwrite(save_path, masked_image_bgr)
-    print(f"    💾 Masked image saved to: {save_path}")
-    
-    image_pil = Image.fromarray(masked_image_rgb)
-    image_tensor = preprocess(image_pil).unsqueeze(0).to(device)
-    
-    with torch.no_grad():
-        embedding = clip_model.encode_image(image_tensor)
-        
-    embedding_np = embedding.cpu().numpy().astype("float32")
-    # L2 정규화 (코사인 유사도 계산을 위해 필수)
-    embedding_norm = embedding_np / np.linalg.norm(embedding_np) 
-    
-    return embedding_norm.flatten()
+# SAM 마스킹 + CLIP 임베딩은 embedder.py의 Embedder가 담당합니다. (sam_clip_faiss.py와 동일)
+from embedder import Embedder
 
+BATCH_SIZE = 32  # CLIP 인코딩 배치 크기
+DEBUG_DIR = None  # 마스킹 결과 PNG를 확인하려면 "masked_images" 등으로 지정 (백그라운드 저장)
 
 # ==========================
 # 2. 이미지 처리 및 임베딩 추출 (Faiss 사용 코드와 동일)
@@ -87,13 +25,13 @@ image_paths = [os.path.join(image_dir, f) for f in os.listdir(image_dir)
 if len(image_paths) < 2:
     raise ValueError("❌ 비교할 이미지가 2개 이상 필요합니다!")
 
-embeddings = []
-for path in image_paths:
-    print(f"🔹 Processing: {path}")
-    emb = get_clip_embedding_from_masked_object(path) 
-    embeddings.append(emb)
-
-embeddings = np.array(embeddings).astype("float32")
+# 내용이 바뀌지 않은 이미지는 디스크 캐시에서 바로 가져오고, 새 이미지만 SAM + CLIP을 거칩니다.
+embedder = Embedder(masker="sam_box", model_type=model_type, margin_ratio=MARGIN_RATIO,
+                    batch_size=BATCH_SIZE, debug_dir=DEBUG_DIR)
+print(f"🔹 Processing {len(image_paths)} images (mode: {embedder.mode})")
+# L2 정규화 (코사인 유사도 계산을 위해 필수)까지 완료된 float32 (N, 512) 배열
+embeddings = embedder.embed_paths(image_paths)
+embedder.close()
 print(f"✅ All embeddings extracted. Total images: {len(embeddings)}")
 
 
@@ -1,28 +1,37 @@
 import os
 import cv2
-import torch
 import numpy as np
-import faiss
 # CLIP 관련 라이브러리 제거
 from PIL import Image
 from sklearn.preprocessing import normalize # 벡터 정규화에 필요
+from faiss_store import build_index, set_search_params
 
-# SAM 관련 라이브러리는 객체 마스크와 임베딩을 위해 유지합니다.
-from segment_anything import sam_model_registry, SamPredictor
+# SAM 로드는 segmenters.py에서 (vit_b / vit_l / vit_h / MobileSAM 교체 가능)
+from segmenters import load_sam_predictor, SAM_CHECKPOINTS
 
 
 # ==========================
 # 1. SAM 모델 로드
 # ==========================
 # SAM 설정 (객체 마스크 및 이미지 임베딩 추출 용도)
-sam_checkpoint = "weights/sam_vit_h_4b8939.pth" # 실제 경로로 수정하세요
+# 백본: "vit_h"(2.4GB, 가장 느림) / "vit_l" / "vit_b"(375MB) / "vit_t"(MobileSAM, 40MB)
+# CPU 노드에서는 bench_segmenters.py의 지연/메모리/검색 recall 결과를 보고 가장 가벼운 백본을 고르세요.
 model_type = "vit_h"
-device = "cuda" if torch.cuda.is_available() else "cpu" # GPU 사용 가능 여부 확인
+sam_checkpoint = SAM_CHECKPOINTS[model_type] # 실제 경로로 수정하세요
 
 # SAM 모델 로드
-sam = sam_model_registry[model_type](checkpoint=sam_checkpoint)
-sam.to(device=device)
-sam_predictor = SamPredictor(sam) # 변수 이름 변경
+sam_predictor = load_sam_predictor(model_type, sam_checkpoint)
+
+# SAM 인코더 출력 캐시 (이미지 해시 + model_type 키): 같은 이미지는 set_image의 ViT 인코더를 다시 돌리지 않음
+from sam_cache import SamFeatureCache
+from embedding_cache import file_digest
+sam_cache = SamFeatureCache(model_type)
+MARGIN_RATIO = 0.1  # 바운딩 박스 프롬프트의 상하좌우 여백 비율 (바꿔도 인코더는 캐시에서 복원)
+
+# FAISS 인덱스 설정 ("Flat" = 정확 검색, "IVFauto,Flat" / "HNSW32" / "IVFauto,PQ64" / "OPQ64,IVFauto,PQ64" = 근사 검색)
+INDEX_SPEC = "Flat"
+NPROBE = 16       # IVF 계열 검색 시 탐색할 리스트 수
+EF_SEARCH = 64    # HNSW 검색 폭
 
 
 # ==========================
@@ -38,11 +47,11 @@ def get_sam_embedding_from_masked_object(image_path):
     image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
     
     # SAM에게 이미지 정보를 전달하고, 전체 이미지 임베딩 계산 (마스크와 무관)
-    sam_predictor.set_image(image_rgb)
+    sam_cache.set_image(sam_predictor, image_rgb, file_digest(image_path))  # 인코더 출력은 디스크 캐시에서 복원
     
     # 🟢🟢🟢 바운딩 박스 프롬프트 사용 (중앙 80% 영역) 🟢🟢🟢
     H, W, _ = image_rgb.shape
-    margin_ratio = 0.1 # 상하좌우 10% 여백
+    margin_ratio = MARGIN_RATIO
     x_min = int(W * margin_ratio)
     y_min = int(H * margin_ratio)
     x_max = int(W * (1 - margin_ratio))
@@ -123,10 +132,11 @@ print(f"\n✅ All SAM embeddings extracted. Shape: {embeddings.shape}")
 # 4. Faiss 인덱스 생성 및 유사도 검색
 # ==========================
 dimension = embeddings.shape[1]
-# L2 거리 기반 인덱스 사용
-index = faiss.IndexFlatL2(dimension)
+# L2 거리 기반 인덱스 사용 (INDEX_SPEC이 IVF/HNSW/PQ 계열이면 embeddings 샘플로 학습 후 근사 검색)
+index = build_index(dimension, INDEX_SPEC, metric="l2", train_vectors=embeddings)
 index.add(embeddings)
-print("✅ FAISS IndexFlatL2 built.")
+set_search_params(index, nprobe=NPROBE, ef_search=EF_SEARCH)
+print(f"✅ FAISS '{INDEX_SPEC}' L2 index built.")
 
 # 5. 유사도 검색 (예: 첫 번째 이미지 기준)
 query_idx = 0
@@ -144,6 +154,8 @@ print("📸 Most similar images:")
 cosine_similarities = 1 - (distances ** 2) / 2
 
 for rank, idx in enumerate(indices[0]):
+    if idx == -1:  # 근사 인덱스에서 후보가 k개보다 적으면 -1로 채워짐
+        continue
     similarity = cosine_similarities[0][rank]
     
     # 첫 번째 결과는 쿼리 이미지 자신
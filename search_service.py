@@ -0,0 +1,328 @@
+# search_service.py
+# 상주형 유사 상품 검색 서버 (표준 라이브러리 http.server 기반).
+# CLIP / rembg 모델과 벡터 인덱스를 시작할 때 한 번만 로드하고, Weaviate 클라이언트와 MySQL 커넥션 풀을 유지하므로
+# 요청마다 모델 로딩(수 초) 없이 수 ms 단위로 응답합니다.
+#
+#   GET  /similar/{product_id}?limit=5          : 해당 상품 이미지와 비슷한 상품
+#   POST /search-by-image?limit=5&remove_bg=1   : 업로드한 이미지와 비슷한 상품
+#        (본문에 이미지 바이트 그대로 또는 multipart/form-data의 첫 번째 파일)
+#        예) curl --data-binary @query.jpg "http://127.0.0.1:8000/search-by-image?limit=5"
+#   GET  /search-by-text?q=a+baby+stroller&limit=5 : CLIP 텍스트 인코더로 질의를 벡터화해 이미지 벡터 검색
+#   GET  /stats                                 : 마이크로 배치 요청 지연(p50/p99)과 배치 크기 분포 (?reset=1이면 초기화)
+#   GET  /health
+#
+# 실행: python search_service.py
+
+import io
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import mysql.connector
+from mysql.connector import pooling
+from PIL import Image
+
+from utils import (connect_to_weaviate, get_clip_model, get_rembg_session, images_to_vectors,
+                   load_image, remove_background, text_to_vector, WEAVIATE_CLASS_NAME)
+from micro_batch import MicroBatcher
+from product_metadata import MYSQL_CONFIG, load_product_metadata
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+HOST = "127.0.0.1"
+PORT = 8000
+SEARCH_BACKEND = "weaviate"   # "weaviate": near_vector / "mysql": product_vectors 전체를 압축 행렬(vector_store.py)로 올려 NumPy Top-k
+MYSQL_POOL_SIZE = 8
+DEFAULT_LIMIT = 5
+MAX_LIMIT = 100
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+WARM_REMBG = True             # 업로드 이미지 배경 제거용 rembg 세션도 미리 로드
+# /search-by-image 마이크로 배치: 동시에 들어온 업로드를 최대 MAX_WAIT_MS 또는 MAX_BATCH_SIZE개까지 모아
+# CLIP 인코딩과 검색을 배치당 한 번에 수행 (/stats의 지연/배치 크기 분포를 보고 조정)
+MICRO_BATCH_MAX_SIZE = 16
+MICRO_BATCH_MAX_WAIT_MS = 5.0
+
+
+class SearchService:
+    """모델 / 인덱스 / DB 연결을 프로세스 수명 동안 유지하는 검색 서비스. 모든 메서드는 여러 요청 스레드에서 동시에 호출됩니다."""
+
+    def __init__(self, backend: str = SEARCH_BACKEND):
+        if backend not in ("weaviate", "mysql"):
+            raise ValueError(f"지원하지 않는 검색 백엔드: {backend}")
+        self.backend = backend
+        self._encode_lock = threading.Lock()  # CLIP forward는 한 번에 하나씩 (요청 스레드 수만큼 코어를 나눠 쓰지 않도록)
+        self._vectors_lock = threading.Lock()
+
+        start_time = time.time()
+        self.pool = pooling.MySQLConnectionPool(pool_name="search_service", pool_size=MYSQL_POOL_SIZE,
+                                                **MYSQL_CONFIG)
+        self.client = None
+        self.collection = None
+        if backend == "weaviate":
+            self.client = connect_to_weaviate()
+            self.collection = self.client.collections.get(WEAVIATE_CLASS_NAME)
+        else:
+            self.reload_vectors()
+
+        # 모델 로드 + 더미 이미지로 한 번 실행해 첫 요청의 초기화 지연을 없앰
+        get_clip_model()
+        if WARM_REMBG:
+            get_rembg_session()
+        self.encode_images([Image.new("RGB", (224, 224))], remove_bg=False)
+        self.image_batcher = MicroBatcher(self._search_image_batch, max_batch_size=MICRO_BATCH_MAX_SIZE,
+                                          max_wait_ms=MICRO_BATCH_MAX_WAIT_MS, name="search-by-image")
+        print(f"✅ 검색 서비스 준비 완료 (backend: {backend}, 소요 시간: {time.time() - start_time:.2f}초)")
+
+    # -----------------------------------------------------------
+    # 연결 / 인덱스
+    # -----------------------------------------------------------
+    @contextmanager
+    def mysql_cursor(self):
+        """풀에서 연결을 빌려 커서를 제공하고, 끝나면 연결을 풀에 돌려줍니다."""
+        conn = self.pool.get_connection()
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            conn.close()
+
+    def reload_vectors(self):
+        """mysql 백엔드: product_vectors 전체를 float16 / int8 압축 저장소로 다시 읽습니다. (serch_mysql.STORE_DTYPE)"""
+        from serch_mysql import load_vector_store
+        with self.mysql_cursor() as cursor:
+            store = load_vector_store(cursor)
+        with self._vectors_lock:
+            self.store = store
+        print(f"📥 벡터 {len(store)}개 로드 완료 ({store.dtype}, {store.nbytes / 1024 ** 2:.1f}MB)")
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    # -----------------------------------------------------------
+    # 벡터 조회 / 인코딩 / 검색
+    # -----------------------------------------------------------
+    def vector_for_product(self, product_id: int):
+        """
+        상품의 대표 벡터. 한 상품에 이미지가 여러 장이면 imagePath가 가장 작은 이미지(예: 123_1.jpg)를 씁니다.
+        (두 백엔드가 같은 이미지를 고르도록 고정)
+        """
+        if self.backend == "mysql":
+            row = self.store.primary_row(product_id)
+            return None if row is None else self.store.vector(row)
+
+        from weaviate.classes.query import Filter, Sort
+        response = self.collection.query.fetch_objects(
+            limit=1, filters=Filter.by_property("product_id").equal(product_id),
+            sort=Sort.by_property("imagePath", ascending=True), include_vector=True)
+        if not response.objects:
+            return None
+        return np.asarray(response.objects[0].vector["default"], dtype=np.float32)
+
+    def encode_images(self, images, remove_bg: bool = True) -> np.ndarray:
+        with self._encode_lock:
+            return images_to_vectors(images, batch_size=max(len(images), 1), remove_bg=remove_bg)
+
+    def search_vectors(self, vectors: np.ndarray, limit: int, exclude_ids=None):
+        """
+        쿼리 벡터 (Q, 512)마다 상위 limit개를 찾습니다. exclude_ids: 쿼리별로 결과에서 뺄 product_id (없으면 None)
+        반환값: 쿼리별 [{"product_id", "image_path", "similarity"}, ...] 리스트
+        """
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        exclude_ids = exclude_ids if exclude_ids is not None else [None] * len(vectors)
+
+        if self.backend == "mysql":
+            store = self.store
+            # weaviate의 product_id != pid 필터와 같게, 그 상품의 모든 이미지 행을 제외
+            exclude_rows = [store.rows_of_product(pid) for pid in exclude_ids]
+            top_rows, top_scores = store.search(vectors, limit, exclude_rows=exclude_rows)
+            return [[{"product_id": int(store.product_ids[r]), "image_path": store.image_path(r),
+                      "similarity": float(s)} for r, s in zip(rows, scores) if np.isfinite(s)]
+                    for rows, scores in zip(top_rows, top_scores)]
+
+        from weaviate.classes.query import Filter, MetadataQuery
+        results = []
+        for vector, pid in zip(vectors, exclude_ids):
+            response = self.collection.query.near_vector(
+                near_vector=vector.tolist(),
+                limit=limit,
+                filters=Filter.by_property("product_id").not_equal(pid) if pid is not None else None,
+                return_metadata=MetadataQuery(distance=True),
+            )
+            results.append([{"product_id": int(o.properties["product_id"]),
+                             "image_path": o.properties["imagePath"],
+                             "similarity": 1 - (o.metadata.distance or 0)} for o in response.objects])
+        return results
+
+    def attach_metadata(self, hits):
+        """검색 결과에 MySQL product 테이블의 카테고리 / 가격 / 평점 / 제조사를 붙입니다. (풀 연결 1회 조회)"""
+        if not hits:
+            return hits
+        with self.mysql_cursor() as cursor:
+            metadata = load_product_metadata(cursor, {h["product_id"] for h in hits})
+        for h in hits:
+            h.update(metadata.get(h["product_id"], {}))
+        return hits
+
+    def similar(self, product_id: int, limit: int = DEFAULT_LIMIT):
+        vector = self.vector_for_product(product_id)
+        if vector is None:
+            return None
+        return self.attach_metadata(self.search_vectors(vector, limit, exclude_ids=[product_id])[0])
+
+    def search_by_text(self, text: str, limit: int = DEFAULT_LIMIT):
+        with self._encode_lock:
+            vector = text_to_vector(text)  # 반복 질의는 LRU 캐시 적중
+        return self.attach_metadata(self.search_vectors(vector, limit)[0])
+
+    def _search_image_batch(self, requests):
+        """마이크로 배치 스레드: (배경 제거된 이미지, limit) 묶음을 CLIP 배치 1회 + 검색 1회로 처리하고 요청별로 나눕니다."""
+        vectors = self.encode_images([image for image, _ in requests], remove_bg=False)
+        max_limit = max(limit for _, limit in requests)
+        results = self.search_vectors(vectors, max_limit)
+        self.attach_metadata([h for r in results for h in r])  # 메타데이터 조회도 배치당 1회 (결과 dict에 직접 추가)
+        return [r[:limit] for r, (_, limit) in zip(results, requests)]
+
+    def search_by_image(self, image: Image.Image, limit: int = DEFAULT_LIMIT, remove_bg: bool = True):
+        # 배경 제거는 요청 스레드에서 병렬로 수행하고, CLIP 인코딩/검색만 마이크로 배치로 모읍니다.
+        image = remove_background(image) if remove_bg else image.convert("RGB")
+        return self.image_batcher.submit((image, limit))
+
+
+# -----------------------------------------------------------
+# 2. HTTP 핸들러
+# -----------------------------------------------------------
+def _read_upload(content_type: str, body: bytes) -> bytes:
+    """multipart/form-data면 첫 번째 파일 파트를, 아니면 본문 전체를 이미지 바이트로 봅니다."""
+    if not content_type.startswith("multipart/form-data"):
+        return body
+    message = BytesParser(policy=default_policy).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+    for part in message.iter_parts():
+        if part.get_filename() is not None or part.get_content_maintype() == "image":
+            return part.get_payload(decode=True)
+    raise ValueError("multipart 본문에 이미지 파일이 없습니다.")
+
+
+class SearchRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ProductSearch/1.0"
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _limit(self, query):
+        try:
+            return max(1, min(int(query.get("limit", [DEFAULT_LIMIT])[0]), MAX_LIMIT))
+        except ValueError:
+            return DEFAULT_LIMIT
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        service = self.server.service
+        start_time = time.perf_counter()
+
+        if url.path == "/health":
+            return self._send_json(200, {"status": "ok", "backend": service.backend})
+
+        if url.path == "/stats":
+            stats = {"search_by_image": service.image_batcher.stats()}
+            if parse_qs(url.query).get("reset", ["0"])[0] == "1":
+                service.image_batcher.reset_stats()
+            return self._send_json(200, stats)
+
+        if url.path == "/search-by-text":
+            query = parse_qs(url.query)
+            text = query.get("q", [""])[0].strip()
+            if not text:
+                return self._send_json(400, {"error": "q 파라미터(검색어)가 필요합니다."})
+            try:
+                results = service.search_by_text(text, self._limit(query))
+            except Exception as e:
+                return self._send_json(500, {"error": str(e)})
+            return self._send_json(200, {"query": text, "results": results,
+                                         "took_ms": (time.perf_counter() - start_time) * 1000})
+
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 2 and parts[0] == "similar":
+            try:
+                product_id = int(parts[1])
+            except ValueError:
+                return self._send_json(400, {"error": "product_id는 숫자여야 합니다."})
+            try:
+                results = service.similar(product_id, self._limit(parse_qs(url.query)))
+            except Exception as e:
+                return self._send_json(500, {"error": str(e)})
+            if results is None:
+                return self._send_json(404, {"error": f"product_id {product_id}를 찾을 수 없습니다."})
+            return self._send_json(200, {"product_id": product_id, "results": results,
+                                         "took_ms": (time.perf_counter() - start_time) * 1000})
+
+        self._send_json(404, {"error": "알 수 없는 경로입니다."})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        service = self.server.service
+        start_time = time.perf_counter()
+
+        if url.path != "/search-by-image":
+            return self._send_json(404, {"error": "알 수 없는 경로입니다."})
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length <= 0 or length > MAX_UPLOAD_BYTES:
+            return self._send_json(413 if length > 0 else 400, {"error": "이미지 본문이 없거나 너무 큽니다."})
+
+        query = parse_qs(url.query)
+        remove_bg = query.get("remove_bg", ["1"])[0] not in ("0", "false")
+        try:
+            data = _read_upload(self.headers.get("Content-Type", ""), self.rfile.read(length))
+            image = load_image(io.BytesIO(data))  # 인덱스와 같은 해상도 상한으로 축소 디코딩
+        except Exception as e:
+            return self._send_json(400, {"error": f"이미지를 읽을 수 없습니다: {e}"})
+
+        try:
+            results = service.search_by_image(image, self._limit(query), remove_bg=remove_bg)
+        except Exception as e:
+            return self._send_json(500, {"error": str(e)})
+        self._send_json(200, {"results": results, "took_ms": (time.perf_counter() - start_time) * 1000})
+
+    def log_message(self, format, *args):
+        print(f"🌐 {self.address_string()} - {format % args}")
+
+
+def serve(host: str = HOST, port: int = PORT, backend: str = SEARCH_BACKEND):
+    try:
+        service = SearchService(backend)
+    except mysql.connector.Error as err:
+        print(f"❌ MySQL 연결 실패: {err}")
+        sys.exit()
+
+    server = ThreadingHTTPServer((host, port), SearchRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    print(f"🚀 검색 서버 시작: http://{host}:{port}  (/similar/{{product_id}}, /search-by-image)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 종료 요청")
+    finally:
+        server.server_close()
+        service.close()
+        print("👋 검색 서버 종료.")
+
+
+if __name__ == "__main__":
+    serve()
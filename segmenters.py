@@ -0,0 +1,120 @@
+# segmenters.py
+# 교체 가능한 배경 제거(세그멘테이션) 백엔드.
+#   sam_vit_b / sam_vit_l / sam_vit_h : SAM + 중앙 바운딩 박스 프롬프트 (인코더 출력은 sam_cache로 디스크 캐시)
+#   mobile_sam                        : MobileSAM (mobile_sam 패키지와 weights/mobile_sam.pt가 있을 때만)
+#   rembg_u2net / rembg_u2netp / rembg_isnet-general-use : rembg 세션
+# 모든 세그멘터는 segment(image_path) → 배경이 검은색인 RGB PIL 이미지 를 제공합니다.
+# 속도/메모리/검색 품질 비교는 bench_segmenters.py를 참고하세요.
+
+import numpy as np
+from PIL import Image
+
+SAM_CHECKPOINTS = {
+    "vit_h": "weights/sam_vit_h_4b8939.pth",   # 2.4GB
+    "vit_l": "weights/sam_vit_l_0b3195.pth",   # 1.2GB
+    "vit_b": "weights/sam_vit_b_01ec64.pth",   # 375MB
+    "vit_t": "weights/mobile_sam.pt",          # 40MB (MobileSAM)
+}
+DEFAULT_MARGIN_RATIO = 0.1
+
+SEGMENTER_NAMES = ["sam_vit_h", "sam_vit_l", "sam_vit_b", "mobile_sam",
+                   "rembg_u2net", "rembg_u2netp", "rembg_isnet-general-use"]
+
+
+def load_sam_predictor(model_type: str, checkpoint: str = None, device: str = None):
+    """SAM(또는 MobileSAM, model_type="vit_t") predictor를 만듭니다."""
+    import torch
+    if model_type == "vit_t":
+        from mobile_sam import sam_model_registry, SamPredictor
+    else:
+        from segment_anything import sam_model_registry, SamPredictor
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    sam = sam_model_registry[model_type](checkpoint=checkpoint or SAM_CHECKPOINTS[model_type])
+    sam.to(device=device)
+    sam.eval()
+    return SamPredictor(sam)
+
+
+def center_box(height: int, width: int, margin_ratio: float = DEFAULT_MARGIN_RATIO) -> np.ndarray:
+    """상하좌우 margin_ratio만큼 여백을 둔 중앙 바운딩 박스 프롬프트 [[x_min, y_min, x_max, y_max]]"""
+    return np.array([[int(width * margin_ratio), int(height * margin_ratio),
+                      int(width * (1 - margin_ratio)), int(height * (1 - margin_ratio))]])
+
+
+class SamBoxSegmenter:
+    def __init__(self, model_type: str = "vit_h", margin_ratio: float = DEFAULT_MARGIN_RATIO,
+                 checkpoint: str = None, use_cache: bool = True):
+        from sam_cache import SamFeatureCache
+        self.model_type = model_type
+        self.margin_ratio = margin_ratio
+        self.predictor = load_sam_predictor(model_type, checkpoint)
+        self.cache = SamFeatureCache(model_type) if use_cache else None
+
+    @property
+    def mode(self) -> str:
+        """임베딩 캐시 키에 들어가는 전처리 모드 이름"""
+        return segmenter_mode(f"sam_{self.model_type}", margin_ratio=self.margin_ratio)
+
+    def set_image(self, image_path: str) -> np.ndarray:
+        """이미지를 읽어 predictor에 설정하고 RGB 배열을 반환합니다. (캐시가 있으면 인코더를 건너뜀)"""
+        from embedding_cache import file_digest
+        with Image.open(image_path) as image:
+            image_rgb = np.asarray(image.convert("RGB"))
+        if self.cache is not None:
+            self.cache.set_image(self.predictor, image_rgb, file_digest(image_path))
+        else:
+            self.predictor.set_image(image_rgb)
+        return image_rgb
+
+    def segment(self, image_path: str) -> Image.Image:
+        image_rgb = self.set_image(image_path)
+        H, W, _ = image_rgb.shape
+        masks, scores, _ = self.predictor.predict(
+            point_coords=None, point_labels=None, box=center_box(H, W, self.margin_ratio),
+            multimask_output=False,
+        )
+        if masks is None or not masks.any():
+            mask = np.ones((H, W), dtype=bool)  # 객체를 못 찾으면 전체 이미지 사용
+        else:
+            mask = masks[0]
+        return Image.fromarray(image_rgb * mask[:, :, np.newaxis])
+
+
+class RembgSegmenter:
+    def __init__(self, model_name: str = "u2net"):
+        from utils import new_rembg_session
+        self.model_name = model_name
+        self.session = new_rembg_session(model_name)
+
+    @property
+    def mode(self) -> str:
+        return segmenter_mode(f"rembg_{self.model_name}")
+
+    def segment(self, image_path: str) -> Image.Image:
+        # 긴 변 MAX_IMAGE_SIDE로 축소 디코딩 후 마스킹 (rembg는 어차피 320px로 줄여서 추론)
+        from utils import load_masked_image
+        return load_masked_image(image_path, session=self.session)
+
+
+def segmenter_mode(name: str, margin_ratio: float = DEFAULT_MARGIN_RATIO) -> str:
+    """모델을 로드하지 않고 세그멘터의 임베딩 캐시 모드 이름을 계산합니다. (캐시 적중 시 모델 로드를 건너뛰기 위함)"""
+    if name == "mobile_sam":
+        name = "sam_vit_t"
+    if name.startswith("sam_"):
+        return f"sam_box_{name[len('sam_'):]}_m{margin_ratio}"
+    if name.startswith("rembg_"):
+        from utils import preprocess_mode
+        model_name = name[len("rembg_"):]
+        return preprocess_mode("rembg" if model_name == "u2net" else f"rembg_{model_name}")
+    raise ValueError(f"알 수 없는 세그멘터: {name} (가능: {', '.join(SEGMENTER_NAMES)})")
+
+
+def get_segmenter(name: str, **kwargs):
+    """이름으로 세그멘터 생성. 예: "sam_vit_b", "mobile_sam", "rembg_u2netp" """
+    if name == "mobile_sam":
+        return SamBoxSegmenter("vit_t", **kwargs)
+    if name.startswith("sam_"):
+        return SamBoxSegmenter(name[len("sam_"):], **kwargs)
+    if name.startswith("rembg_"):
+        return RembgSegmenter(name[len("rembg_"):], **kwargs)
+    raise ValueError(f"알 수 없는 세그멘터: {name} (가능: {', '.join(SEGMENTER_NAMES)})")
@@ -3,19 +3,23 @@
 
 import sys
 import time
-import json
 import numpy as np
 import mysql.connector
-from operator import itemgetter
+from vector_store import CompactVectorStore, DEFAULT_RERANK_PATH
 
 # -----------------------------------------------------------
 # 1. 설정값 (사용자 입력)
 # -----------------------------------------------------------
-# 🔍 쿼리할 대상의 product_id를 여기에 입력 (숫자)
-QUERY_PRODUCT_ID = 20787518
+# 🔍 쿼리할 대상의 product_id들을 여기에 입력 (숫자, 여러 개면 한 번의 행렬 곱으로 함께 계산)
+QUERY_PRODUCT_IDS = [20787518]
 # 📊 결과를 몇 개까지 보여줄지 설정
 QUERY_LIMIT = 5
 TABLE_NAME = "product_vectors" 
+# 🗜️ 메모리에 올릴 벡터 자료형: "f32"(벡터당 2KB) / "f16"(1KB) / "i8"(516B, 행별 scale)
+STORE_DTYPE = "f16"
+# 🎯 True면 압축 점수로 후보를 고른 뒤 디스크의 float32 원본(memmap)으로 다시 정렬
+RERANK = True
+RERANK_PATH = DEFAULT_RERANK_PATH
 
 # -----------------------------------------------------------
 # 2. MySQL 연결 설정
@@ -30,26 +34,19 @@ MYSQL_CONFIG = {
 }
 
 # -----------------------------------------------------------
-# 3. 코사인 유사도 계산 함수
+# 3. 벡터 저장소 로드 함수
 # -----------------------------------------------------------
-def cosine_similarity(vec_a: np.ndarray, vec_b: np.ndarray) -> float:
-    """두 벡터의 코사인 유사도를 계산합니다."""
-    # 분자: 내적 (Dot Product)
-    dot_product = np.dot(vec_a, vec_b)
-    # 분모: 각 벡터의 L2 노름 (Euclidean Norm)
-    norm_a = np.linalg.norm(vec_a)
-    norm_b = np.linalg.norm(vec_b)
-    
-    if norm_a == 0 or norm_b == 0:
-        return 0.0
-    
-    return dot_product / (norm_a * norm_b)
+def load_vector_store(mysql_cursor, dtype: str = STORE_DTYPE, rerank: bool = RERANK) -> CompactVectorStore:
+    """모든 벡터를 청크 단위로 읽어 float16 / int8 압축 저장소로 만듭니다. rerank=True면 float32 원본을 RERANK_PATH에 둡니다."""
+    return CompactVectorStore.from_mysql(mysql_cursor, TABLE_NAME, dtype=dtype,
+                                         rerank_path=RERANK_PATH if rerank else None)
+
 
 # -----------------------------------------------------------
 # 4. MySQL 연결 및 데이터 조회
 # -----------------------------------------------------------
 def run_mysql_similarity_search():
-    print(f"\n🔄 MySQL 유사도 검색 시작 (쿼리 ID: {QUERY_PRODUCT_ID}, Limit: {QUERY_LIMIT})")
+    print(f"\n🔄 MySQL 유사도 검색 시작 (쿼리 ID: {QUERY_PRODUCT_IDS}, Limit: {QUERY_LIMIT})")
     
     # 📌 1단계: 전체 데이터 로드 시간 측정 시작
     total_start_time = time.time()
@@ -61,74 +58,41 @@ def run_mysql_similarity_search():
         print(f"❌ MySQL 연결 실패: {err}")
         return
 
-    query_vector = None
-    all_vectors = []
-    
     # -----------------------------------------------------------
-    # 4-1. 모든 벡터 데이터 및 쿼리 대상 벡터 로드
+    # 4-1. 모든 벡터 데이터를 하나의 행렬로 로드
     # -----------------------------------------------------------
     load_start_time = time.time()
     print("   ... DB에서 모든 데이터 및 벡터 로드 중...")
-    
-    sql = f"""SELECT product_id, image_path, image_vector, weaviate_uuid FROM {TABLE_NAME}"""
-    mysql_cursor.execute(sql)
-    
-    for (product_id, image_path, image_vector_json, weaviate_uuid) in mysql_cursor:
-        # JSON 문자열을 Python 리스트로 변환 후 NumPy 배열로 변환
-        try:
-            vector_list = json.loads(image_vector_json)
-            vector_np = np.array(vector_list, dtype=np.float32)
-        except Exception:
-            print(f"⚠️ 경고: product_id {product_id}의 벡터 데이터 파싱 실패. 건너뜀.")
-            continue
-
-        # 모든 벡터 리스트에 저장
-        data_item = {
-            "product_id": product_id,
-            "image_path": image_path,
-            "vector": vector_np,
-            "weaviate_uuid": weaviate_uuid
-        }
-        all_vectors.append(data_item)
-
-        # 쿼리 대상 벡터 확인
-        if product_id == QUERY_PRODUCT_ID:
-            query_vector = vector_np
-    
+    store = load_vector_store(mysql_cursor)
     load_end_time = time.time()
-    
-    if query_vector is None:
-        print(f"❌ 오류: Product ID {QUERY_PRODUCT_ID}를 데이터베이스에서 찾을 수 없습니다.")
+
+    # 쿼리 벡터는 상품의 대표 이미지(image_path가 가장 작은 행)로 정함
+    primary_rows = {pid: store.primary_row(pid) for pid in QUERY_PRODUCT_IDS}
+    query_ids = [pid for pid in QUERY_PRODUCT_IDS if primary_rows[pid] is not None]
+    for pid in QUERY_PRODUCT_IDS:
+        if primary_rows[pid] is None:
+            print(f"❌ 오류: Product ID {pid}를 데이터베이스에서 찾을 수 없습니다.")
+
+    if not query_ids:
         mysql_cursor.close()
         mysql_conn.close()
         return
 
-    print(f"✅ 데이터 로드 완료: 총 {len(all_vectors)}개 객체 (소요 시간: {load_end_time - load_start_time:.4f}초)")
+    print(f"✅ 데이터 로드 완료: 총 {len(store)}개 객체 (소요 시간: {load_end_time - load_start_time:.4f}초)")
+    print(f"   🗜️ 저장 형식: {store.dtype}, 메모리 {store.nbytes / 1024 ** 2:.1f}MB "
+          f"(float32 행렬이면 {len(store) * store.dim * 4 / 1024 ** 2:.1f}MB), 재정렬: {store.rerank_path is not None}")
 
     # -----------------------------------------------------------
-    # 4-2. Python 메모리 내에서 유사도 계산 (Brute-force)
+    # 4-2. 행렬 곱 한 번으로 유사도 계산 + argpartition Top-k
     # -----------------------------------------------------------
     calc_start_time = time.time()
-    print("   ... Python 메모리 내에서 코사인 유사도 계산 중...")
+    print("   ... NumPy 행렬 곱으로 코사인 유사도 계산 중...")
+
+    query_rows = [primary_rows[pid] for pid in query_ids]
+    # 쿼리 대상 상품 자신은 제외 (같은 product_id의 다른 이미지 행까지 모두)
+    exclude_rows = [store.rows_of_product(pid) for pid in query_ids]
+    top_rows, top_scores = store.search(store.vectors(query_rows), QUERY_LIMIT, exclude_rows=exclude_rows)
 
-    # 유사도 결과를 저장할 리스트
-    similarity_results = []
-    
-    for item in all_vectors:
-        # 쿼리 대상 자신은 제외
-        if item["product_id"] == QUERY_PRODUCT_ID:
-            continue
-            
-        similarity = cosine_similarity(query_vector, item["vector"])
-        similarity_results.append({
-            "product_id": item["product_id"],
-            "image_path": item["image_path"],
-            "similarity": similarity
-        })
-        
-    # 유사도(similarity)가 높은 순서대로 정렬
-    similarity_results.sort(key=itemgetter('similarity'), reverse=True)
-    
     calc_end_time = time.time()
     
     # -----------------------------------------------------------
@@ -136,14 +100,17 @@ def run_mysql_similarity_search():
     # -----------------------------------------------------------
     print(f"✅ 유사도 계산 완료 (소요 시간: {calc_end_time - calc_start_time:.4f}초)")
     
-    print("\n--- 유사 상품 검색 결과 (MySQL + Python Brute-force) ---")
-    
-    # 상위 QUERY_LIMIT 개만 출력
-    for i, result in enumerate(similarity_results[:QUERY_LIMIT]):
-        print(f"[{i+1}] 유사도: {result['similarity']:.4f}")
-        print(f"  > Product ID: {result['product_id']}")
-        print(f"  > Path: {result['image_path']}")
-        print("---")
+    for query_id, rows, scores in zip(query_ids, top_rows, top_scores):
+        print(f"\n--- 유사 상품 검색 결과 (MySQL + NumPy Top-k) / Query Product ID: {query_id} ---")
+
+        # 상위 QUERY_LIMIT 개만 출력
+        for i, (row, similarity) in enumerate(zip(rows, scores)):
+            if not np.isfinite(similarity):  # 제외된 행만 남은 경우
+                break
+            print(f"[{i+1}] 유사도: {similarity:.4f}")
+            print(f"  > Product ID: {store.product_ids[row]}")
+            print(f"  > Path: {store.image_path(row)}")
+            print("---")
         
     total_end_time = time.time()
     total_time_taken = total_end_time - total_start_time
@@ -157,4 +124,4 @@ def run_mysql_similarity_search():
 
 
 if __name__ == "__main__":
-    run_mysql_similarity_search()
\ No newline at end of file
+    run_mysql_similarity_search()
@@ -0,0 +1,87 @@
+# test_embedding_cache.py
+# 임베딩 캐시가 중단(크래시) 후에도 다른 이미지의 벡터를 돌려주지 않는지 확인합니다.  실행: python -m pytest -q
+
+import os
+
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+
+DIM = 4
+
+
+def _filled_cache(cache_dir, n=6):
+    cache = EmbeddingCache(str(cache_dir), dim=DIM)
+    keys = [f"k{i}" for i in range(n)]
+    cache.put_many(keys, np.arange(n * DIM, dtype=np.float32).reshape(n, DIM))
+    cache.save()
+    return cache, keys
+
+
+def _expected(i):
+    return np.arange(i * DIM, (i + 1) * DIM, dtype=np.float32)
+
+
+def test_crash_between_compact_file_write_and_index_save(tmp_path, monkeypatch):
+    cache, keys = _filled_cache(tmp_path)
+    for key in keys[:3]:
+        del cache.entries[key]  # 앞쪽 행을 지워 압축 시 남은 행 번호가 모두 바뀌도록
+
+    def crash():
+        raise RuntimeError("simulated crash")
+    monkeypatch.setattr(cache, "save", crash)
+    with pytest.raises(RuntimeError):
+        cache._compact()  # 새 세대 파일은 썼지만 인덱스는 교체 전
+
+    reopened = EmbeddingCache(str(tmp_path), dim=DIM)
+    for i, key in enumerate(keys):
+        np.testing.assert_array_equal(reopened.get(key), _expected(i))
+    assert sorted(os.listdir(tmp_path)) == ["index.json", "vectors.f32"]  # 고아가 된 새 세대 파일은 정리됨
+
+
+def test_compact_switches_generation_and_keeps_vectors(tmp_path):
+    cache, keys = _filled_cache(tmp_path)
+    cache.evict(max_bytes=3 * DIM * 4)  # 최근 사용 3개만 남김
+
+    reopened = EmbeddingCache(str(tmp_path), dim=DIM)
+    assert reopened.vectors_file != "vectors.f32"
+    assert len(reopened) == 3
+    for i, key in enumerate(keys):
+        if key in reopened.entries:
+            np.testing.assert_array_equal(reopened.get(key), _expected(i))
+    assert sorted(os.listdir(tmp_path)) == ["index.json", reopened.vectors_file]
+
+
+def test_crash_between_append_and_index_save(tmp_path):
+    cache, keys = _filled_cache(tmp_path, n=2)
+    cache.put_many(["orphan"], np.full((1, DIM), 99, dtype=np.float32))  # save() 전에 중단
+
+    reopened = EmbeddingCache(str(tmp_path), dim=DIM)
+    reopened.put_many(["new"], np.full((1, DIM), 7, dtype=np.float32))
+    np.testing.assert_array_equal(reopened.get("new"), np.full(DIM, 7, dtype=np.float32))
+    np.testing.assert_array_equal(reopened.get(keys[1]), _expected(1))
+
+
+def test_stale_access_time_is_saved_and_used_for_lru(tmp_path):
+    cache, keys = _filled_cache(tmp_path, n=4)
+    for entry in cache.entries.values():
+        entry["last_access"] -= 10 * 86400  # 열흘 전에 쓴 항목들
+    cache._dirty = True
+    cache.save()
+
+    cache = EmbeddingCache(str(tmp_path), dim=DIM)
+    cache.get(keys[0])  # 적중만 있는 실행
+    cache.save()
+
+    reopened = EmbeddingCache(str(tmp_path), dim=DIM)
+    reopened.prune(max_bytes=2 * DIM * 4, max_age_days=None)
+    assert keys[0] in reopened.entries  # 최근 적중한 항목은 용량 축출에서 살아남음
+    np.testing.assert_array_equal(reopened.get(keys[0]), _expected(0))
+
+
+def test_prune_drops_entries_older_than_max_age(tmp_path):
+    cache, keys = _filled_cache(tmp_path, n=3)
+    cache.entries[keys[1]]["last_access"] -= 100 * 86400
+    assert cache.prune(max_bytes=None, max_age_days=90) == 1
+    assert keys[1] not in EmbeddingCache(str(tmp_path), dim=DIM).entries
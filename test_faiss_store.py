@@ -0,0 +1,37 @@
+# test_faiss_store.py
+# 삭제를 지원하지 않는 인덱스(HNSW)에서도 증분 동기화의 삭제가 동작하는지 확인합니다.  실행: python -m pytest -q
+
+import numpy as np
+import pytest
+
+from faiss_store import FaissProductIndex
+
+DIM = 8
+
+
+def _vectors(n):
+    vectors = np.random.default_rng(0).standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("spec", ["Flat", "HNSW32"])
+def test_remove_paths_keeps_surviving_vectors(tmp_path, spec):
+    vectors = _vectors(20)
+    paths = [f"images/{i}_1.jpg" for i in range(20)]
+    store = FaissProductIndex(dim=DIM, spec=spec)
+    store.add(vectors, list(range(20)), paths)
+    prefix = str(tmp_path / "index")
+    store.save(prefix)
+
+    store = FaissProductIndex.load(prefix, mmap=False)
+    assert store.remove_paths(paths[:5]) == 5
+    store.save(prefix)
+
+    reopened = FaissProductIndex.load(prefix, mmap=False)
+    assert reopened.ntotal == 15
+    assert reopened.indexed_paths() == set(paths[5:])
+    for i in range(5, 20):
+        faiss_id = reopened.id_for_path(paths[i])
+        np.testing.assert_allclose(reopened.reconstruct(faiss_id), vectors[i], rtol=1e-6)
+        similarity, hit_id, meta = reopened.search(vectors[i:i + 1], k=1)[0][0]
+        assert meta["imagePath"] == paths[i]
@@ -0,0 +1,80 @@
+# text_search.py
+# 텍스트로 상품 이미지 검색: CLIP 텍스트 인코더로 질의를 벡터화해 같은 ImageObject 벡터에서 near_vector 검색합니다.
+# (별도 텍스트 인덱스 없이 이미지 벡터를 그대로 사용)
+# QUERY_LOG_PATH를 지정하면 파일의 질의(한 줄에 하나)를 배치로 한 번에 인코딩해 모두 검색합니다.
+
+import os
+import sys
+import time
+from weaviate.classes.query import MetadataQuery
+from utils import connect_to_weaviate, text_to_vector, texts_to_vectors, WEAVIATE_CLASS_NAME
+
+# -----------------------------------------------------------
+# 1. 설정값 (사용자 입력)
+# -----------------------------------------------------------
+# ⚠️ CLIP ViT-B/32는 영어 위주로 학습되어 한국어 질의는 정확도가 낮습니다. 영어 질의를 권장합니다.
+QUERY_TEXTS = ["a baby stroller", "a red car seat"]
+QUERY_LOG_PATH = None   # 예: "query_log.txt" (지정하면 QUERY_TEXTS 대신 사용)
+QUERY_LIMIT = 5
+ENCODE_BATCH_SIZE = 64
+
+
+def search_by_vector(collection, vector, limit: int = QUERY_LIMIT):
+    return collection.query.near_vector(
+        near_vector=list(map(float, vector)),
+        limit=limit,
+        return_metadata=MetadataQuery(distance=True),
+    ).objects
+
+
+if __name__ == "__main__":
+    if QUERY_LOG_PATH is not None:
+        if not os.path.exists(QUERY_LOG_PATH):
+            print(f"❌ 질의 로그 '{QUERY_LOG_PATH}' 파일이 없습니다.")
+            sys.exit()
+        with open(QUERY_LOG_PATH, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = QUERY_TEXTS
+
+    client = connect_to_weaviate()
+    collection = client.collections.get(WEAVIATE_CLASS_NAME)
+
+    try:
+        # -----------------------------------------------------------
+        # 2. 질의 인코딩 (여러 개면 배치, 1개면 LRU 캐시 경로)
+        # -----------------------------------------------------------
+        encode_start_time = time.time()
+        if len(queries) == 1:
+            vectors = [text_to_vector(queries[0])]
+        else:
+            vectors = texts_to_vectors(queries, batch_size=ENCODE_BATCH_SIZE)
+        encode_time = time.time() - encode_start_time
+        print(f"✅ 질의 {len(queries)}개 인코딩 완료 (소요 시간: {encode_time:.4f}초)")
+
+        # -----------------------------------------------------------
+        # 3. 벡터 검색 및 결과 출력
+        # -----------------------------------------------------------
+        search_start_time = time.time()
+        for query, vector in zip(queries, vectors):
+            objects = search_by_vector(collection, vector, QUERY_LIMIT)
+            print("\n" + "=" * 50)
+            print(f"🔍 Query: \"{query}\"")
+            print("=" * 50)
+            if not objects:
+                print("❌ 검색 결과가 없습니다.")
+            for rank, item in enumerate(objects):
+                distance = item.metadata.distance if item.metadata.distance is not None else 0
+                print(f"{rank+1}. {item.properties['imagePath']} "
+                      f"(Product ID: {item.properties.get('product_id', 'N/A')}) [Similarity: {1 - distance:.4f}]")
+        search_time = time.time() - search_start_time
+
+        print(f"\n⏱️ 인코딩 {encode_time:.4f}초 / 검색 {search_time:.4f}초 "
+              f"(질의당 {search_time / max(len(queries), 1) * 1000:.2f}ms)")
+
+    except Exception as e:
+        print(f"❌ 텍스트 검색 중 오류 발생: {e}")
+
+    finally:
+        client.close()
+        print("👋 Weaviate 클라이언트 연결 종료.")
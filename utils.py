@@ -1,38 +1,160 @@
+import os
 import sys
-import torch
+import threading
+from functools import lru_cache
 import numpy as np
 from PIL import Image
 import weaviate
-from weaviate.classes.data import DataObject
-from weaviate.classes.config import Configure, Property, DataType
-from weaviate.classes.query import MetadataQuery
 import warnings
 import pillow_heif
-pillow_heif.register_heif_opener() 
+pillow_heif.register_heif_opener()
 warnings.filterwarnings('ignore')
 
-# rembg 및 CLIP
-try:
-    from rembg import remove
-    import clip
-except ImportError:
-    print("🚨 오류: rembg 또는 CLIP 라이브러리가 설치되지 않았습니다. 'pip install rembg clip' 실행")
-    sys.exit()
-
 # 환경 변수
 WEAVIATE_HOST = "localhost"
 WEAVIATE_PORT = 8090
 WEAVIATE_CLASS_NAME = "ImageObject"
 GRPC_PORT = 50051
 
-# CLIP 모델
-device = "cuda" if torch.cuda.is_available() else "cpu"
-try:
-    CLIP_MODEL, PREPROCESS = clip.load("ViT-B/32", device=device)
-    CLIP_MODEL.eval()
-except Exception as e:
-    print(f"❌ CLIP 모델 로드 실패: {e}")
-    sys.exit()
+CLIP_MODEL_NAME = "ViT-B/32"
+REMBG_MODEL_NAME = "u2net"
+
+# CLIP 추론 옵션 (CPU 전용 운영 노드용, bench_clip_quant.py로 속도/벡터 일치도 확인 후 변경)
+CLIP_PRECISION = "fp32"     # "fp32" | "int8" (nn.Linear 동적 int8 양자화, CPU에서만 적용)
+CLIP_NUM_THREADS = None     # torch.set_num_threads 값 (None: torch 기본값 = 물리 코어 수)
+CLIP_CHANNELS_LAST = False  # 패치 임베딩 conv 입력/가중치를 channels_last 메모리 형식으로
+CLIP_TORCHSCRIPT = False    # 이미지 인코더를 torch.jit.trace로 고정 (파이썬 오버헤드 감소)
+# 이미지 인코더 백엔드: "torch" | "onnx" (clip_onnx.py, onnxruntime 필요. 위 precision/channels_last/torchscript는 torch 전용)
+# 텍스트 인코더는 항상 torch로 실행합니다.
+CLIP_BACKEND = "torch"
+CLIP_ONNX_POOL_SIZE = 1     # ONNX InferenceSession 수 (동시에 인코딩할 수 있는 스레드 수)
+CLIP_ONNX_THREADS = None    # 세션당 intra-op 스레드 수 (None: clip_onnx.plan_threads로 코어를 세션 수만큼 나눔)
+
+# -----------------------------------------------------------
+# 모델 지연 로딩 (첫 사용 시 1회만 로드, 스레드 안전)
+# -----------------------------------------------------------
+# torch / CLIP / rembg는 import만으로도 수 초와 수백 MB를 쓰므로,
+# connect_to_weaviate()만 필요한 조회용 스크립트는 이 비용을 내지 않도록 접근자 함수 뒤로 숨깁니다.
+
+_MODEL_LOCK = threading.RLock()
+_DEVICE = None
+_CLIP = None          # (model, preprocess)
+_REMBG_SESSION = None
+
+def get_device() -> str:
+    global _DEVICE
+    if _DEVICE is None:
+        with _MODEL_LOCK:
+            if _DEVICE is None:
+                import torch
+                _DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+    return _DEVICE
+
+def configure_clip(precision: str = None, num_threads: int = None, channels_last: bool = None,
+                   torchscript: bool = None, backend: str = None):
+    """CLIP 추론 옵션을 바꿉니다. 이미 로드된 모델은 버리고 다음 get_clip_model() 호출 때 새 옵션으로 다시 로드합니다."""
+    global CLIP_PRECISION, CLIP_NUM_THREADS, CLIP_CHANNELS_LAST, CLIP_TORCHSCRIPT, CLIP_BACKEND, _CLIP
+    if precision not in (None, "fp32", "int8"):
+        raise ValueError(f"지원하지 않는 precision: {precision} (fp32 / int8)")
+    if backend not in (None, "torch", "onnx"):
+        raise ValueError(f"지원하지 않는 backend: {backend} (torch / onnx)")
+    with _MODEL_LOCK:
+        if backend is not None:
+            CLIP_BACKEND = backend
+        if precision is not None:
+            CLIP_PRECISION = precision
+        if num_threads is not None:
+            CLIP_NUM_THREADS = num_threads
+        if channels_last is not None:
+            CLIP_CHANNELS_LAST = channels_last
+        if torchscript is not None:
+            CLIP_TORCHSCRIPT = torchscript
+        _CLIP = None
+        _cached_text_vector.cache_clear()
+
+def clip_model_id() -> str:
+    """임베딩 캐시 키에 쓰는 모델 식별자. 벡터 값이 달라지는 정밀도 옵션만 붙입니다. (예: "ViT-B/32@int8")"""
+    return CLIP_MODEL_NAME if CLIP_PRECISION == "fp32" else f"{CLIP_MODEL_NAME}@{CLIP_PRECISION}"
+
+def _optimize_clip(model):
+    """CLIP_* 추론 옵션을 적용합니다. (실패한 옵션은 경고만 출력하고 건너뜀)"""
+    import torch
+    if CLIP_NUM_THREADS:
+        torch.set_num_threads(CLIP_NUM_THREADS)
+    on_cpu = get_device() == "cpu"
+
+    if CLIP_PRECISION == "int8":
+        if on_cpu:
+            # MLP/투영 nn.Linear 가중치를 int8로, 활성값은 실행 시 동적으로 양자화 (어텐션 out_proj는 PyTorch가 제외)
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            print("⚠️ int8 동적 양자화는 CPU 전용입니다. GPU에서는 fp32로 실행합니다.")
+
+    if CLIP_CHANNELS_LAST:
+        model = model.to(memory_format=torch.channels_last)
+
+    if CLIP_TORCHSCRIPT:
+        try:
+            example = torch.zeros(1, 3, 224, 224, dtype=model.dtype, device=get_device())
+            with torch.no_grad():
+                model.visual = torch.jit.trace(model.visual, example)
+        except Exception as e:
+            print(f"⚠️ TorchScript 변환 실패, eager 모드로 실행합니다: {e}")
+    return model
+
+def get_clip_model():
+    """CLIP 모델과 전처리(PREPROCESS) 변환을 (model, preprocess) 튜플로 반환합니다."""
+    global _CLIP
+    if _CLIP is None:
+        with _MODEL_LOCK:
+            if _CLIP is None:
+                try:
+                    import clip
+                except ImportError:
+                    print("🚨 오류: CLIP 라이브러리가 설치되지 않았습니다. 'pip install clip' 실행")
+                    sys.exit()
+                try:
+                    model, preprocess = clip.load(CLIP_MODEL_NAME, device=get_device())
+                    model = _optimize_clip(model.eval())
+                except Exception as e:
+                    print(f"❌ CLIP 모델 로드 실패: {e}")
+                    sys.exit()
+                _CLIP = (model, preprocess)
+    return _CLIP
+
+def new_rembg_session(model_name: str = REMBG_MODEL_NAME, threads: int = None):
+    """
+    장기 실행용 rembg 세션을 새로 만듭니다. (U²-Net 등 ONNX 모델 로드는 세션 생성 시 1회)
+    프로세스 풀 워커처럼 세션을 따로 가져야 하는 곳에서 사용하고, 그 외에는 get_rembg_session()을 씁니다.
+    threads: 세션의 ONNX Runtime 스레드 수 (CLIP과 코어를 나눌 때, clip_onnx.plan_threads 참고)
+    """
+    try:
+        from rembg import new_session
+    except ImportError:
+        print("🚨 오류: rembg 라이브러리가 설치되지 않았습니다. 'pip install rembg' 실행")
+        sys.exit()
+    if threads is None:
+        return new_session(model_name)
+    # rembg는 세션 생성 시 OMP_NUM_THREADS만 읽으므로, 생성하는 동안만 바꿔 둡니다. (환경 변수는 프로세스 전역)
+    with _MODEL_LOCK:
+        previous = os.environ.get("OMP_NUM_THREADS")
+        os.environ["OMP_NUM_THREADS"] = str(threads)
+        try:
+            return new_session(model_name)
+        finally:
+            if previous is None:
+                del os.environ["OMP_NUM_THREADS"]
+            else:
+                os.environ["OMP_NUM_THREADS"] = previous
+
+def get_rembg_session():
+    """프로세스 전역에서 공유하는 배경 제거용 rembg 세션."""
+    global _REMBG_SESSION
+    if _REMBG_SESSION is None:
+        with _MODEL_LOCK:
+            if _REMBG_SESSION is None:
+                _REMBG_SESSION = new_rembg_session(REMBG_MODEL_NAME)
+    return _REMBG_SESSION
 
 # -----------------------------------------------------------
 # Weaviate 연결 ( 🔥 SDK 4.x 최신 방식 )
@@ -55,26 +177,160 @@ def connect_to_weaviate():
 # 이미지 처리
 # -----------------------------------------------------------
 
-def remove_background(image: Image.Image) -> Image.Image:
+# 디코딩 직후 긴 변 상한 (CLIP PREPROCESS는 224px, rembg(U²-Net)는 320px로 줄여서 쓰므로 그보다 충분히 큰 값)
+# 1~4MP 크롤링 이미지를 원본 해상도로 디코딩/마스킹하지 않아 이미지당 시간과 메모리가 크게 줄어듭니다. None이면 원본 해상도.
+MAX_IMAGE_SIDE = 640
+
+def preprocess_mode(base: str, max_side=MAX_IMAGE_SIDE) -> str:
+    """임베딩 캐시 키에 들어가는 전처리 모드. 축소 디코딩 시 해상도 상한을 붙여 원본 해상도 임베딩과 구분합니다."""
+    return base if max_side is None else f"{base}_s{max_side}"
+
+def load_image(source, max_side=MAX_IMAGE_SIDE) -> Image.Image:
+    """
+    이미지 파일(경로 또는 파일 객체)을 긴 변이 max_side 이하인 RGB 이미지로 디코딩합니다.
+    - JPEG: draft()로 DCT 단계에서 1/2~1/8 축소 디코딩 (디코딩 시간과 메모리 자체가 줄어듦)
+    - WebP/AVIF 등: Pillow 플러그인이 축소 디코딩을 지원하지 않아 전체 디코딩 후 thumbnail(reduce 기반 정수 배 축소)로 줄임
+    """
+    with Image.open(source) as image:
+        if max_side is not None:
+            image.draft("RGB", (max_side, max_side))  # JPEG 외 포맷에서는 아무 일도 하지 않음
+        image = image.convert("RGB")
+    if max_side is not None:
+        image.thumbnail((max_side, max_side), Image.BICUBIC, reducing_gap=2.0)
+    return image
+
+def background_mask(image: Image.Image, session=None) -> Image.Image:
+    """rembg로 전경 알파 마스크("L" 모드)만 계산합니다."""
+    from rembg import remove
+    return remove(image.convert("RGB"), session=session or get_rembg_session(), only_mask=True)
+
+def apply_mask(image: Image.Image, mask: Image.Image) -> Image.Image:
+    """배경을 검은색으로 채웁니다. 마스크가 image보다 작으면(축소 이미지에서 구한 마스크) image 크기로 업샘플합니다."""
+    image = image.convert("RGB")
+    if mask.size != image.size:
+        mask = mask.resize(image.size, Image.BILINEAR)
+    bg = Image.new('RGB', image.size, (0, 0, 0))
+    bg.paste(image, mask=mask)
+    return bg
+
+def remove_background(image: Image.Image, session=None) -> Image.Image:
     try:
-        output_rgba = remove(image.convert("RGB"))
-        alpha = output_rgba.split()[-1]
-        bg = Image.new('RGB', output_rgba.size, (0, 0, 0))
-        bg.paste(output_rgba, mask=alpha)
-        return bg
+        return apply_mask(image, background_mask(image, session))
     except Exception:
         return image.convert("RGB")
 
-def image_to_vector(image: Image.Image, remove_bg: bool = True) -> list:
+def load_masked_image(path: str, session=None, max_side=MAX_IMAGE_SIDE, full_resolution: bool = False) -> Image.Image:
+    """
+    축소 디코딩한 이미지에서 배경을 제거합니다.
+    full_resolution=True면 마스크만 원본 크기로 업샘플해 원본 해상도의 마스킹 결과를 만듭니다. (rembg는 축소 이미지로 1회만 실행)
+    """
+    image = load_image(path, max_side)
+    if not full_resolution:
+        return remove_background(image, session)
+    try:
+        mask = background_mask(image, session)
+    except Exception:
+        return load_image(path, None)
+    return apply_mask(load_image(path, None), mask)
+
+def _prepare_image(image: Image.Image, remove_bg: bool) -> Image.Image:
     if remove_bg:
-        image_processed = remove_background(image)
-    else:
-        image_processed = image.convert("RGB")
+        return remove_background(image)
+    return image.convert("RGB")
+
+def image_to_vector(image: Image.Image, remove_bg: bool = True) -> list:
+    return images_to_vectors([image], remove_bg=remove_bg)[0].tolist()
+
+# -----------------------------------------------------------
+# 배치 임베딩 (여러 이미지를 한 번의 forward pass로 처리)
+# -----------------------------------------------------------
+
+CLIP_EMBED_DIM = 512
+DEFAULT_BATCH_SIZE = 32
+
+def images_to_vectors(images, batch_size: int = DEFAULT_BATCH_SIZE, remove_bg: bool = False) -> np.ndarray:
+    """
+    PIL 이미지들을 batch_size 단위로 묶어 CLIP encode_image를 배치당 한 번만 호출합니다.
+    반환값은 L2 정규화된 연속(contiguous) float32 (N, 512) 배열입니다.
+    images는 리스트뿐 아니라 제너레이터도 받으므로, 전처리된 텐서는 배치 하나 분량만 메모리에 올라갑니다.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size는 1 이상이어야 합니다.")
+
+    if CLIP_BACKEND == "onnx":
+        from clip_onnx import get_onnx_encoder
+        encoder = get_onnx_encoder(CLIP_ONNX_POOL_SIZE, CLIP_ONNX_THREADS)
+        return encoder.encode((_prepare_image(image, remove_bg) for image in images), batch_size=batch_size)
+
+    import torch
+    model, preprocess = get_clip_model()
+    device = get_device()
+
+    chunks = []
+    batch = []
+
+    def flush():
+        img_input = torch.stack(batch).to(device)
+        if CLIP_CHANNELS_LAST:
+            img_input = img_input.contiguous(memory_format=torch.channels_last)
+        # inference_mode: no_grad보다 가벼움 (autograd 버전 카운터/뷰 추적 생략)
+        with torch.inference_mode():
+            features = model.encode_image(img_input)
+            features /= features.norm(dim=-1, keepdim=True)
+        chunks.append(features.float().cpu().numpy())
+        batch.clear()
+
+    for image in images:
+        batch.append(preprocess(_prepare_image(image, remove_bg)))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    if not chunks:
+        return np.empty((0, CLIP_EMBED_DIM), dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(chunks), dtype=np.float32)
+
+# -----------------------------------------------------------
+# 텍스트 임베딩 (CLIP 텍스트 인코더 → 같은 512차원 공간에서 이미지 벡터 검색)
+# -----------------------------------------------------------
+# ⚠️ CLIP ViT-B/32는 영어 캡션으로 학습되어, 한국어 질의는 토큰화는 되지만 검색 품질이 크게 떨어집니다.
+#    가능하면 영어로 질의하세요. (예: "유모차" 대신 "a baby stroller")
+
+TEXT_CACHE_SIZE = 1024
+
+def texts_to_vectors(texts, batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
+    """
+    질의 문자열들을 batch_size 단위로 토큰화해 encode_text를 배치당 한 번만 호출합니다. (질의 로그 일괄 처리용)
+    CLIP 컨텍스트 길이(77 토큰)를 넘는 문장은 잘라냅니다. 반환값은 L2 정규화된 float32 (N, 512) 배열입니다.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size는 1 이상이어야 합니다.")
+
+    import torch
+    import clip
+    model, _ = get_clip_model()
+    device = get_device()
+
+    texts = list(texts)
+    chunks = []
+    for start in range(0, len(texts), batch_size):
+        tokens = clip.tokenize(texts[start:start + batch_size], truncate=True).to(device)
+        with torch.inference_mode():
+            features = model.encode_text(tokens)
+            features /= features.norm(dim=-1, keepdim=True)
+        chunks.append(features.float().cpu().numpy())
 
-    img_input = PREPROCESS(image_processed).unsqueeze(0).to(device)
+    if not chunks:
+        return np.empty((0, CLIP_EMBED_DIM), dtype=np.float32)
+    return np.ascontiguousarray(np.concatenate(chunks), dtype=np.float32)
 
-    with torch.no_grad():
-        features = CLIP_MODEL.encode_image(img_input)
-        features /= features.norm(dim=-1, keepdim=True)
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _cached_text_vector(text: str) -> np.ndarray:
+    vector = texts_to_vectors([text])[0]
+    vector.flags.writeable = False  # 캐시에 보관되는 배열이므로 호출 쪽에서 수정하지 못하게 함
+    return vector
 
-    return features.cpu().numpy().flatten().tolist()
+def text_to_vector(text: str) -> np.ndarray:
+    """질의 문자열 1개의 정규화된 벡터. 같은 질의(앞뒤 공백 무시)는 LRU 캐시에서 바로 반환합니다. (읽기 전용 배열)"""
+    return _cached_text_vector(text.strip())
@@ -0,0 +1,78 @@
+# vector_codec.py
+# product_vectors.image_vector의 바이너리 저장 형식 (JSON 텍스트 대체).
+#
+#   [0:2] 매직 b"PV"   [2] 버전 (1)   [3] 자료형 코드 (0=float32, 1=float16, 2=int8)
+#   int8만: [4:8] 역양자화 scale (little-endian float32)
+#   이후  : little-endian 벡터 데이터
+#
+# 512차원 기준 크기: JSON 약 10KB → float32 2,052B / float16 1,028B / int8 520B
+# 읽기는 np.frombuffer로 복사 없이 수행하며, 이전 JSON 텍스트 행도 그대로 읽을 수 있습니다.
+
+import json
+import struct
+import numpy as np
+
+MAGIC = b"PV"
+VERSION = 1
+FORMATS = {"f32": 0, "f16": 1, "i8": 2}
+_DTYPES = {0: np.dtype("<f4"), 1: np.dtype("<f2"), 2: np.dtype("i1")}
+HEADER_SIZE = 4
+
+
+def encode_vector(vector, fmt: str = "f32") -> bytes:
+    """벡터를 버전 태그가 붙은 바이너리(BLOB)로 변환합니다. fmt: "f32" | "f16" | "i8" (대칭 스케일 양자화)"""
+    code = FORMATS[fmt]
+    v = np.asarray(vector, dtype=np.float32).ravel()
+    header = MAGIC + bytes((VERSION, code))
+    if fmt == "i8":
+        scale = float(np.abs(v).max()) / 127.0 or 1.0
+        q = np.clip(np.rint(v / scale), -127, 127).astype(np.int8)
+        return header + struct.pack("<f", scale) + q.tobytes()
+    return header + v.astype(_DTYPES[code]).tobytes()
+
+
+def is_binary(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:2]) == MAGIC
+
+
+def decode_raw(blob):
+    """
+    (원래 자료형 배열, scale) 반환. 배열은 blob을 가리키는 복사 없는 뷰입니다. (scale은 int8일 때만 값, 그 외 None)
+    """
+    if bytes(blob[:2]) != MAGIC:
+        raise ValueError("알 수 없는 벡터 형식입니다.")
+    version, code = blob[2], blob[3]
+    if version != VERSION:
+        raise ValueError(f"지원하지 않는 벡터 형식 버전: {version}")
+    if code == FORMATS["i8"]:
+        (scale,) = struct.unpack_from("<f", blob, HEADER_SIZE)
+        return np.frombuffer(blob, dtype=_DTYPES[code], offset=HEADER_SIZE + 4), scale
+    return np.frombuffer(blob, dtype=_DTYPES[code], offset=HEADER_SIZE), None
+
+
+def decode_vector(value) -> np.ndarray:
+    """바이너리 또는 이전 JSON 텍스트 벡터를 float32 배열로 읽습니다. (float32 바이너리는 복사 없음)"""
+    if isinstance(value, np.ndarray):
+        return value.astype(np.float32, copy=False)
+    if is_binary(value):
+        arr, scale = decode_raw(value)
+        if scale is not None:
+            return arr.astype(np.float32) * np.float32(scale)
+        return arr if arr.dtype == np.float32 else arr.astype(np.float32)
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    return np.asarray(json.loads(value), dtype=np.float32)
+
+
+def decode_matrix(values, dim: int = 512) -> np.ndarray:
+    """
+    여러 행의 벡터를 (N, dim) float32 행렬로 읽습니다.
+    모두 같은 길이의 float32 바이너리면 데이터 부분만 이어 붙여 np.frombuffer 한 번으로 만듭니다.
+    """
+    if not values:
+        return np.empty((0, dim), dtype=np.float32)
+    expected = HEADER_SIZE + dim * 4
+    if all(is_binary(v) and v[3] == FORMATS["f32"] and len(v) == expected for v in values):
+        payload = b"".join(memoryview(v)[HEADER_SIZE:] for v in values)
+        return np.frombuffer(payload, dtype=np.float32).reshape(len(values), dim)
+    return np.stack([decode_vector(v) for v in values])
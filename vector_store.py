@@ -0,0 +1,240 @@
+# vector_store.py
+# MySQL brute-force 검색(serch_mysql.py / search_service.py mysql 백엔드)용 압축 인메모리 벡터 저장소.
+#  - 벡터는 L2 정규화 후 float16(벡터당 1,024B) 또는 행별 scale int8(516B)로 보관 → float32(2,048B) 대비 1/2 ~ 1/4
+#  - product_id는 정렬된 int64 배열 + searchsorted로 찾고(파이썬 dict 없음), 경로는 UTF-8 bytes 배열로 보관
+#  - 검색: BLOCK_ROWS행씩 float32로 풀어 행렬 곱(BLAS) → argpartition Top-k (임시 메모리는 블록 하나 크기)
+#  - rerank_path를 주면 정규화된 float32 원본을 디스크 memmap으로 두고, 상위 k × RERANK_FACTOR 후보만 정확한 점수로 재정렬
+# PQ 같은 학습형 압축은 faiss_store.py("IVFauto,PQ64" 등)와 bench_ann.py를 사용하세요.
+
+import os
+import numpy as np
+
+from vector_codec import decode_matrix, decode_vector, is_binary
+
+# -----------------------------------------------------------
+# 1. 설정값
+# -----------------------------------------------------------
+DEFAULT_DTYPE = "f16"          # "f32" | "f16" | "i8"
+DTYPES = {"f32": np.float32, "f16": np.float16, "i8": np.int8}
+BLOCK_ROWS = 16384             # 점수 계산 시 한 번에 float32로 푸는 행 수 (512차원 기준 32MB)
+FETCH_ROWS = 10000             # MySQL에서 한 번에 읽는 행 수
+RERANK_FACTOR = 4              # float32 재정렬 후보 수 = k × RERANK_FACTOR
+DEFAULT_RERANK_PATH = os.path.join("cache", "vector_store", "vectors.f32")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """행별 L2 정규화 (0 벡터는 유사도 0이 되도록 그대로 둠)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+
+def quantize(matrix: np.ndarray, dtype: str):
+    """정규화된 float32 행렬 → (codes, scales). scales는 int8일 때만 (N,) float32, 그 외 None"""
+    if dtype == "f32":
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+    if dtype == "f16":
+        return matrix.astype(np.float16), None
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def read_vector_chunks(mysql_cursor, table_name: str = "product_vectors", fetch_rows: int = FETCH_ROWS):
+    """
+    product_vectors를 fetch_rows행씩 읽어 (product_ids int64, image_paths 리스트, 정규화된 float32 행렬)을 차례로 반환합니다.
+    전체를 float32로 한 번에 올리지 않고 청크 단위로 압축할 수 있게 합니다.
+    """
+    mysql_cursor.execute(f"SELECT product_id, image_path, image_vector FROM {table_name}")
+    while True:
+        rows = mysql_cursor.fetchmany(fetch_rows)
+        if not rows:
+            break
+        product_ids, image_paths, blobs = [], [], []
+        for (product_id, image_path, image_vector) in rows:
+            # 바이너리(BLOB)는 그대로 모으고, 이전 JSON 텍스트 행은 여기서 파싱 (형식이 깨진 행만 건너뜀)
+            if not is_binary(image_vector):
+                try:
+                    image_vector = decode_vector(image_vector)
+                except Exception:
+                    print(f"⚠️ 경고: product_id {product_id}의 벡터 데이터 파싱 실패. 건너뜀.")
+                    continue
+            product_ids.append(product_id)
+            image_paths.append(image_path)
+            blobs.append(image_vector)
+        if blobs:
+            # float32 BLOB만 있으면 np.frombuffer 한 번으로 (n, 512) 행렬 생성
+            yield np.asarray(product_ids, dtype=np.int64), image_paths, normalize_rows(decode_matrix(blobs))
+
+
+# -----------------------------------------------------------
+# 2. 압축 벡터 저장소
+# -----------------------------------------------------------
+class CompactVectorStore:
+    def __init__(self, product_ids, image_paths, codes: np.ndarray, scales: np.ndarray = None,
+                 dtype: str = DEFAULT_DTYPE, rerank_path: str = None):
+        """
+        product_ids / image_paths / codes는 같은 행 순서의 평행 배열입니다. 보통은 from_matrix / from_mysql로 만듭니다.
+        rerank_path: 정규화된 float32 원본 (N, dim) raw 파일 (없으면 재정렬 없이 압축 점수 그대로 반환)
+        """
+        if dtype not in DTYPES:
+            raise ValueError(f"지원하지 않는 저장 자료형: {dtype} (가능: {tuple(DTYPES)})")
+        self.dtype = dtype
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.image_paths = np.array([p.encode("utf-8") for p in image_paths], dtype=np.bytes_) \
+            if len(image_paths) else np.empty(0, dtype="S1")
+        self.codes = codes
+        self.scales = scales
+        self.dim = codes.shape[1]
+
+        # product_id → 행 번호: 정렬된 id 배열 + searchsorted (dict 대비 행당 수십 바이트 절약)
+        self._id_order = np.argsort(self.product_ids, kind="stable")
+        self._sorted_ids = self.product_ids[self._id_order]
+
+        self.rerank_path = rerank_path
+        self._exact = None
+        if rerank_path is not None and len(self):
+            self._exact = np.memmap(rerank_path, dtype=np.float32, mode="r", shape=(len(self), self.dim))
+
+    @classmethod
+    def from_matrix(cls, product_ids, image_paths, matrix: np.ndarray, dtype: str = DEFAULT_DTYPE,
+                    rerank_path: str = None) -> "CompactVectorStore":
+        """float32 행렬을 정규화·압축해 저장소를 만듭니다. rerank_path를 주면 float32 원본을 그 파일에 씁니다."""
+        return cls._build([(np.asarray(product_ids, dtype=np.int64), list(image_paths), normalize_rows(matrix))],
+                          dtype, rerank_path)
+
+    @classmethod
+    def from_mysql(cls, mysql_cursor, table_name: str = "product_vectors", dtype: str = DEFAULT_DTYPE,
+                   rerank_path: str = None, fetch_rows: int = FETCH_ROWS) -> "CompactVectorStore":
+        """product_vectors를 청크 단위로 읽어 바로 압축합니다. (최대 메모리 ≈ 압축 행렬 + 청크 하나)"""
+        return cls._build(read_vector_chunks(mysql_cursor, table_name, fetch_rows), dtype, rerank_path)
+
+    @classmethod
+    def _build(cls, chunks, dtype: str, rerank_path: str = None) -> "CompactVectorStore":
+        if dtype not in DTYPES:
+            raise ValueError(f"지원하지 않는 저장 자료형: {dtype} (가능: {tuple(DTYPES)})")
+        ids, paths, codes, scales = [], [], [], []
+        exact_file = None
+        if rerank_path is not None:
+            os.makedirs(os.path.dirname(rerank_path) or ".", exist_ok=True)
+            exact_file = open(rerank_path + ".tmp", "wb")
+        try:
+            for chunk_ids, chunk_paths, matrix in chunks:
+                chunk_codes, chunk_scales = quantize(matrix, dtype)
+                ids.append(chunk_ids)
+                paths.extend(chunk_paths)
+                codes.append(chunk_codes)
+                if chunk_scales is not None:
+                    scales.append(chunk_scales)
+                if exact_file is not None:
+                    exact_file.write(matrix.tobytes())
+        finally:
+            if exact_file is not None:
+                exact_file.close()
+        if rerank_path is not None:
+            os.replace(rerank_path + ".tmp", rerank_path)
+
+        dim = codes[0].shape[1] if codes else 512
+        codes = np.concatenate(codes) if codes else np.empty((0, dim), dtype=DTYPES[dtype])
+        ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+        scales = np.concatenate(scales) if scales else (np.empty(0, np.float32) if dtype == "i8" else None)
+        return cls(ids, paths, codes, scales, dtype=dtype, rerank_path=rerank_path)
+
+    # -----------------------------------------------------------
+    # 조회
+    # -----------------------------------------------------------
+    def __len__(self):
+        return len(self.product_ids)
+
+    @property
+    def nbytes(self) -> int:
+        """프로세스 메모리에 상주하는 크기 (재정렬용 float32 memmap은 OS 페이지 캐시이므로 제외)"""
+        total = self.codes.nbytes + self.product_ids.nbytes + self.image_paths.nbytes
+        total += self._id_order.nbytes + self._sorted_ids.nbytes
+        return total + (self.scales.nbytes if self.scales is not None else 0)
+
+    def rows_of_product(self, product_id) -> np.ndarray:
+        """product_id의 모든 행 번호 (한 상품에 이미지가 여러 장이면 여러 행, 없거나 None이면 빈 배열)"""
+        if product_id is None:
+            return np.empty(0, dtype=np.int64)
+        left = np.searchsorted(self._sorted_ids, product_id, side="left")
+        right = np.searchsorted(self._sorted_ids, product_id, side="right")
+        return self._id_order[left:right]
+
+    def primary_row(self, product_id):
+        """상품의 대표 행: image_path가 가장 작은 이미지 (예: 123_1.jpg). 상품이 없으면 None"""
+        rows = self.rows_of_product(product_id)
+        if len(rows) == 0:
+            return None
+        return int(rows[np.argmin(self.image_paths[rows])])
+
+    def image_path(self, row: int) -> str:
+        return self.image_paths[row].decode("utf-8")
+
+    def vectors(self, rows) -> np.ndarray:
+        """행 번호 목록 → 정규화된 float32 벡터 (재정렬 파일이 있으면 원본, 없으면 복원값)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self._exact is not None:
+            return np.array(self._exact[rows])
+        return self._decode(self.codes[rows], None if self.scales is None else self.scales[rows])
+
+    def vector(self, row: int) -> np.ndarray:
+        return self.vectors([row])[0]
+
+    @staticmethod
+    def _decode(codes: np.ndarray, scales: np.ndarray = None) -> np.ndarray:
+        block = codes.astype(np.float32)
+        return block if scales is None else block * scales[:, None]
+
+    # -----------------------------------------------------------
+    # 검색
+    # -----------------------------------------------------------
+    def scores(self, queries: np.ndarray, block_rows: int = BLOCK_ROWS) -> np.ndarray:
+        """정규화된 쿼리 (Q, dim)와 전체 행의 근사 코사인 유사도 (Q, N) float32"""
+        out = np.empty((len(queries), len(self)), dtype=np.float32)
+        for start in range(0, len(self), block_rows):
+            end = min(start + block_rows, len(self))
+            # float16 / int8 → float32로 풀어 BLAS 행렬 곱 (int8은 scale을 점수에 곱해 행 복원 비용 절약)
+            np.matmul(queries, self.codes[start:end].astype(np.float32).T, out=out[:, start:end])
+            if self.scales is not None:
+                out[:, start:end] *= self.scales[start:end]
+        return out
+
+    def search(self, queries: np.ndarray, k: int, exclude_rows=None, rerank: bool = True,
+               rerank_factor: int = RERANK_FACTOR):
+        """
+        queries (Q, dim)마다 상위 k개 행을 찾습니다.
+        exclude_rows: 쿼리별로 결과에서 제외할 행 집합 (행 번호 배열 / 단일 행 번호 / None, 음수는 무시)
+                      예) [store.rows_of_product(pid) for pid in query_ids] → 쿼리 상품의 모든 이미지를 제외
+        제외된 행은 점수 -inf로 남으므로, 남은 행이 k개보다 적으면 결과 끝에 -inf 점수가 섞일 수 있습니다.
+        rerank=True이고 재정렬 파일이 있으면 k × rerank_factor개 후보를 float32 원본으로 다시 점수 매깁니다.
+        반환값: (indices (Q, k), scores (Q, k))
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        k = min(k, len(self))
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0), dtype=np.float32)
+
+        scores = self.scores(queries)
+        if exclude_rows is not None:
+            for q, rows in enumerate(exclude_rows):
+                if rows is None:
+                    continue
+                rows = np.atleast_1d(np.asarray(rows, dtype=np.int64))
+                scores[q, rows[rows >= 0]] = -np.inf
+
+        rerank = rerank and self._exact is not None and self.dtype != "f32"
+        n_candidates = min(k * rerank_factor, len(self)) if rerank else k
+        top = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+
+        if rerank:
+            # 후보 행만 memmap에서 읽어 정확한 float32 내적으로 교체 (제외된 행은 -inf 유지)
+            exact = np.einsum("qd,qcd->qc", queries, self._exact[top.ravel()].reshape(*top.shape, self.dim))
+            top_scores = np.where(np.isneginf(top_scores), -np.inf, exact).astype(np.float32)
+
+        order = np.argsort(-top_scores, axis=1)[:, :k]
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
@@ -0,0 +1,79 @@
+# weaviate_ingest.py
+# Weaviate v4 배치 API 기반 스트리밍 적재.
+# 객체를 만들어지는 대로 배치에 넣으므로(제너레이터 소비) 전체 목록을 메모리에 모으지 않고,
+# 클라이언트가 백그라운드에서 전송하는 동안 호출 쪽은 다음 벡터를 계속 계산할 수 있습니다.
+# 실패한 객체는 객체별로 모아 같은 UUID로 재시도합니다. (UUID가 고정되어 있어 재시도해도 중복되지 않음)
+
+import time
+from weaviate.util import generate_uuid5
+
+DEFAULT_CONCURRENT_REQUESTS = 2
+DEFAULT_MAX_RETRIES = 3
+
+
+def _batch_context(collection, batch_size, concurrent_requests):
+    """batch_size가 None이면 서버 부하에 따라 크기를 조절하는 dynamic 배치, 아니면 고정 크기 배치."""
+    if batch_size is None:
+        return collection.batch.dynamic()
+    return collection.batch.fixed_size(batch_size=batch_size, concurrent_requests=concurrent_requests)
+
+
+def _send(collection, objects, batch_size, concurrent_requests, on_sent=None):
+    """objects를 배치로 전송하고, 실패한 객체의 uuid → (properties, vector, 오류 메시지)를 반환합니다."""
+    sent = 0
+    with _batch_context(collection, batch_size, concurrent_requests) as batch:
+        for properties, vector, uuid in objects:
+            batch.add_object(properties=properties, vector=vector, uuid=uuid)
+            sent += 1
+            if on_sent is not None:
+                on_sent(sent)
+
+    failed = {}
+    for error in collection.batch.failed_objects:
+        obj = error.object_
+        failed[str(obj.uuid)] = (obj.properties, obj.vector, error.message)
+    return sent, failed
+
+
+def stream_insert(collection, objects, batch_size: int = None,
+                  concurrent_requests: int = DEFAULT_CONCURRENT_REQUESTS,
+                  max_retries: int = DEFAULT_MAX_RETRIES, uuid_key: str = "imagePath",
+                  progress_every: int = 1000) -> dict:
+    """
+    objects: (properties, vector) 또는 (properties, vector, uuid)를 내는 반복 가능 객체 (제너레이터 권장)
+    batch_size: None이면 dynamic 배치, 숫자면 fixed_size 배치 (concurrent_requests개 요청 동시 전송)
+    uuid_key: uuid가 없을 때 이 속성 값으로 결정적 UUID(uuid5)를 만들어 재시도/재실행 시 중복을 막습니다.
+
+    반환값: {"sent", "inserted", "failed": [(uuid, 오류 메시지), ...], "seconds"}
+    """
+    start_time = time.time()
+
+    def with_uuid():
+        for item in objects:
+            if len(item) == 3:
+                yield item
+            else:
+                properties, vector = item
+                yield properties, vector, generate_uuid5(str(properties[uuid_key]))
+
+    def report(sent):
+        if progress_every and sent % progress_every == 0:
+            print(f"   ... {sent}개 객체 배치 전송 중 ({sent / max(time.time() - start_time, 1e-9):.1f} obj/s)")
+
+    sent, failed = _send(collection, with_uuid(), batch_size, concurrent_requests, on_sent=report)
+
+    # 실패한 객체만 다시 전송 (일시적 네트워크/서버 오류 대비)
+    for attempt in range(1, max_retries + 1):
+        if not failed:
+            break
+        print(f"🔁 실패한 {len(failed)}개 객체 재시도 ({attempt}/{max_retries})...")
+        time.sleep(min(2 ** (attempt - 1), 10))
+        retry = [(props, vector, uuid) for uuid, (props, vector, _) in failed.items()]
+        _, failed = _send(collection, retry, batch_size, concurrent_requests)
+
+    return {
+        "sent": sent,
+        "inserted": sent - len(failed),
+        "failed": [(uuid, message) for uuid, (_, _, message) in failed.items()],
+        "seconds": time.time() - start_time,
+    }